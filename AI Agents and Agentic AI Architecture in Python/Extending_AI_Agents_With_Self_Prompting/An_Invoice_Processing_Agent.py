@@ -12,32 +12,13 @@ def prompt_llm_for_json(action_context: ActionContext, schema: dict, prompt: str
         A dictionary matching the provided schema with extracted information
     """
     generate_response = action_context.get("llm")
-    
-    # Try up to 3 times to get valid JSON
-    for i in range(3):
-        try:
-            # Send prompt with schema instruction and get response
-            response = generate_response(Prompt(messages=[
-                {"role": "system", 
-                 "content": f"You MUST produce output that adheres to the following JSON schema:\n\n{json.dumps(schema, indent=4)}. Output your JSON in a ```json markdown block."},
-                {"role": "user", "content": prompt}
-            ]))
-
-            # Check if the response has json inside of a markdown code block
-            if "```json" in response:
-                # Search from the front and then the back
-                start = response.find("```json")
-                end = response.rfind("```")
-                response = response[start+7:end].strip()
-
-            # Parse and validate the JSON response
-            return json.loads(response)
-            
-        except Exception as e:
-            if i == 2:  # On last try, raise the error
-                raise e
-            print(f"Error generating response: {e}")
-            print("Retrying...")
+
+    def generate(messages):
+        return generate_response(Prompt(messages=messages))
+
+    # generate_response sends the messages as they are, so the schema goes in a system message
+    # ("prompt" mode). Up to 3 tries; each retry tells the model which fields broke the schema.
+    return request_json(generate, schema, prompt, mode="prompt")
 
 
 
@@ -1,20 +1,33 @@
 import os
 import json
+import asyncio
 from dotenv import load_dotenv
-from litellm import completion
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # repo root, for agent_core
+from agent_core import completion, acompletion, generate_many, stream_response, astream_response, generate_json, agenerate_json, instrument_tool, get_router, request_json, arequest_json
 
 # Simple mock classes for demonstration
 class Prompt:
-    def __init__(self, messages):
+    def __init__(self, messages, stop_at_fence=None, model=None, response_schema=None):
         self.messages = messages
+        # Fenced block type (e.g. "json") after which the rest of the response is not needed
+        self.stop_at_fence = stop_at_fence
+        # Model or tier ("fast", "powerful"); None lets the router pick based on the calling tool
+        self.model = model
+        # JSON schema of the reply; the model's native JSON-schema mode is used when it has one
+        self.response_schema = response_schema
 
 class ActionContext:
-    def __init__(self, llm_func):
+    def __init__(self, llm_func, async_llm_func=None):
         self.llm_func = llm_func
+        self.async_llm_func = async_llm_func
     
     def get(self, key):
         if key == "llm":
             return self.llm_func
+        if key == "async_llm":
+            return self.async_llm_func
         return None
 
 class Goal:
@@ -87,13 +100,15 @@ class Agent:
 
 def register_tool(tags=None):
     def decorator(func):
-        return func
+        # Attribute the LLM calls made inside the tool to it in the call metrics
+        return instrument_tool(func.__name__)(func)
     return decorator
 
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
+# Not needed when AGENT_LLM_API_BASE points at the offline mock server (python -m agent_core.mock_server)
+if not GROQ_API_KEY and not os.getenv("AGENT_LLM_API_BASE"):
     raise RuntimeError("GROQ_API_KEY environment variable is not set.")
 
 
@@ -114,32 +129,42 @@ def prompt_llm_for_json(action_context: ActionContext, schema: dict, prompt: str
         A dictionary matching the provided schema with extracted information
     """
     generate_response = action_context.get("llm")
-    
-    # Try up to 3 times to get valid JSON
-    for i in range(3):
-        try:
-            # Send prompt with schema instruction and get response
-            response = generate_response(Prompt(messages=[
-                {"role": "system", 
-                 "content": f"You MUST produce output that adheres to the following JSON schema:\n\n{json.dumps(schema, indent=4)}. Output your JSON in a ```json markdown block."},
-                {"role": "user", "content": prompt}
-            ]))
+    router = get_router()
+    tier = router.tier_for()
+
+    def generate(messages):
+        # The schema travels with the prompt: the LLM function uses the model's native JSON-schema
+        # mode when it has one and falls back to a schema system message otherwise.
+        return generate_response(Prompt(messages=messages, model=tier, response_schema=schema))
+
+    def escalate(error):
+        nonlocal tier
+        print(f"Error generating response: {error}")
+        print("Retrying...")
+        # A cheap model that can't produce valid JSON gets escalated to a stronger one
+        tier = router.escalate(tier) or tier
+
+    # Up to 3 tries; each retry tells the model which fields broke the schema
+    return request_json(generate, schema, prompt, on_retry=escalate)
 
-            # Check if the response has json inside of a markdown code block
-            if "```json" in response:
-                # Search from the front and then the back
-                start = response.find("```json")
-                end = response.rfind("```")
-                response = response[start+7:end].strip()
 
-            # Parse and validate the JSON response
-            return json.loads(response)
-            
-        except Exception as e:
-            if i == 2:  # On last try, raise the error
-                raise e
-            print(f"Error generating response: {e}")
-            print("Retrying...")
+@instrument_tool()
+async def aprompt_llm_for_json(action_context: ActionContext, schema: dict, prompt: str):
+    """Async twin of prompt_llm_for_json; awaits the context's "async_llm" function."""
+    generate_response = action_context.get("async_llm")
+    router = get_router()
+    tier = router.tier_for()
+
+    async def generate(messages):
+        return await generate_response(Prompt(messages=messages, model=tier, response_schema=schema))
+
+    def escalate(error):
+        nonlocal tier
+        print(f"Error generating response: {error}")
+        print("Retrying...")
+        tier = router.escalate(tier) or tier
+
+    return await arequest_json(generate, schema, prompt, on_retry=escalate)
 
 
 
@@ -169,7 +194,26 @@ def prompt_expert(action_context: ActionContext, description_of_expert: str, pro
     return response
 
 
+@instrument_tool()
+async def aprompt_expert(action_context: ActionContext, description_of_expert: str, prompt: str) -> str:
+    """Async twin of prompt_expert; awaits the context's "async_llm" function."""
+    generate_response = action_context.get("async_llm")
+    return await generate_response(Prompt(messages=[
+        {"role": "system",
+         "content": f"Act as the following expert and respond accordingly: {description_of_expert}"},
+        {"role": "user", "content": prompt}
+    ]))
+
+
+
 
+EXPENDITURE_CATEGORIES = [
+    "Office Supplies", "IT Equipment", "Software Licenses", "Consulting Services",
+    "Travel Expenses", "Marketing", "Training & Development", "Facilities Maintenance",
+    "Utilities", "Legal Services", "Insurance", "Medical Services", "Payroll",
+    "Research & Development", "Manufacturing Supplies", "Construction", "Logistics",
+    "Customer Support", "Security Services", "Miscellaneous"
+]
 
 @register_tool(tags=["invoice_processing", "categorization"])
 def categorize_expenditure(action_context: ActionContext, description: str) -> str:
@@ -182,21 +226,41 @@ def categorize_expenditure(action_context: ActionContext, description: str) -> s
     Returns:
         A category name from the predefined set of 20 categories.
     """
-    categories = [
-        "Office Supplies", "IT Equipment", "Software Licenses", "Consulting Services", 
-        "Travel Expenses", "Marketing", "Training & Development", "Facilities Maintenance",
-        "Utilities", "Legal Services", "Insurance", "Medical Services", "Payroll",
-        "Research & Development", "Manufacturing Supplies", "Construction", "Logistics",
-        "Customer Support", "Security Services", "Miscellaneous"
-    ]
-    
     return prompt_expert(
         action_context=action_context,
         description_of_expert="A senior financial analyst with deep expertise in corporate spending categorization.",
-        prompt=f"Given the following description: '{description}', classify the expense into one of these categories:\n{categories}"
+        prompt=f"Given the following description: '{description}', classify the expense into one of these categories:\n{EXPENDITURE_CATEGORIES}"
+    )
+
+
+@instrument_tool()
+async def acategorize_expenditure(action_context: ActionContext, description: str) -> str:
+    """Async twin of categorize_expenditure."""
+    return await aprompt_expert(
+        action_context=action_context,
+        description_of_expert="A senior financial analyst with deep expertise in corporate spending categorization.",
+        prompt=f"Given the following description: '{description}', classify the expense into one of these categories:\n{EXPENDITURE_CATEGORIES}"
     )
 
 
+@instrument_tool()
+async def acategorize_expenditures(descriptions: list, max_concurrency: int = 8) -> list:
+    """
+    Categorize many expenditures concurrently through the shared client.
+
+    Results come back in the same order as ``descriptions``; a failed call
+    yields its exception in place of a category.
+    """
+    prompts = [[
+        {"role": "system",
+         "content": "Act as the following expert and respond accordingly: A senior financial analyst with deep expertise in corporate spending categorization."},
+        {"role": "user",
+         "content": f"Given the following description: '{description}', classify the expense into one of these categories:\n{EXPENDITURE_CATEGORIES}"}
+    ] for description in descriptions]
+    return await generate_many(prompts, max_concurrency=max_concurrency,
+                               model="auto", max_tokens=1024)
+
+
 
 
 
@@ -244,10 +308,52 @@ def check_purchasing_rules(action_context: ActionContext, invoice_data: dict) ->
 
 
 
+# Categorization and plain JSON extraction are cheap, well-constrained tasks, so they run
+# on the fast model (prompt_llm_for_json escalates on failure). Policy checks stay on the
+# powerful model. Tools without a route use the router's default (powerful) tier.
+get_router().route(
+    categorize_expenditure="fast",
+    acategorize_expenditure="fast",
+    acategorize_expenditures="fast",
+    prompt_llm_for_json="fast",
+    aprompt_llm_for_json="fast",
+    check_purchasing_rules="powerful",
+)
+
+
 def create_simple_llm_function():
     def generate_response_func(prompt: Prompt):
+        if prompt.response_schema is not None:
+            return generate_json(prompt.messages, prompt.response_schema, model=prompt.model or "auto", max_tokens=1024)
+        if prompt.stop_at_fence:
+            return stream_response(
+                prompt.messages,
+                model=prompt.model or "auto",
+                max_tokens=1024,
+                stop_at_fence=prompt.stop_at_fence,
+            )
         response = completion(
-            model="groq/llama-3.3-70b-versatile",
+            model=prompt.model or "auto",
+            messages=prompt.messages,
+            max_tokens=1024,
+        )
+        return response.choices[0].message.content
+    return generate_response_func
+
+
+def create_simple_async_llm_function():
+    async def generate_response_func(prompt: Prompt):
+        if prompt.response_schema is not None:
+            return await agenerate_json(prompt.messages, prompt.response_schema, model=prompt.model or "auto", max_tokens=1024)
+        if prompt.stop_at_fence:
+            return await astream_response(
+                prompt.messages,
+                model=prompt.model or "auto",
+                max_tokens=1024,
+                stop_at_fence=prompt.stop_at_fence,
+            )
+        response = await acompletion(
+            model=prompt.model or "auto",
             messages=prompt.messages,
             max_tokens=1024,
         )
@@ -340,6 +446,16 @@ if __name__ == "__main__":
         print("\nTesting Categorization...")
         category = categorize_expenditure(context, "Purchase of computer equipment for office use")
         print(f"Category: {category}")
+
+        # Demo: Categorize several expenditures concurrently
+        print("\nTesting Concurrent Categorization...")
+        descriptions = [
+            "Purchase of computer equipment for office use",
+            "Flights and hotel for the sales conference",
+            "Annual subscription to the design software suite",
+        ]
+        for description, category in zip(descriptions, asyncio.run(acategorize_expenditures(descriptions))):
+            print(f"{description} -> {category}")
         
         # Demo: Test full agent
         print("\n" + "="*50)
@@ -3,11 +3,15 @@ import os
 from dotenv import load_dotenv
 from typing import List
 
-from litellm import completion
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+from agent_core import Action, ActionRegistry, Agent, Budget, AgentFunctionCallingActionLanguage, Goal, create_llm_function
 
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
+# Not needed when AGENT_LLM_API_BASE points at the offline mock server (python -m agent_core.mock_server)
+if not GROQ_API_KEY and not os.getenv("AGENT_LLM_API_BASE"):
     raise RuntimeError("GROQ_API_KEY Environment variable is not set. Please add it to your .env")
 
 def list_files() -> List[str]:
@@ -82,54 +86,27 @@ When you are done, terminate the conversation by using the "terminate" tool and
 """
 }]
 
-# Initialize agent parameters
-iterations = 0
-max_iterations = 10
-
-user_task = input("What would you like me to do? ")
-
-memory = [{"role": "user", "content": user_task}]
-
-# The Agent Loop
-while iterations < max_iterations:
-
-    messages = agent_rules + memory
-
-    response = completion(
-        model="groq/llama-3.3-70b-versatile",
-        messages=messages,
-        tools=tools,
-        max_tokens=1024
-    )
-
-    if response.choices[0].message.tool_calls:
-        tool = response.choices[0].message.tool_calls[0]
-        tool_name = tool.function.name
-        tool_args = json.loads(tool.function.arguments)
-
-        action = {
-            "tool_name": tool_name,
-            "args": tool_args
-        }
-
-        if tool_name == "terminate":
-            print(f"Termination message: {tool_args['message']}")
-            break
-        elif tool_name in tool_functions:
-            try:
-                result = {"result": tool_functions[tool_name](**tool_args)}
-            except Exception as e:
-                result = {"error":f"Error executing {tool_name}: {str(e)}"}
-        else:
-            result = {"error": f"Unknown tool: {tool_name}"}
-
-        print(f"Executing: {tool_name} with args {tool_args}")
-        print(f"Result: {result}")
-        memory.extend([
-            {"role": "assistant", "content": json.dumps(action)},
-            {"role": "user", "content": json.dumps(result)}
-        ])
-    else:
-        result = response.choices[0].message.content
-        print(f"Response: {result}")
-        break
+def show(call):
+    if call.name != "terminate":
+        print(f"Executing: {call.name} with args {call.args}")
+        print(f"Result: {call.result}")
+
+agent = Agent(
+    goals=[Goal(name="Rules", description=agent_rules[0]["content"])],
+    agent_language=AgentFunctionCallingActionLanguage(),
+    action_registry=ActionRegistry([
+        Action.from_tool(tool, tool_functions[tool["function"]["name"]], terminal=tool["function"]["name"] == "terminate")
+        for tool in tools
+    ]),
+    generate_response=create_llm_function(model="groq/llama-3.3-70b-versatile"),
+    max_iterations=10,
+    budget=Budget.from_env(),
+    on_action=show,
+)
+
+if __name__ == "__main__":
+    user_task = input("What would you like me to do? ")
+    # Every tool call of a turn runs concurrently; terminate() prints its own message
+    result = agent.run_sync(user_task)
+    if not result.terminated:
+        print(f"Response: {result.final}")
@@ -8,57 +8,27 @@
 # simplie like "tell me what files are in this directory"
 #
 import os
-from google.colab import userdata
-api_key = userdata.get('OPENAI_API_KEY')
-os.environ['OPENAI_API_KEY'] = api_key
+try:
+    from google.colab import userdata
+    os.environ['OPENAI_API_KEY'] = userdata.get('OPENAI_API_KEY')
+except ImportError:
+    # Outside Colab the key comes from the environment (or the mock server needs none)
+    pass
 
 
 
-import json
 import sys
-from litellm import completion
-from typing import List, Dict
-
-def extract_markdown_block(response: str, block_type: str = "json") -> str:
-    """Extract code block from response"""
-
-    if not '```' in response:
-        return response
-
-    code_block = response.split('```')[1].strip()
-
-    if code_block.startswith(block_type):
-        code_block = code_block[len(block_type):].strip()
-
-    return code_block
-
-def generate_response(messages: List[Dict]) -> str:
-    """Call LLM to get a response."""
-    response = completion(
-        model="openai/gpt-4o",
-        messages=messages,
-        max_tokens=1024
-    )
-    return response.choices[0].message.content.strip()
-
-def parse_action(response: str) -> Dict:
-    """Parse the LLM response into a structured action dictionary."""
-    try:
-        response = extract_markdown_block(response, "action")
-        response_json = json.loads(response)
-        if "tool_name" in response_json and "args" in response_json:
-            return response_json
-        else:
-            return {"tool_name": "error", "args": {"message": "You must respond with a JSON tool invocation."}}
-    except json.JSONDecodeError:
-        return {"tool_name": "error", "args": {"message": "Invalid JSON response. You must respond with a JSON tool invocation."}}
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+from agent_core import Action, ActionRegistry, Agent, Budget, AgentJsonActionLanguage, Goal, create_llm_function
+from typing import List
 
 def list_files() -> List[str]:
-    """List files in the current directory."""
+    """Lists all files in the current directory."""
     return os.listdir(".")
 
 def read_file(file_name: str) -> str:
-    """Read a file's contents."""
+    """Reads the content of a file."""
     try:
         with open(file_name, "r") as file:
             return file.read()
@@ -67,102 +37,42 @@ def read_file(file_name: str) -> str:
     except Exception as e:
         return f"Error: {str(e)}"
 
-# Define system instructions (Agent Rules)
-agent_rules = [{
-    "role": "system",
-    "content": """
-You are an AI agent that can perform tasks by using available tools.
-
-Available tools:
-
-```json
-{
-    "list_files": {
-        "description": "Lists all files in the current directory.",
-        "parameters": {}
-    },
-    "read_file": {
-        "description": "Reads the content of a file.",
-        "parameters": {
-            "file_name": {
-                "type": "string",
-                "description": "The name of the file to read."
-            }
-        }
-    },
-    "terminate": {
-        "description": "Ends the agent loop and provides a summary of the task.",
-        "parameters": {
-            "message": {
-                "type": "string",
-                "description": "Summary message to return to the user."
-            }
-        }
-    }
-}
-```
+def terminate(message: str) -> str:
+    """Ends the agent loop and provides a summary of the task."""
+    return message
 
+# Define the agent's goals (Agent Rules); the ```action language adds the tool list and response format
+goals = [
+    Goal(name="Persona", description="You are an AI agent that can perform tasks by using available tools."),
+    Goal(name="Rules", description="""
 If a user asks about files, documents, or content, first list the files before reading them.
 
 When you are done, terminate the conversation by using the "terminate" tool and I will provide the results to the user.
-
-Important!!! Every response MUST have an action.
-You must ALWAYS respond in this format:
-
-<Stop and think step by step. Parameters map to args. Insert a rich description of your step by step thoughts here.>
-
-```action
-{
-    "tool_name": "insert tool_name",
-    "args": {...fill in any required arguments here...}
-}
-```"""
-}]
-
-# Initialize agent parameters
-iterations = 0
-max_iterations = 10
-
-user_task = input("What would you like me to do? ")
-
-memory = [{"role": "user", "content": user_task}]
-
-# The Agent Loop
-while iterations < max_iterations:
-    # 1. Construct prompt: Combine agent rules with memory
-    prompt = agent_rules + memory
-
-    # 2. Generate response from LLM
-    print("Agent thinking...")
-    response = generate_response(prompt)
-    print(f"Agent response: {response}")
-
-    # 3. Parse response to determine action
-    action = parse_action(response)
-    result = "Action executed"
-
-    if action["tool_name"] == "list_files":
-        result = {"result": list_files()}
-    elif action["tool_name"] == "read_file":
-        result = {"result": read_file(action["args"]["file_name"])}
-    elif action["tool_name"] == "error":
-        result = {"error": action["args"]["message"]}
-    elif action["tool_name"] == "terminate":
-        print(action["args"]["message"])
-        break
-    else:
-        result = {"error": "Unknown action: " + action["tool_name"]}
-
-    print(f"Action result: {result}")
-
-    # 5. Update memory with response and results
-    memory.extend([
-        {"role": "assistant", "content": response},
-        {"role": "user", "content": json.dumps(result)}
-    ])
-
-    # 6. Check termination condition
-    if action["tool_name"] == "terminate":
-        break
-
-    iterations += 1
+"""),
+]
+
+action_registry = ActionRegistry([
+    Action.from_function(list_files),
+    Action.from_function(read_file),
+    Action.from_function(terminate, terminal=True),
+])
+
+def show(call):
+    if call.name != "terminate":
+        print(f"Action result: {call.result}")
+
+agent = Agent(
+    goals=goals,
+    agent_language=AgentJsonActionLanguage(),
+    action_registry=action_registry,
+    # Stops streaming as soon as the ```action block is complete
+    generate_response=create_llm_function(model="openai/gpt-4o"),
+    max_iterations=10,
+    budget=Budget.from_env(),
+    on_action=show,
+)
+
+if __name__ == "__main__":
+    user_task = input("What would you like me to do? ")
+    result = agent.run_sync(user_task)
+    print(result.final)
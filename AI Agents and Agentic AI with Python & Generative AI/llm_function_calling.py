@@ -1,7 +1,10 @@
 import os
 import json
 from typing import List
-from litellm import completion # Using LiteLLM for universal API support
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+from agent_core import completion
 
 # --- 1. TOOL DEFINITIONS (The Business Logic) ---
 
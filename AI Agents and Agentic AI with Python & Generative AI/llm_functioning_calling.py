@@ -9,14 +9,18 @@ import os
 from dotenv import load_dotenv
 from typing import List
 
-from litellm import completion
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+from agent_core import completion
 
 # Load environment variables from .env file
 load_dotenv()
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-if not GROQ_API_KEY:
+# Not needed when AGENT_LLM_API_BASE points at the offline mock server (python -m agent_core.mock_server)
+if not GROQ_API_KEY and not os.getenv("AGENT_LLM_API_BASE"):
     raise RuntimeError("GROQ_API_KEY environment variable is not set. Please add it to your .env file.")
 
 
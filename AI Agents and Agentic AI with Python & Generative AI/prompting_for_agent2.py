@@ -1,5 +1,8 @@
 import json
-from litellm import completion
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+from agent_core import completion
 from typing import List, Dict
 import os
 
@@ -1,6 +1,8 @@
 import os
-import re
-from litellm import completion
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+from agent_core import completion, fenced_block
 
 
 os.environ["GROQ_API_KEY"] = "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"
@@ -22,10 +24,8 @@ def call_llm(messages):
 
 def extract_code(text):
     """Extracts Python code from triple backticks."""
-    match = re.search(r"```(?:python)?(.*?)```", text, re.DOTALL)
-    if not match:
-        return text.strip()  # Fallback: return raw text if backticks missing
-    return match.group(1).strip()
+    # Fallback: return raw text if backticks missing
+    return fenced_block(text, default=text.strip())
 
 def step_1_generate_function(user_request):
     messages = [
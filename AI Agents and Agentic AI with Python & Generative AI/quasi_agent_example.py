@@ -1,6 +1,8 @@
-from litellm import completion
-from typing import List, Dict
 import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+from agent_core import completion, find_fence
+from typing import List, Dict
 
 def generate_response(messages: List[Dict]) -> str:
    """Call LLM to get response"""
@@ -14,16 +16,12 @@ def generate_response(messages: List[Dict]) -> str:
 def extract_code_block(response: str) -> str:
    """Extract code block from response"""
 
-   if not '```' in response:
+   block = find_fence(response)
+   if block is None:
       return response
 
-   code_block = response.split('```')[1].strip()
-   # Check for "python" at the start and remove
-
-   if code_block.startswith("python"):
-      code_block = code_block[6:]
-
-   return code_block
+   # The info string ("python") is not part of the body
+   return block.body
 
 def develop_custom_function():
    # Get user input for function description
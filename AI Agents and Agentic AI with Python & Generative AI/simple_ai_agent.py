@@ -1,5 +1,9 @@
-import json
-import re
+import asyncio
+import os
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+from agent_core import Action, ActionRegistry, Agent, AgentJsonActionLanguage, Goal, Memory, generate_response
 
 # ==========================================
 # 1. TOOL DEFINITIONS (The Agent's "Hands")
@@ -11,83 +15,66 @@ def read_file(file_name):
     files = {"notes.txt": "Meeting minutes: Project is on track."}
     return files.get(file_name, "Error: File not found.")
 
+def scripted_response(messages):
+    """Stand-in LLM for running without a model: list the files, then terminate."""
+    if not any(m["role"] == "assistant" for m in messages):
+        return '```action {"tool_name": "list_files", "args": {}} ```'
+    return '```action {"tool_name": "terminate", "args": {"message": "I found the files."}} ```'
+
 # ==========================================
 # 2. THE AGENT CLASS (The Agent's "Brain")
 # ==========================================
 class SimpleAgent:
-    def __init__(self, max_iterations=5):
+    """The file assistant on top of the shared agent engine (```action blocks)."""
+
+    def __init__(self, max_iterations=5, generate_response=scripted_response, budget=None):
         self.max_iterations = max_iterations
+        self.generate_response = generate_response
         self.iterations = 0
-        self.memory = []
-        self.system_rules = {
-            "role": "system",
-            "content": (
+        self.memory = Memory()
+        self.agent = Agent(
+            goals=[Goal(name="Rules", description=(
                 "You are a file assistant. Use tools to answer questions.\n"
                 "Tools: list_files(), read_file(file_name), terminate(message).\n"
                 "Response Format: Always wrap your JSON action in ```action code blocks."
-            )
-        }
-
-    def parse_action(self, response: str):
-        """Extracts the JSON action from markdown code blocks."""
-        try:
-            # Matches content inside ```action { ... } ```
-            match = re.search(r"```action\s*(\{.*?\})\s*```", response, re.DOTALL)
-            if match:
-                return json.loads(match.group(1))
-            return {"tool_name": "error", "args": {"message": "Invalid format. Use ```action {json} ```"}}
-        except json.JSONDecodeError:
-            return {"tool_name": "error", "args": {"message": "Response was not valid JSON."}}
-
-    def execute_tool(self, action):
-        """Routes the LLM action to the actual Python function."""
-        name = action.get("tool_name")
-        args = action.get("args", {})
+            ))],
+            agent_language=AgentJsonActionLanguage(),
+            action_registry=ActionRegistry([
+                Action.from_function(list_files, description="List the files in the directory."),
+                Action.from_function(read_file, description="Read a file's contents."),
+                Action.from_function(lambda message: message, name="terminate",
+                                     description="Finish with a message for the user.", terminal=True),
+            ]),
+            # The engine passes a Prompt; the LLM functions here take the message list
+            generate_response=lambda prompt: self.generate_response(prompt.messages),
+            max_iterations=max_iterations,
+            on_action=self.report,
+            budget=budget,
+        )
 
-        if name == "list_files":
-            return {"result": list_files()}
-        elif name == "read_file":
-            return {"result": read_file(args.get("file_name"))}
-        elif name == "terminate":
-            return "STOP"
-        else:
-            return {"error": f"Tool '{name}' not found."}
+    def report(self, call):
+        print(f"🤖 Action: {call.name}")
+        if call.name != "terminate":
+            print(f"🔧 Result: {call.result}")
 
-    def run(self, user_query):
+    async def arun(self, user_query):
+        """Async run; many SimpleAgents (or queries) can run concurrently on one event loop."""
         print(f"🚀 Task: {user_query}")
-        self.memory.append({"role": "user", "content": user_query})
-
-        while self.iterations < self.max_iterations:
-            self.iterations += 1
-            
-            # Step 1: Think (Combine rules + history)
-            prompt = [self.system_rules] + self.memory
-            print(f"\n[Iteration {self.iterations}] Thinking...")
-            
-            # MOCK LLM CALL (Replace with actual LLM API call)
-            # In a real scenario, this 'response' comes from GPT/Gemini
-            response = '```action {"tool_name": "list_files", "args": {}} ```' if self.iterations == 1 else \
-                       '```action {"tool_name": "terminate", "args": {"message": "I found the files."}} ```'
-            
-            # Step 2: Parse
-            action = self.parse_action(response)
-            print(f"🤖 Action: {action['tool_name']}")
+        result = await self.agent.run(user_query, memory=self.memory)
+        self.iterations += result.iterations
+        if result.terminated:
+            print(f"🏁 Finished: {result.final}")
+        elif result.stop_reason not in ("answered", "max_iterations"):
+            print(f"⏹️ Stopped: {result.stop_reason} budget used up")
+        return result
 
-            # Step 3: Execute & Check Termination
-            result = self.execute_tool(action)
-            
-            if result == "STOP":
-                print(f"🏁 Finished: {action['args'].get('message')}")
-                break
-
-            # Step 4: Remember
-            self.memory.append({"role": "assistant", "content": response})
-            self.memory.append({"role": "user", "content": json.dumps(result)})
-            print(f"🔧 Result: {result}")
+    def run(self, user_query):
+        return asyncio.run(self.arun(user_query))
 
 # ==========================================
 # 3. EXECUTION
 # ==========================================
 if __name__ == "__main__":
-    agent = SimpleAgent()
+    # With AGENT_LLM_API_BASE set (e.g. the offline mock server) the agent talks to that model
+    agent = SimpleAgent(generate_response=generate_response) if os.getenv("AGENT_LLM_API_BASE") else SimpleAgent()
     agent.run("What files are in this directory?")
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+Shared runtime pieces for the agent scripts in this repository.
+
+The scripts live in folders whose names are not importable, so they add the
+repository root to ``sys.path`` before importing ``agent_core``.
+"""
+from agent_core.agent import (
+    Action,
+    ActionRegistry,
+    Agent,
+    AgentFunctionCallingActionLanguage,
+    AgentJsonActionLanguage,
+    AgentLanguage,
+    AgentPlanActionLanguage,
+    AgentResult,
+    Environment,
+    Goal,
+    Memory,
+    Prompt,
+    create_llm_function,
+)
+from agent_core.budget import Budget
+from agent_core.cache import ResponseCache
+from agent_core.hedging import CircuitOpenError, HedgingPolicy
+from agent_core.llm import (
+    DEFAULT_MODEL,
+    LLMClient,
+    acompletion,
+    agenerate_json,
+    agenerate_response,
+    astream_response,
+    cache_key,
+    completion,
+    generate_json,
+    generate_many,
+    generate_response,
+    get_client,
+    set_client,
+    stream_response,
+)
+from agent_core.memory import CompactingMemory, llm_summarizer
+from agent_core.messages import MessageLog
+from agent_core.metrics import (
+    JSONLSink,
+    Metrics,
+    RingBufferSink,
+    Usage,
+    get_metrics,
+    instrument_tool,
+    tool_scope,
+    track_usage,
+)
+from agent_core.ratelimit import RateLimiter, get_rate_limiter
+from agent_core.repair import RepairStats, get_repair_stats, parse_json
+from agent_core.router import ModelRouter, get_router
+from agent_core.schema import CompiledSchema, SchemaError, compile_schema
+from agent_core.singleflight import SingleFlight
+from agent_core.streaming import FenceDetector, FencedBlock, JsonStreamParser, fenced_block, find_fence, scan_fences
+from agent_core.structured import arequest_json, request_json, retry_reason, structured_mode
+from agent_core.tools import ToolCallResult, assistant_message, parse_tool_arguments
+
+__all__ = [
+    "Action",
+    "ActionRegistry",
+    "Agent",
+    "AgentFunctionCallingActionLanguage",
+    "AgentJsonActionLanguage",
+    "AgentLanguage",
+    "AgentPlanActionLanguage",
+    "AgentResult",
+    "Budget",
+    "CircuitOpenError",
+    "CompactingMemory",
+    "CompiledSchema",
+    "DEFAULT_MODEL",
+    "Environment",
+    "FenceDetector",
+    "FencedBlock",
+    "Goal",
+    "HedgingPolicy",
+    "JSONLSink",
+    "JsonStreamParser",
+    "LLMClient",
+    "Memory",
+    "MessageLog",
+    "Metrics",
+    "ModelRouter",
+    "Prompt",
+    "RateLimiter",
+    "RepairStats",
+    "ResponseCache",
+    "RingBufferSink",
+    "SchemaError",
+    "SingleFlight",
+    "ToolCallResult",
+    "Usage",
+    "acompletion",
+    "agenerate_json",
+    "agenerate_response",
+    "arequest_json",
+    "assistant_message",
+    "astream_response",
+    "cache_key",
+    "compile_schema",
+    "completion",
+    "create_llm_function",
+    "fenced_block",
+    "find_fence",
+    "generate_json",
+    "generate_many",
+    "generate_response",
+    "get_client",
+    "get_metrics",
+    "get_rate_limiter",
+    "get_repair_stats",
+    "get_router",
+    "instrument_tool",
+    "llm_summarizer",
+    "parse_json",
+    "parse_tool_arguments",
+    "request_json",
+    "retry_reason",
+    "scan_fences",
+    "set_client",
+    "stream_response",
+    "structured_mode",
+    "tool_scope",
+    "track_usage",
+]
@@ -0,0 +1,661 @@
+"""
+Reusable async agent engine.
+
+The course scripts each carried their own copy of the agent loop: build the
+prompt from rules and memory, call the model, parse an action, run the tool,
+append the result, repeat. Those loops lived at module level and blocked on
+``input()``, so a process could only ever drive one conversation.
+
+``Agent`` keeps the ``Agent(goals, agent_language, action_registry,
+generate_response, environment)`` shape of the invoice agent, but ``run`` is a
+coroutine that keeps all per-conversation state in its ``Memory``. One agent
+can therefore run many sessions concurrently, and cancelling a session's task
+stops it at the next await. The action language decides how tools are
+described to the model and how its replies are parsed: ``AgentJsonActionLanguage``
+for ```action blocks, ``AgentPlanActionLanguage`` for ```action blocks holding
+a multi-step plan, ``AgentFunctionCallingActionLanguage`` for native tool
+calls.
+"""
+import asyncio
+import inspect
+import json
+import time
+import warnings
+from dataclasses import dataclass, field, replace
+from typing import (TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union,
+                    get_type_hints)
+
+from agent_core.budget import Budget
+from agent_core.llm import acompletion, agenerate_json, agenerate_response, astream_response
+from agent_core.messages import MessageLog
+from agent_core.metrics import Usage, tool_scope, track_usage
+from agent_core.streaming import fenced_block
+from agent_core.tools import ToolCallResult, assistant_message, parse_tool_arguments
+
+if TYPE_CHECKING:
+    # Kept out of the import graph so ``python -m agent_core.checkpoint`` runs cleanly
+    from agent_core.checkpoint import Checkpoint
+
+# Added to the prompt once any budget limit is close
+WRAP_UP_PROMPT = ("Your budget for this task is nearly used up. Wrap up now: give your best final answer "
+                  "(use the terminate tool if you have one) instead of starting new work.")
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object"}
+
+
+@dataclass
+class Goal:
+    name: str
+    description: str
+
+
+@dataclass
+class Prompt:
+    """What the agent sends to ``generate_response``."""
+    messages: List[Dict[str, Any]]
+    tools: Optional[List[Dict[str, Any]]] = None
+    # Fenced block type (e.g. "action") after which the rest of the response is not needed
+    stop_at_fence: Optional[str] = None
+    # Model or tier ("fast", "powerful"); None uses the client's default
+    model: Optional[str] = None
+    # Called with (key, value) for each top-level member of a streamed ```action/```json block
+    # as soon as it is complete (e.g. "tool_name" before "args")
+    on_member: Optional[Callable[[str, Any], None]] = None
+    # JSON schema of the reply; the reply is then JSON text, constrained natively when the model supports it
+    response_schema: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class Action:
+    """
+    A tool the agent can invoke.
+
+    Args:
+        name: Name the model uses to call it
+        function: Sync or async callable taking the tool's arguments as keywords
+        description: What the tool does, shown to the model
+        parameters: JSON schema of the arguments
+        terminal: Whether invoking it ends the run (e.g. ``terminate``)
+        prepare: Sync or async callable (no arguments) that warms the tool up, e.g. opens a
+            connection. It runs once per run, before the tool's first execution, and starts
+            as soon as a streamed reply names the tool, while its arguments are still arriving.
+    """
+    name: str
+    function: Callable[..., Any]
+    description: str = ""
+    parameters: Dict[str, Any] = field(default_factory=lambda: {"type": "object", "properties": {}, "required": []})
+    terminal: bool = False
+    prepare: Optional[Callable[[], Any]] = None
+
+    @classmethod
+    def from_function(cls, function: Callable[..., Any], name: Optional[str] = None,
+                      description: Optional[str] = None, terminal: bool = False,
+                      prepare: Optional[Callable[[], Any]] = None) -> "Action":
+        """Build an action whose description and parameter schema come from the function itself."""
+        hints = get_type_hints(function)
+        properties, required = {}, []
+        for param in inspect.signature(function).parameters.values():
+            properties[param.name] = {"type": _JSON_TYPES.get(hints.get(param.name), "string")}
+            if param.default is inspect.Parameter.empty:
+                required.append(param.name)
+        return cls(name=name or function.__name__, function=function,
+                   description=description or (inspect.getdoc(function) or "").split("\n\n")[0],
+                   parameters={"type": "object", "properties": properties, "required": required},
+                   terminal=terminal, prepare=prepare)
+
+    @classmethod
+    def from_tool(cls, tool: Dict[str, Any], function: Callable[..., Any], terminal: bool = False) -> "Action":
+        """Build an action from an OpenAI ``tools`` entry and the function implementing it."""
+        spec = tool["function"]
+        return cls(name=spec["name"], function=function, description=spec.get("description", ""),
+                   parameters=spec.get("parameters") or {"type": "object", "properties": {}}, terminal=terminal)
+
+    def tool_schema(self) -> Dict[str, Any]:
+        """The action in the OpenAI ``tools`` format."""
+        return {"type": "function",
+                "function": {"name": self.name, "description": self.description, "parameters": self.parameters}}
+
+
+class ActionRegistry:
+    def __init__(self, actions: Optional[List[Action]] = None):
+        self.actions: Dict[str, Action] = {}
+        for action in actions or []:
+            self.register(action)
+
+    def register(self, action: Action) -> None:
+        self.actions[action.name] = action
+
+    def get_action(self, name: Optional[str]) -> Optional[Action]:
+        return self.actions.get(name) if name else None
+
+    def get_actions(self) -> List[Action]:
+        return list(self.actions.values())
+
+
+class Memory:
+    """The conversation of one agent session, as chat messages."""
+
+    def __init__(self, items: Optional[List[Dict[str, Any]]] = None):
+        self.items = MessageLog(items or [])
+
+    def add_memory(self, item: Dict[str, Any]) -> None:
+        self.items.append(item)
+
+    def extend(self, items: List[Dict[str, Any]]) -> None:
+        self.items.extend(items)
+
+    def get_memories(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return self.items[-limit:] if limit else list(self.items)
+
+    def view(self, head: List[Dict[str, Any]]) -> MessageLog:
+        """Prompt messages: ``head`` followed by the memories, sharing their cached encodings."""
+        return self.items.view(head)
+
+    async def compact(self) -> None:
+        """Called before every prompt is built; subclasses may shrink old history here."""
+
+
+class Environment:
+    """Executes actions. Sync tools run in a worker thread so they never stall other sessions."""
+
+    async def execute_action(self, action: Action, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Run ``action`` and return ``{"result": ...}``, or ``{"error": ...}`` if it raised."""
+        try:
+            with tool_scope(action.name):
+                if inspect.iscoroutinefunction(action.function):
+                    return {"result": await action.function(**args)}
+                return {"result": await asyncio.to_thread(action.function, **args)}
+        except Exception as e:
+            return {"error": f"Error executing {action.name}: {str(e)}"}
+
+
+@dataclass
+class ActionCall:
+    """One action requested by the model; ``error`` is set when its reply could not be parsed."""
+    name: Optional[str]
+    args: Dict[str, Any] = field(default_factory=dict)
+    id: Optional[str] = None
+    error: Optional[str] = None
+    # Indices of earlier calls in the same reply that must finish (successfully) before this one
+    after: List[int] = field(default_factory=list)
+
+
+class AgentLanguage:
+    """How the agent talks to the model: prompt construction and response parsing."""
+
+    def construct_prompt(self, actions: List[Action], environment: Environment, goals: List[Goal],
+                         memory: Memory) -> Prompt:
+        raise NotImplementedError
+
+    def parse_response(self, response: Any) -> List[ActionCall]:
+        """Actions requested by ``response``; an empty list means the model answered without acting."""
+        raise NotImplementedError
+
+    def format_results(self, response: Any, results: List[ToolCallResult]) -> List[Dict[str, Any]]:
+        """Messages recording ``response`` and the results of its actions in memory."""
+        raise NotImplementedError
+
+    def final_text(self, response: Any) -> str:
+        return response if isinstance(response, str) else (response.get("content") or "")
+
+    @staticmethod
+    def format_goals(goals: List[Goal]) -> str:
+        return "\n\n".join(f"{goal.name}:\n{goal.description.strip()}" for goal in goals)
+
+    def _cached(self, actions: List[Action], goals: List[Goal], build: Callable[[], Any]) -> Any:
+        """
+        ``build()``, rebuilt only when the actions or goals change. Reusing the same
+        system message every turn also lets its cached encoding be reused.
+        """
+        cached = getattr(self, "_built", None)
+        if (cached is None or len(cached[0]) != len(actions) or len(cached[1]) != len(goals)
+                or any(a is not b for a, b in zip(cached[0], actions))
+                or any(a is not b for a, b in zip(cached[1], goals))):
+            cached = self._built = (list(actions), list(goals), build())
+        return cached[2]
+
+
+class AgentJsonActionLanguage(AgentLanguage):
+    """Tools are listed in the system prompt and the model answers with one ```action JSON block."""
+
+    action_format = """
+<Stop and think step by step. Parameters map to args. Insert a rich description of your step by step thoughts here.>
+
+```action
+{
+    "tool_name": "insert tool_name",
+    "args": {...fill in any required arguments here...}
+}
+```"""
+
+    def construct_prompt(self, actions: List[Action], environment: Environment, goals: List[Goal],
+                         memory: Memory) -> Prompt:
+        def build() -> Dict[str, Any]:
+            tools = {a.name: {"description": a.description, "parameters": a.parameters.get("properties", {})}
+                     for a in actions}
+            system = (self.format_goals(goals)
+                      + f"\n\nAvailable tools:\n\n```json\n{json.dumps(tools, indent=4)}\n```\n\n"
+                      + "Important!!! Every response MUST have an action.\n"
+                      + "You must ALWAYS respond in this format:\n" + self.action_format)
+            return {"role": "system", "content": system}
+
+        return Prompt(messages=memory.view([self._cached(actions, goals, build)]), stop_at_fence="action")
+
+    def parse_response(self, response: Any) -> List[ActionCall]:
+        action = self._action_block(response)
+        if isinstance(action, ActionCall):
+            return [action]
+        if not isinstance(action, dict) or "tool_name" not in action:
+            return [ActionCall(None, error="You must respond with a JSON tool invocation.")]
+        return [ActionCall(action["tool_name"], action.get("args") or {})]
+
+    def _action_block(self, response: Any) -> Any:
+        """The parsed JSON of the ```action block, or an error ``ActionCall``."""
+        block = fenced_block(self.final_text(response), "action")
+        if block is None:
+            return ActionCall(None, error="You must respond with a JSON tool invocation in an ```action block.")
+        try:
+            return json.loads(block)
+        except json.JSONDecodeError:
+            return ActionCall(None, error="Invalid JSON response. You must respond with a JSON tool invocation.")
+
+    def format_results(self, response: Any, results: List[ToolCallResult]) -> List[Dict[str, Any]]:
+        return [{"role": "assistant", "content": self.final_text(response)},
+                {"role": "user", "content": json.dumps(results[0].result, default=str)}]
+
+
+class AgentPlanActionLanguage(AgentJsonActionLanguage):
+    """
+    Like ``AgentJsonActionLanguage``, but one ```action block may hold a whole plan:
+    a list of steps run back-to-back in one turn. Steps run in parallel unless
+    ``after`` names earlier steps they must wait for, and the model gets every
+    step's result back in a single message.
+
+    Args:
+        max_steps: Largest plan accepted in one reply
+    """
+
+    action_format = """
+<Stop and think step by step. Parameters map to args. Insert a rich description of your step by step thoughts here.>
+
+```action
+{
+    "plan": [
+        {"id": "<short step id>", "tool_name": "insert tool_name", "args": {...}},
+        {"id": "<short step id>", "tool_name": "insert tool_name", "args": {...}, "after": ["<ids of earlier steps to wait for>"]}
+    ]
+}
+```
+
+Plan every step whose arguments you already know; steps without "after" run in parallel.
+You get the results of all steps at once, then plan again if more work is needed."""
+
+    def __init__(self, max_steps: int = 10):
+        self.max_steps = max_steps
+
+    def parse_response(self, response: Any) -> List[ActionCall]:
+        action = self._action_block(response)
+        if isinstance(action, ActionCall):
+            return [action]
+        if isinstance(action, dict) and "tool_name" in action:
+            # A single action is a one-step plan
+            action = {"plan": [action]}
+        steps = action.get("plan") if isinstance(action, dict) else action
+        if not isinstance(steps, list) or not steps:
+            return [ActionCall(None, error='You must respond with {"plan": [...]} listing at least one '
+                                           'tool invocation.')]
+        if len(steps) > self.max_steps:
+            return [ActionCall(None, error=f"Plans are limited to {self.max_steps} steps.")]
+
+        calls, index = [], {}
+        for i, step in enumerate(steps):
+            if not isinstance(step, dict) or "tool_name" not in step:
+                calls.append(ActionCall(None, id=str(i), error=f"Step {i} is not a JSON tool invocation."))
+                continue
+            step_id = str(step.get("id", i))
+            after, args = step.get("after") or [], step.get("args") or {}
+            if not isinstance(after, list) or not all(isinstance(d, (str, int)) and not isinstance(d, bool)
+                                                      for d in after):
+                calls.append(ActionCall(None, id=step_id, error=f'Step {step_id}: "after" must be a list of step ids.'))
+                continue
+            if not isinstance(args, dict):
+                calls.append(ActionCall(None, id=step_id, error=f'Step {step_id}: "args" must be a JSON object.'))
+                continue
+            unknown = [d for d in after if str(d) not in index]
+            call = ActionCall(step["tool_name"], args, id=step_id,
+                              after=[index[str(d)] for d in after if str(d) in index])
+            if unknown:
+                call.error = f"Step {step_id} waits for {unknown}, which are not earlier steps of the plan."
+            index[step_id] = i
+            calls.append(call)
+        return calls
+
+    def format_results(self, response: Any, results: List[ToolCallResult]) -> List[Dict[str, Any]]:
+        observations = [{"id": r.id, "tool_name": r.name, **r.result} for r in results]
+        return [{"role": "assistant", "content": self.final_text(response)},
+                {"role": "user", "content": json.dumps({"results": observations}, default=str)}]
+
+
+class AgentFunctionCallingActionLanguage(AgentLanguage):
+    """Tools are sent as native ``tools``; every tool call in a turn is executed."""
+
+    def construct_prompt(self, actions: List[Action], environment: Environment, goals: List[Goal],
+                         memory: Memory) -> Prompt:
+        def build() -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+            return {"role": "system", "content": self.format_goals(goals)}, [a.tool_schema() for a in actions]
+
+        system, tools = self._cached(actions, goals, build)
+        return Prompt(messages=memory.view([system]), tools=tools)
+
+    def parse_response(self, response: Any) -> List[ActionCall]:
+        if isinstance(response, str):
+            return []
+        calls = []
+        for call in response.get("tool_calls") or []:
+            name = call["function"]["name"]
+            try:
+                calls.append(ActionCall(name, parse_tool_arguments(call["function"]["arguments"]), id=call["id"]))
+            except ValueError as e:
+                calls.append(ActionCall(name, id=call["id"], error=f"Invalid arguments for {name}: {e}"))
+        return calls
+
+    def format_results(self, response: Any, results: List[ToolCallResult]) -> List[Dict[str, Any]]:
+        return [response] + [r.message() for r in results]
+
+
+def create_llm_function(model: Optional[str] = None, **params) -> Callable[[Prompt], Any]:
+    """
+    Async ``generate_response`` on the shared client.
+
+    Prompts with tools return the assistant message (as a dict, tool calls
+    included). Prompts with a ``response_schema`` return JSON text from
+    ``agenerate_json``. Other prompts return text, streamed and cut off after
+    ``prompt.stop_at_fence`` when it is set.
+    """
+    params.setdefault("max_tokens", 1024)
+
+    async def generate_response(prompt: Prompt) -> Union[str, Dict[str, Any]]:
+        chosen = prompt.model or model
+        call_params = {**params, "model": chosen} if chosen else params
+        if prompt.tools:
+            response = await acompletion(messages=prompt.messages, tools=prompt.tools, **call_params)
+            return assistant_message(response.choices[0].message)
+        if prompt.response_schema is not None:
+            return await agenerate_json(prompt.messages, prompt.response_schema, **call_params)
+        if prompt.stop_at_fence:
+            return await astream_response(prompt.messages, stop_at_fence=prompt.stop_at_fence,
+                                          on_member=prompt.on_member, **call_params)
+        return await agenerate_response(prompt.messages, **call_params)
+
+    return generate_response
+
+
+@dataclass
+class AgentResult:
+    memory: Memory
+    # Result of the terminal action, or the model's text when it stopped calling tools
+    final: Any = None
+    iterations: int = 0
+    terminated: bool = False
+    # "terminated", "answered", "max_iterations", or the budget limit that stopped the run
+    stop_reason: Optional[str] = None
+    # LLM usage of this run (of this invocation only, when resumed)
+    usage: Usage = field(default_factory=Usage)
+
+
+class _Preparations:
+    """The ``Action.prepare`` calls of one run, each started at most once."""
+
+    def __init__(self, registry: ActionRegistry):
+        self.registry = registry
+        self.enabled = any(a.prepare is not None for a in registry.get_actions())
+        self.tasks: Dict[str, asyncio.Future] = {}
+        self._loop = asyncio.get_running_loop()
+
+    def start(self, name: Any) -> None:
+        action = self.registry.get_action(name) if isinstance(name, str) else None
+        if action is None or action.prepare is None or name in self.tasks:
+            return
+        prepare = action.prepare
+        task = asyncio.ensure_future(prepare() if inspect.iscoroutinefunction(prepare) else asyncio.to_thread(prepare))
+        # A failed warm-up is not an error of its own; the tool reports any real problem when it runs
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self.tasks[name] = task
+
+    def on_member(self, key: str, value: Any) -> None:
+        """``Prompt.on_member``: start warming tools up as soon as the streamed reply names them."""
+        if key == "tool_name":
+            names = [value]
+        elif key == "plan" and isinstance(value, list):
+            names = [step.get("tool_name") for step in value if isinstance(step, dict)]
+        else:
+            return
+        for name in names:
+            # May be called from a worker thread when generate_response is sync
+            self._loop.call_soon_threadsafe(self.start, name)
+
+    async def wait(self, name: Optional[str]) -> None:
+        self.start(name)
+        task = self.tasks.get(name)
+        if task is not None:
+            # asyncio.wait, unlike awaiting the task, leaves it running for parallel calls if we are cancelled
+            await asyncio.wait([task])
+
+    def cancel(self) -> None:
+        for task in self.tasks.values():
+            task.cancel()
+
+
+class Agent:
+    """
+    Goal-driven agent loop.
+
+    Args:
+        goals: What the agent is for; rendered into the system prompt
+        agent_language: Prompt construction and response parsing strategy
+        action_registry: Tools the agent may call
+        generate_response: ``(Prompt) -> str | message dict``, sync or async. Sync
+            functions run in a worker thread.
+        environment: Executes actions
+        max_iterations: Model calls per run before giving up
+        on_action: Called with each ``ToolCallResult`` as it completes (e.g. to print progress)
+        budget: Token, deadline and cost limits applied to every run, or None for none
+        memory_factory: Creates the memory of new runs, e.g. a ``CompactingMemory`` for long sessions
+    """
+
+    def __init__(self, goals: List[Goal], agent_language: AgentLanguage, action_registry: ActionRegistry,
+                 generate_response: Callable[[Prompt], Any], environment: Optional[Environment] = None,
+                 max_iterations: int = 10, on_action: Optional[Callable[[ToolCallResult], None]] = None,
+                 budget: Optional[Budget] = None, memory_factory: Callable[[], Memory] = Memory):
+        self.goals = goals
+        self.agent_language = agent_language
+        self.action_registry = action_registry
+        self.generate_response = generate_response
+        self.environment = environment or Environment()
+        self.max_iterations = max_iterations
+        self.on_action = on_action
+        self.budget = budget
+        self.memory_factory = memory_factory
+
+    def clone(self, **overrides) -> "Agent":
+        """A copy of this agent with some constructor arguments replaced."""
+        kwargs = dict(goals=self.goals, agent_language=self.agent_language, action_registry=self.action_registry,
+                      generate_response=self.generate_response, environment=self.environment,
+                      max_iterations=self.max_iterations, on_action=self.on_action, budget=self.budget,
+                      memory_factory=self.memory_factory)
+        kwargs.update(overrides)
+        return Agent(**kwargs)
+
+    async def _generate(self, prompt: Prompt) -> Any:
+        if inspect.iscoroutinefunction(self.generate_response):
+            return await self.generate_response(prompt)
+        return await asyncio.to_thread(self.generate_response, prompt)
+
+    async def _execute(self, call: ActionCall, iteration: int, index: int, checkpoint: Optional["Checkpoint"],
+                       preparations: _Preparations,
+                       after: Sequence[Awaitable[ToolCallResult]] = ()) -> ToolCallResult:
+        if after:
+            failed = [r.id or r.name for r in await asyncio.gather(*after) if "error" in r.result]
+            if failed and call.error is None:
+                call = replace(call, error=f"Skipped because {', '.join(failed)} failed.")
+        action = self.action_registry.get_action(call.name)
+        if call.error is not None:
+            result = {"error": call.error}
+        elif action is None:
+            result = {"error": f"Unknown tool: {call.name}"}
+        else:
+            if action.prepare is not None:
+                await preparations.wait(action.name)
+            result = await self.environment.execute_action(action, call.args)
+        outcome = ToolCallResult(id=call.id, name=call.name or "error", args=call.args, result=result)
+        if checkpoint is not None:
+            checkpoint.record_result(iteration, index, outcome)
+        if self.on_action is not None:
+            self.on_action(outcome)
+        return outcome
+
+    async def _recorded(self, result: ToolCallResult) -> ToolCallResult:
+        return result
+
+    def _finish(self, run: AgentResult, checkpoint: Optional["Checkpoint"]) -> AgentResult:
+        if checkpoint is not None:
+            checkpoint.finish(run.final, run.terminated)
+        return run
+
+    async def run(self, user_input: str, memory: Optional[Memory] = None, max_iterations: Optional[int] = None,
+                  checkpoint: Optional["Checkpoint"] = None, budget: Optional[Budget] = None) -> AgentResult:
+        """
+        Work on ``user_input`` until a terminal action, a reply without actions,
+        the iteration limit or an exhausted budget.
+
+        Args:
+            user_input: The task, appended to memory as a user message
+            memory: Existing session memory to continue, or None to start fresh
+            max_iterations: Overrides the agent's limit for this run
+            checkpoint: Journal that every step is recorded to, for ``resume`` after a crash
+            budget: Overrides the agent's budget for this run
+
+        Returns:
+            The session's memory and how the run ended
+        """
+        run = AgentResult(memory=memory if memory is not None else self.memory_factory())
+        if checkpoint is not None:
+            checkpoint.start(user_input, run.memory.get_memories())
+        run.memory.add_memory({"role": "user", "content": user_input})
+        return await self._budgeted(run, max_iterations or self.max_iterations, checkpoint, None, budget or self.budget)
+
+    async def resume(self, checkpoint: "Checkpoint", max_iterations: Optional[int] = None,
+                     budget: Optional[Budget] = None) -> AgentResult:
+        """
+        Continue a checkpointed run where it stopped. A pending reply is acted on
+        without calling the model again, and only its unrecorded tool calls run.
+        """
+        state = checkpoint.load()
+        memory = self.memory_factory()
+        memory.extend(state.memory)
+        run = AgentResult(memory=memory, final=state.final, iterations=state.iterations,
+                          terminated=state.terminated)
+        if state.finished:
+            return run
+        return await self._budgeted(run, max_iterations or self.max_iterations, checkpoint, state.pending,
+                                    budget or self.budget)
+
+    async def _budgeted(self, run: AgentResult, limit: int, checkpoint: Optional["Checkpoint"],
+                        pending: Optional[Tuple[Any, Dict[int, ToolCallResult]]],
+                        budget: Optional[Budget]) -> AgentResult:
+        preparations = _Preparations(self.action_registry)
+        with track_usage() as run.usage:
+            loop = self._loop(run, limit, checkpoint, pending, budget, time.monotonic(), preparations)
+            try:
+                if budget is None or not budget.deadline:
+                    return await loop
+                # Not wait_for: a TimeoutError raised inside a step (an HTTP timeout, say) is an
+                # error of the run, not the deadline passing
+                task = asyncio.ensure_future(loop)
+                try:
+                    done, _ = await asyncio.wait({task}, timeout=budget.deadline)
+                finally:
+                    if not task.done():
+                        # Cancels the in-flight LLM and tool calls along with the loop
+                        task.cancel()
+                        await asyncio.gather(task, return_exceptions=True)
+                if not done:
+                    # The checkpoint is left open, so the run can be resumed with a fresh budget
+                    run.stop_reason = "deadline"
+                    return run
+                return task.result()
+            finally:
+                preparations.cancel()
+                if budget is not None and (budget.max_tokens or budget.max_cost) and run.iterations \
+                        and not run.usage.records:
+                    warnings.warn("The run's budget saw no LLM calls, so its token and cost limits were not "
+                                  "enforced; generate_response must call the model through agent_core.llm.",
+                                  RuntimeWarning, stacklevel=2)
+
+    async def _loop(self, run: AgentResult, limit: int, checkpoint: Optional["Checkpoint"],
+                    pending: Optional[Tuple[Any, Dict[int, ToolCallResult]]], budget: Optional[Budget],
+                    started: float, preparations: _Preparations) -> AgentResult:
+        while run.iterations < limit or pending is not None:
+            if pending is not None:
+                response, recorded = pending
+                pending = None
+            else:
+                elapsed = time.monotonic() - started
+                exhausted = budget.exhausted(run.usage, elapsed) if budget is not None else None
+                if exhausted:
+                    run.stop_reason = exhausted
+                    return self._finish(run, checkpoint)
+                run.iterations += 1
+                await run.memory.compact()
+                prompt = self.agent_language.construct_prompt(self.action_registry.get_actions(), self.environment,
+                                                              self.goals, run.memory)
+                if budget is not None and budget.nearly_exhausted(run.usage, elapsed):
+                    prompt.messages.append({"role": "user", "content": WRAP_UP_PROMPT})
+                if preparations.enabled:
+                    prompt.on_member = preparations.on_member
+                response = await self._generate(prompt)
+                recorded = {}
+                if checkpoint is not None:
+                    checkpoint.record_response(run.iterations, response)
+
+            calls = self.agent_language.parse_response(response)
+            if not calls:
+                run.final = self.agent_language.final_text(response)
+                message = {"role": "assistant", "content": run.final}
+                run.memory.add_memory(message)
+                if checkpoint is not None:
+                    checkpoint.record_step(run.iterations, [message])
+                run.stop_reason = "answered"
+                return self._finish(run, checkpoint)
+
+            # Every action requested in this turn runs concurrently, except that a call first waits
+            # for the earlier calls it lists in ``after``; results keep call order
+            tasks: List[asyncio.Future] = []
+            for i, call in enumerate(calls):
+                tasks.append(asyncio.ensure_future(
+                    self._recorded(recorded[i]) if i in recorded
+                    else self._execute(call, run.iterations, i, checkpoint, preparations,
+                                       [tasks[j] for j in call.after])))
+            results = await asyncio.gather(*tasks)
+            messages = self.agent_language.format_results(response, results)
+            run.memory.extend(messages)
+            if checkpoint is not None:
+                checkpoint.record_step(run.iterations, messages)
+
+            # Decided from what actually ran: a terminal step that failed or was skipped (because a step
+            # it waited for failed) does not end the run
+            terminal = next((r for r in results
+                             if getattr(self.action_registry.get_action(r.name), "terminal", False)
+                             and "error" not in r.result), None)
+            if terminal is not None:
+                final = terminal.result.get("result")
+                run.final = final if final is not None else terminal.args.get("message")
+                run.terminated = True
+                run.stop_reason = "terminated"
+                return self._finish(run, checkpoint)
+        run.stop_reason = "max_iterations"
+        return self._finish(run, checkpoint)
+
+    def run_sync(self, user_input: str, **kwargs) -> AgentResult:
+        """Blocking ``run`` for scripts."""
+        return asyncio.run(self.run(user_input, **kwargs))
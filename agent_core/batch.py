@@ -0,0 +1,180 @@
+"""
+Batch task runner.
+
+Feeds a JSONL file (or stdin) of tasks through an ``Agent`` with a pool of
+concurrent workers, in one process instead of one process per task::
+
+    python -m agent_core.batch "AI Agents and Agentic AI with Python & Generative AI/agentWithTools.py:agent" \\
+        tasks.jsonl -o results.jsonl --concurrency 32
+
+Each input line is ``{"task": "...", "id": ...}``, a JSON string, or plain
+text. Results are appended to the output as each task finishes, so they are
+not in input order; every result carries the input line ``index``. After a
+crash, ``--resume`` skips the indices that already succeeded in the output
+file (failed tasks run again and append a new result line), and
+``--offset N`` skips the first N input lines. With ``--checkpoint-dir`` every
+task also journals its steps, so tasks that were mid-run when the process died
+resume without repeating LLM calls or tool side effects. A throughput and token usage
+summary goes to stderr at the end.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Dict, IO, Iterator, List, Optional, Set, TextIO, Tuple
+
+from agent_core.agent import Agent
+from agent_core.checkpoint import Checkpoint
+from agent_core.metrics import track_usage
+
+def parse_task(line: str) -> Tuple[Optional[Any], str]:
+    """``(id, task)`` from one input line."""
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None, line
+    if isinstance(data, dict):
+        return data.get("id"), str(data.get("task") or data.get("content") or "")
+    if isinstance(data, str):
+        return None, data
+    return None, line
+
+
+def read_tasks(stream: TextIO, offset: int = 0, skip: Optional[Set[int]] = None) -> Iterator[Tuple[int, Any, str]]:
+    """``(index, id, task)`` for every non-blank line from ``offset`` on, minus the indices in ``skip``."""
+    for index, line in enumerate(stream):
+        line = line.strip()
+        if index < offset or not line or (skip and index in skip):
+            continue
+        task_id, task = parse_task(line)
+        yield index, task_id, task
+
+
+def completed_indices(path: str) -> Set[int]:
+    """Indices recorded without an error in a results file (ignoring a torn last line)."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+                if "error" not in result:
+                    done.add(result["index"])
+            except (ValueError, KeyError, TypeError):
+                pass
+    return done
+
+
+async def run_batch(agent: Agent, tasks: Iterator[Tuple[int, Any, str]], output: IO[str], concurrency: int = 8,
+                    timeout: Optional[float] = None, max_iterations: Optional[int] = None,
+                    checkpoint_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run ``tasks`` through ``agent`` with ``concurrency`` workers, writing one JSON
+    line per task to ``output`` as it finishes.
+
+    With ``checkpoint_dir``, each task is journaled to ``<index>.jsonl`` there
+    while it runs and resumed from that journal if it exists.
+
+    Returns:
+        Batch summary: counts, elapsed time, tasks/min and token usage
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    summary = {"tasks": 0, "failed": 0, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0}
+    started = time.perf_counter()
+
+    async def run_one(index: int, task_id: Any, task: str) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"index": index, "id": task_id, "task": task}
+        checkpoint = Checkpoint(os.path.join(checkpoint_dir, f"{index}.jsonl")) if checkpoint_dir else None
+        task_started = time.perf_counter()
+        with track_usage() as usage:
+            try:
+                if checkpoint is not None and checkpoint.exists():
+                    coro = agent.resume(checkpoint, max_iterations=max_iterations)
+                else:
+                    coro = agent.run(task, max_iterations=max_iterations, checkpoint=checkpoint)
+                run = await asyncio.wait_for(coro, timeout)
+                result.update(result=run.final, terminated=run.terminated, iterations=run.iterations)
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+        result["latency_s"] = round(time.perf_counter() - task_started, 3)
+        result["usage"] = asdict(usage)
+        return result
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            result = await run_one(*item)
+            output.write(json.dumps(result, default=str) + "\n")
+            output.flush()
+            if checkpoint_dir and "error" not in result:
+                # The results file is the record from here on
+                os.remove(os.path.join(checkpoint_dir, f"{item[0]}.jsonl"))
+            summary["tasks"] += 1
+            summary["failed"] += "error" in result
+            for key in ("llm_calls", "prompt_tokens", "completion_tokens", "cost"):
+                summary[key] += result["usage"][key]
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for item in tasks:
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for w in workers:
+            w.cancel()
+
+    elapsed = time.perf_counter() - started
+    summary["elapsed_s"] = round(elapsed, 3)
+    summary["tasks_per_min"] = round(summary["tasks"] / elapsed * 60, 1) if elapsed else None
+    summary["tokens_per_task"] = (round((summary["prompt_tokens"] + summary["completion_tokens"]) / summary["tasks"], 1)
+                                  if summary["tasks"] else None)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from agent_core.server import load_agent
+
+    parser = argparse.ArgumentParser(description="Run a JSONL file of tasks through an agent.")
+    parser.add_argument("agent", help="Agent to run, as path/to/script.py:name or module:name")
+    parser.add_argument("tasks", nargs="?", default="-", help="JSONL file of tasks (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Results JSONL file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Tasks running at once")
+    parser.add_argument("--timeout", type=float, help="Per-task timeout in seconds")
+    parser.add_argument("--max-iterations", type=int, help="Override the agent's iteration limit")
+    parser.add_argument("--offset", type=int, default=0, help="Skip the first N input lines")
+    parser.add_argument("--resume", action="store_true", help="Skip tasks that already succeeded in the output file")
+    parser.add_argument("--checkpoint-dir", help="Journal running tasks here and resume them after a crash")
+    args = parser.parse_args(argv)
+
+    if args.resume and args.output == "-":
+        parser.error("--resume needs an --output file")
+    skip = completed_indices(args.output) if args.resume else set()
+
+    agent = load_agent(args.agent)
+    source = sys.stdin if args.tasks == "-" else open(args.tasks, "r")
+    output = sys.stdout if args.output == "-" else open(args.output, "a")
+    try:
+        summary = asyncio.run(run_batch(agent, read_tasks(source, args.offset, skip), output,
+                                        concurrency=args.concurrency, timeout=args.timeout,
+                                        max_iterations=args.max_iterations,
+                                        checkpoint_dir=args.checkpoint_dir))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    if skip:
+        summary["skipped"] = len(skip)
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Resource budgets for agent runs.
+
+``max_iterations`` says nothing about what a run actually costs: one iteration
+can send a few hundred tokens or tens of thousands. A ``Budget`` caps a run
+by total tokens, wall-clock time and dollar cost, measured live from the
+``CallRecord`` of every LLM call the run makes. Past ``wrap_up_at`` of any limit
+the agent is told to finish up; at the limit the run stops. When the deadline
+passes, the run is cancelled along with its in-flight LLM calls and async
+tools. Sync tools already running in a worker thread finish in the
+background, and their results are discarded.
+
+``Budget.from_env()`` is the default the scripts use: 50,000 tokens and five
+minutes unless ``AGENT_BUDGET_MAX_TOKENS``, ``AGENT_BUDGET_DEADLINE`` or
+``AGENT_BUDGET_MAX_COST`` say otherwise (0 turns a limit off).
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from agent_core.metrics import Usage
+
+
+@dataclass
+class Budget:
+    """
+    Args:
+        max_tokens: Prompt plus completion tokens over the whole run
+        deadline: Seconds of wall-clock time for the run
+        max_cost: Dollars over the whole run (calls litellm cannot price count as free)
+        wrap_up_at: Fraction of any limit after which the model is asked to wrap up
+    """
+    max_tokens: Optional[int] = None
+    deadline: Optional[float] = None
+    max_cost: Optional[float] = None
+    wrap_up_at: float = 0.8
+
+    @classmethod
+    def from_env(cls) -> "Budget":
+        """
+        Budget from ``AGENT_BUDGET_MAX_TOKENS`` (default 50000), ``AGENT_BUDGET_DEADLINE``
+        (seconds, default 300) and ``AGENT_BUDGET_MAX_COST`` (dollars, default none).
+        """
+        max_tokens = int(os.getenv("AGENT_BUDGET_MAX_TOKENS", "50000"))
+        deadline = float(os.getenv("AGENT_BUDGET_DEADLINE", "300"))
+        max_cost = float(os.getenv("AGENT_BUDGET_MAX_COST", "0"))
+        return cls(max_tokens=max_tokens or None, deadline=deadline or None, max_cost=max_cost or None)
+
+    def _fractions(self, usage: Usage, elapsed: float):
+        if self.max_tokens:
+            yield "tokens", usage.total_tokens / self.max_tokens
+        if self.deadline:
+            yield "deadline", elapsed / self.deadline
+        if self.max_cost:
+            yield "cost", usage.cost / self.max_cost
+
+    def exhausted(self, usage: Usage, elapsed: float) -> Optional[str]:
+        """Name of the first limit that has been reached, or None."""
+        return next((name for name, used in self._fractions(usage, elapsed) if used >= 1), None)
+
+    def nearly_exhausted(self, usage: Usage, elapsed: float) -> bool:
+        return any(used >= self.wrap_up_at for _, used in self._fractions(usage, elapsed))
@@ -0,0 +1,156 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "agent_core")
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed store for LLM responses.
+
+    Entries live in a single SQLite file keyed by the hash computed in
+    ``agent_core.llm.cache_key``. The cache is bounded both by entry count and
+    by total payload size; when either limit is exceeded the least recently
+    used entries are evicted. Entries older than ``ttl_seconds`` are treated
+    as misses and removed on access.
+
+    Args:
+        path: Location of the SQLite file
+        max_entries: Maximum number of stored responses
+        max_bytes: Maximum total size of the stored payloads
+        ttl_seconds: Time-to-live for an entry, or None to keep entries until evicted
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10_000,
+                 max_bytes: int = 256 * 1024 * 1024, ttl_seconds: Optional[float] = None):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "responses.sqlite3")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """
+        Build the default cache from environment variables.
+
+        ``AGENT_LLM_CACHE=off`` disables caching entirely, ``AGENT_LLM_CACHE_DIR``
+        overrides the storage directory and ``AGENT_LLM_CACHE_TTL`` sets the
+        time-to-live in seconds.
+        """
+        if os.getenv("AGENT_LLM_CACHE", "on").lower() in ("0", "off", "false", "no"):
+            return None
+        directory = os.getenv("AGENT_LLM_CACHE_DIR", DEFAULT_CACHE_DIR)
+        ttl = os.getenv("AGENT_LLM_CACHE_TTL")
+        return cls(path=os.path.join(directory, "responses.sqlite3"),
+                   ttl_seconds=float(ttl) if ttl else None)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached payload for ``key``, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            payload, created = row
+            if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                self.evictions += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(payload)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store ``value`` under ``key`` and evict entries beyond the configured bounds."""
+        payload = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until both bounds hold. Caller holds the lock."""
+        if self.ttl_seconds is not None:
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,)
+            )
+            self.evictions += cursor.rowcount
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters along with the current size of the cache."""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,184 @@
+"""
+Crash-safe checkpoints for agent runs.
+
+A run's progress is journaled to an append-only JSONL file, one compact line
+per event:
+
+- ``start``: memory before the run and the user input
+- ``response``: the model's reply for an iteration (the pending action)
+- ``result``: one tool call's result, written as soon as the tool returns
+- ``step``: the messages the iteration added to memory
+- ``end``: the outcome of the run
+
+Appending a line per step keeps checkpoints cheap however long memory gets.
+``Agent.resume`` rebuilds the state from the journal and continues from the
+exact point where the run stopped. A reply that was already received is not
+requested again, and a tool whose result was recorded is not run again.
+``validate_checkpoint`` checks a journal for tools that ran twice::
+
+    python -m agent_core.checkpoint validate run.ckpt.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent_core.tools import ToolCallResult
+
+
+@dataclass
+class CheckpointState:
+    """A run as reconstructed from its journal."""
+    memory: List[Dict[str, Any]] = field(default_factory=list)
+    iterations: int = 0
+    # Reply whose actions had not all been recorded, with the results that were (by call index)
+    pending: Optional[Tuple[Any, Dict[int, ToolCallResult]]] = None
+    finished: bool = False
+    final: Any = None
+    terminated: bool = False
+
+
+class Checkpoint:
+    """
+    Journal of one agent run.
+
+    Args:
+        path: JSONL file to append to (created on first write)
+        fsync: Force every line to disk, surviving machine crashes rather than
+            only process crashes, at the cost of a sync per step
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def _append(self, event: Dict[str, Any]) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(event, separators=(",", ":"), default=str) + "\n")
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def start(self, user_input: str, memory: List[Dict[str, Any]]) -> None:
+        self._append({"t": "start", "input": user_input, "memory": memory})
+
+    def record_response(self, iteration: int, response: Any) -> None:
+        self._append({"t": "response", "i": iteration, "response": response})
+
+    def record_result(self, iteration: int, index: int, result: ToolCallResult) -> None:
+        self._append({"t": "result", "i": iteration, "n": index, "call": asdict(result)})
+
+    def record_step(self, iteration: int, messages: List[Dict[str, Any]]) -> None:
+        self._append({"t": "step", "i": iteration, "messages": messages})
+
+    def finish(self, final: Any, terminated: bool) -> None:
+        self._append({"t": "end", "final": final, "terminated": terminated})
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Journal entries in order; a line torn by a crash mid-write is dropped."""
+        events = []
+        if not os.path.exists(self.path):
+            return events
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    break
+        return events
+
+    def load(self) -> CheckpointState:
+        state = CheckpointState()
+        response, results = None, {}
+        for event in self.events():
+            kind = event["t"]
+            if kind == "start":
+                # A journal reused for another run: only the latest run counts
+                state = CheckpointState(memory=event["memory"] + [{"role": "user", "content": event["input"]}])
+                response, results = None, {}
+            elif kind == "response":
+                state.iterations = event["i"]
+                response, results = event["response"], {}
+            elif kind == "result":
+                results[event["n"]] = ToolCallResult(**event["call"])
+            elif kind == "step":
+                state.memory.extend(event["messages"])
+                response, results = None, {}
+            elif kind == "end":
+                state.finished, state.final, state.terminated = True, event["final"], event["terminated"]
+        if response is not None and not state.finished:
+            state.pending = (response, results)
+        return state
+
+
+def validate_checkpoint(path: str) -> List[str]:
+    """
+    Check a journal for re-executed side effects.
+
+    Returns:
+        Problems found: tool calls recorded more than once, results without a
+        reply that asked for them, iterations replayed after being completed.
+        Empty for a clean journal.
+    """
+    problems = []
+    seen_results: Counter = Counter()
+    completed, responded = set(), set()
+    for event in Checkpoint(path).events():
+        kind, iteration = event["t"], event.get("i")
+        if kind == "start":
+            # Iterations are numbered per run
+            seen_results.clear()
+            completed, responded = set(), set()
+        elif kind == "response":
+            if iteration in completed or iteration in responded:
+                problems.append(f"iteration {iteration}: model reply requested again")
+            responded.add(iteration)
+        elif kind == "result":
+            key = (iteration, event["n"])
+            seen_results[key] += 1
+            if iteration not in responded:
+                problems.append(f"iteration {iteration}: result for call {event['n']} without a reply")
+            if seen_results[key] == 2:
+                problems.append(f"iteration {iteration}: tool call {event['n']} ({event['call']['name']}) executed more than once")
+        elif kind == "step":
+            completed.add(iteration)
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect agent run checkpoints.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    validate = commands.add_parser("validate", help="Check that no tool call was executed twice")
+    validate.add_argument("paths", nargs="+")
+    show = commands.add_parser("show", help="Print the state a resume would start from")
+    show.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        state = Checkpoint(args.path).load()
+        print(json.dumps({"iterations": state.iterations, "messages": len(state.memory),
+                          "pending": state.pending is not None, "finished": state.finished,
+                          "final": state.final}, default=str))
+        return
+
+    failed = False
+    for path in args.paths:
+        problems = validate_checkpoint(path)
+        failed = failed or bool(problems)
+        for problem in problems:
+            print(f"{path}: {problem}")
+    if not failed:
+        print(f"{len(args.paths)} checkpoint(s) OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Hedged requests, provider failover and circuit breaking.
+
+Tail latency from a single provider dominates end-to-end agent time. With a
+``HedgingPolicy`` configured, ``LLMClient`` starts the primary model and, if it
+has not answered by its rolling p95 latency, fires the same request at a
+fallback model and takes whichever answers first. A per-model circuit breaker
+stops sending traffic to a model whose error rate or latency has degraded and
+fails over to the next healthy one until a probe call succeeds again.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from agent_core.metrics import percentile
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when every candidate model for a call has an open circuit."""
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """
+    Whether trying another model could help: server errors, timeouts, rate limits
+    and connection failures. Client errors (bad request, auth, ...) are not retried.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return True
+    return status >= 500 or status in (408, 429)
+
+
+class ModelHealth:
+    """
+    Rolling window of outcomes for one model plus its circuit state.
+
+    Args:
+        window: Seconds of history kept
+        min_calls: Calls needed in the window before the breaker may open
+        max_error_rate: Error rate above which the breaker opens
+        max_latency: Latency (seconds) at ``latency_percentile`` above which the breaker opens
+        latency_percentile: Percentile checked against ``max_latency``
+        cooldown: Seconds an open breaker waits before letting a probe call through
+    """
+
+    def __init__(self, window: float = 60.0, min_calls: int = 10, max_error_rate: float = 0.5,
+                 max_latency: Optional[float] = None, latency_percentile: float = 95, cooldown: float = 30.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.max_error_rate = max_error_rate
+        self.max_latency = max_latency
+        self.latency_percentile = latency_percentile
+        self.cooldown = cooldown
+        self.samples: Deque[Tuple[float, bool, float]] = deque()
+        self.opened_at: Optional[float] = None
+        self.probe_started: Optional[float] = None
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        while self.samples and now - self.samples[0][0] > self.window:
+            self.samples.popleft()
+
+    def allow(self) -> bool:
+        """
+        Whether a call may be sent. An open breaker lets one probe through per
+        cooldown period; a probe that never reports back does not block the next one.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if now - self.opened_at < self.cooldown:
+                return False
+            if self.probe_started is not None and now - self.probe_started < self.cooldown:
+                return False
+            self.probe_started = now
+            return True
+
+    def record(self, ok: bool, latency: float) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self.opened_at is not None:
+                # Outcome of the half-open probe decides whether the circuit closes again
+                self.probe_started = None
+                if ok:
+                    self.opened_at = None
+                    self.samples.clear()
+                else:
+                    self.opened_at = now
+                return
+
+            self.samples.append((now, ok, latency))
+            self._trim(now)
+            if len(self.samples) < self.min_calls:
+                return
+            errors = sum(1 for _, success, _ in self.samples if not success)
+            slow = False
+            if self.max_latency is not None:
+                latencies = [lat for _, success, lat in self.samples if success]
+                p = percentile(latencies, self.latency_percentile)
+                slow = p is not None and p > self.max_latency
+            if errors / len(self.samples) > self.max_error_rate or slow:
+                self.opened_at = now
+                self.trips += 1
+
+    def latency_percentile_of(self, q: float) -> Optional[float]:
+        """Percentile of recent successful latencies, or None without enough history."""
+        with self._lock:
+            self._trim(time.monotonic())
+            latencies = [lat for _, ok, lat in self.samples if ok]
+        return percentile(latencies, q) if len(latencies) >= self.min_calls else None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.probe_started is not None else "open"
+
+
+class HedgingPolicy:
+    """
+    Which models back each other up, and when to hedge.
+
+    Args:
+        fallbacks: Primary model -> fallback models, tried in order. The key "*"
+            applies to models without an explicit entry.
+        hedge_percentile: A hedge is sent once the primary has been running longer
+            than this percentile of its recent latencies
+        default_hedge_delay: Hedge delay (seconds) while there is too little history,
+            or None to not hedge until history exists
+        **health: Passed to every ``ModelHealth`` (window, min_calls, max_error_rate, ...)
+    """
+
+    def __init__(self, fallbacks: Dict[str, List[str]], hedge_percentile: float = 95,
+                 default_hedge_delay: Optional[float] = None, **health):
+        self.fallbacks = fallbacks
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.health_options = health
+        self.hedges = 0
+        self.failovers = 0
+        self._health: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["HedgingPolicy"]:
+        """
+        Policy from ``AGENT_LLM_FALLBACK_MODELS`` (comma-separated, used for every model),
+        or None when it is not set.
+        """
+        models = [m.strip() for m in os.getenv("AGENT_LLM_FALLBACK_MODELS", "").split(",") if m.strip()]
+        if not models:
+            return None
+        delay = os.getenv("AGENT_LLM_HEDGE_DELAY")
+        return cls(fallbacks={"*": models}, default_hedge_delay=float(delay) if delay else None)
+
+    def health(self, model: str) -> ModelHealth:
+        with self._lock:
+            health = self._health.get(model)
+            if health is None:
+                health = self._health[model] = ModelHealth(**self.health_options)
+            return health
+
+    def candidates(self, model: str) -> List[str]:
+        """
+        The primary model followed by its fallbacks. Circuits are not checked here:
+        ``allow()`` may hand out a half-open probe, so call it only for a model that
+        is about to be sent a request.
+        """
+        return [model] + [m for m in self.fallbacks.get(model, self.fallbacks.get("*", [])) if m != model]
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait on ``model`` before hedging, or None to never hedge it."""
+        delay = self.health(model).latency_percentile_of(self.hedge_percentile)
+        return delay if delay is not None else self.default_hedge_delay
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            health = dict(self._health)
+        return {
+            "hedges": self.hedges,
+            "failovers": self.failovers,
+            "models": {model: {"state": h.state, "trips": h.trips} for model, h in health.items()},
+        }
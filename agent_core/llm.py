@@ -0,0 +1,949 @@
+"""
+Shared LLM client for the course scripts.
+
+The scripts used to call litellm's ``completion`` directly, so identical prompts
+were sent to the provider on every run. ``LLMClient`` wraps that call and puts a
+persistent response cache in front of it. Only deterministic requests
+(temperature 0 or a fixed seed) are cached unless a call opts in, so sampled
+calls still vary from run to run.
+"""
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from agent_core.cache import ResponseCache
+from agent_core.hedging import CircuitOpenError, HedgingPolicy, is_failover_error
+from agent_core.messages import count_tokens, encode, encode_messages, json_default
+from agent_core.metrics import CallObservation, Metrics, count_usage, get_metrics, tracking_usage
+from agent_core.ratelimit import (
+    ModelLimiter,
+    RateLimiter,
+    estimate_tokens,
+    get_rate_limiter,
+    is_rate_limit_error,
+    response_headers,
+)
+from agent_core.router import ModelRouter, get_router
+from agent_core.schema import compile_schema
+from agent_core.singleflight import SingleFlight
+from agent_core.streaming import FENCE, JSON_BLOCKS, FenceDetector, aclose_stream, chunk_text, close_stream
+from agent_core.structured import schema_instruction, structured_mode, structured_params, structured_text
+
+
+DEFAULT_MODEL = "groq/llama-3.3-70b-versatile"
+
+
+def cache_key(model: str, messages: List[Dict], tools: Optional[List[Dict]] = None, **params) -> str:
+    """Hash everything that determines a completion into a stable cache key."""
+    # Same bytes as encoding {"messages", "model", "params", "tools"} in one go, but a MessageLog
+    # supplies the messages from its cache instead of serializing the whole history again
+    blob = (f'{{"messages":{encode_messages(messages)},"model":{encode(model)},'
+            f'"params":{encode(params)},"tools":{encode(tools)}}}')
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def response_to_dict(response: Any) -> Dict[str, Any]:
+    """Convert a litellm response into plain JSON-serializable data."""
+    if isinstance(response, dict):
+        return response
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    return json.loads(json.dumps(response, default=json_default))
+
+
+def _total_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+
+def _fence_detector(stop_at_fence: Optional[str],
+                    on_member: Optional[Callable[[str, Any], None]]) -> Optional[FenceDetector]:
+    if not stop_at_fence:
+        return None
+    return FenceDetector(stop_at_fence, parse_json=stop_at_fence in JSON_BLOCKS, on_member=on_member)
+
+
+def _streamed_text(parts: List[str], detector: Optional[FenceDetector]) -> str:
+    """Text of a stream, truncated after the target fenced block if one was found."""
+    if detector is not None and detector.end is not None:
+        text = detector.text[:detector.end].strip()
+        # A JSON body completes before its closing fence arrives; close the block so the text still parses
+        return text if text.endswith(FENCE) else text + "\n" + FENCE
+    return "".join(parts).strip()
+
+
+def _cached_text(cached: Dict[str, Any], stop_at_fence: Optional[str],
+                 on_member: Optional[Callable[[str, Any], None]]) -> str:
+    text = cached["choices"][0]["message"]["content"]
+    detector = _fence_detector(stop_at_fence, on_member) if on_member is not None else None
+    if detector is not None:
+        # Report members of a cached reply just like those of a streamed one. Without a fence to
+        # watch there are no members, as on the uncached path.
+        detector.feed(text)
+    return text
+
+
+def _cacheable(request: Dict[str, Any], use_cache: Optional[bool]) -> bool:
+    """``use_cache`` if given, else whether the request is deterministic (temperature 0 or a seed)."""
+    if use_cache is not None:
+        return use_cache
+    return request.get("temperature") == 0 or request.get("seed") is not None
+
+
+def _text_response(text: str, usage: Any = None) -> Dict[str, Any]:
+    """Minimal response payload used to cache streamed text."""
+    response = {"choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": text}}]}
+    if usage is not None:
+        response["usage"] = response_to_dict(usage) if not isinstance(usage, dict) else usage
+    return response
+
+
+def _stream_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """``request`` as a stream whose last chunk reports the call's token usage."""
+    return {"stream_options": {"include_usage": True}, **request, "stream": True}
+
+
+def _estimated_usage(request: Dict[str, Any], text: str) -> Dict[str, int]:
+    """Rough usage for streams that ended before the provider reported any (e.g. cut off early)."""
+    prompt_tokens = count_tokens(request["messages"])
+    completion_tokens = len(text) // 4
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+class _StreamPermit:
+    """
+    A rate-limiter permit held by a streamed call. It is released once, when the
+    stream is exhausted, fails or is closed. The token estimate is then reconciled
+    with the usage the stream reported, or else with the text actually read.
+    """
+
+    def __init__(self, limiter: ModelLimiter, estimate: int, request: Dict[str, Any], stream: Any):
+        self.limiter = limiter
+        self.estimate = estimate
+        self.prompt_tokens = count_tokens(request["messages"])
+        self.stream = stream
+        self.chars = 0
+        self.usage: Any = None
+        self.released = False
+
+    def observe(self, chunk: Any) -> None:
+        self.chars += len(chunk_text(chunk))
+        self.usage = getattr(chunk, "usage", None) or self.usage
+
+    def release(self, error: Optional[BaseException] = None) -> None:
+        if self.released:
+            return
+        self.released = True
+        if error is None:
+            usage = self.usage
+            used = usage.get("total_tokens") if isinstance(usage, dict) else getattr(usage, "total_tokens", None)
+            self.limiter.on_success(self.estimate, used or self.prompt_tokens + self.chars // 4,
+                                    response_headers(self.stream))
+        elif is_rate_limit_error(error):
+            self.limiter.on_rate_limited(response_headers(error))
+        else:
+            self.limiter.on_error()
+
+
+class _HeldStream:
+    """Sync provider stream that holds its ``_StreamPermit`` until it ends or is closed."""
+
+    def __init__(self, stream: Any, permit: _StreamPermit):
+        self.stream = stream
+        self.permit = permit
+        self._chunks = iter(stream)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.permit.release()
+            raise
+        except BaseException as e:
+            self.permit.release(e)
+            raise
+        self.permit.observe(chunk)
+        return chunk
+
+    def close(self) -> None:
+        try:
+            close_stream(self.stream)
+        finally:
+            self.permit.release()
+
+
+class _AHeldStream:
+    """Async version of ``_HeldStream``."""
+
+    def __init__(self, stream: Any, permit: _StreamPermit):
+        self.stream = stream
+        self.permit = permit
+        self._chunks = stream.__aiter__()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self.permit.release()
+            raise
+        except BaseException as e:
+            self.permit.release(e)
+            raise
+        self.permit.observe(chunk)
+        return chunk
+
+    async def aclose(self) -> None:
+        try:
+            await aclose_stream(self.stream)
+        finally:
+            self.permit.release()
+
+
+_END = object()
+
+
+class _Prefetched:
+    """
+    A sync stream whose first chunk has been read already, so that hedging can
+    time a streamed call, and fail it over, up to its first chunk.
+    """
+
+    def __init__(self, stream: Any):
+        self.stream = stream
+        self._chunks = iter(stream)
+        self._first = next(self._chunks, _END)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Any:
+        if self._first is not _END:
+            chunk, self._first = self._first, _END
+            return chunk
+        return next(self._chunks)
+
+    def close(self) -> None:
+        close_stream(self.stream)
+
+
+class _APrefetched:
+    """Async version of ``_Prefetched``; ``prefetch`` reads the first chunk."""
+
+    def __init__(self, stream: Any):
+        self.stream = stream
+        self._chunks = stream.__aiter__()
+        self._first: Any = _END
+
+    async def prefetch(self) -> "_APrefetched":
+        try:
+            self._first = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            pass
+        return self
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._first is not _END:
+            chunk, self._first = self._first, _END
+            return chunk
+        return await self._chunks.__anext__()
+
+    async def aclose(self) -> None:
+        await aclose_stream(self.stream)
+
+
+def _close_abandoned(future: concurrent.futures.Future) -> None:
+    """Close the stream of a hedge that lost the race but still finished."""
+    if not future.cancelled() and future.exception() is None and isinstance(future.result(), _Prefetched):
+        future.result().close()
+
+
+def response_from_dict(data: Dict[str, Any]) -> Any:
+    """Rebuild a litellm ``ModelResponse`` from data produced by ``response_to_dict``."""
+    from litellm import ModelResponse
+    return ModelResponse(**data)
+
+
+class LLMClient:
+    """
+    Thin wrapper around litellm ``completion`` with an on-disk response cache
+    and rate limiting.
+
+    Args:
+        model: Model used when a call does not specify one
+        cache: Response cache, or None to disable caching
+        completion_fn: Function with litellm's ``completion`` signature (defaults to litellm's)
+        acompletion_fn: Coroutine function with litellm's ``acompletion`` signature
+        rate_limiter: Limiter gating calls to the provider, or None for no limiting
+        single_flight: Coalesces identical concurrent cacheable calls, or None to disable
+        max_retries: How many times a rate-limited (429) call is retried
+        api_base: OpenAI-compatible endpoint that every call is sent to instead of the
+            model's provider (e.g. the mock server in ``agent_core.mock_server``)
+        metrics: Receives a ``CallRecord`` for every call, or None to disable instrumentation
+        router: Resolves "auto" and tier names ("fast", "powerful") into concrete models
+        hedging: Hedging/failover policy with per-model circuit breakers, or None for
+            single-model calls
+        **default_params: Sampling parameters applied to every call (e.g. max_tokens)
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, cache: Optional[ResponseCache] = None,
+                 completion_fn: Optional[Callable[..., Any]] = None,
+                 acompletion_fn: Optional[Callable[..., Any]] = None,
+                 rate_limiter: Optional[RateLimiter] = None, single_flight: Optional[SingleFlight] = None,
+                 max_retries: int = 5, api_base: Optional[str] = None, metrics: Optional[Metrics] = None,
+                 router: Optional[ModelRouter] = None, hedging: Optional[HedgingPolicy] = None,
+                 **default_params):
+        self.model = model
+        self.cache = cache
+        self.completion_fn = completion_fn
+        self.acompletion_fn = acompletion_fn
+        self.rate_limiter = rate_limiter
+        self.single_flight = single_flight
+        self.max_retries = max_retries
+        self.api_base = api_base
+        if api_base:
+            # Offline endpoints: use litellm's bundled price map instead of fetching it on import
+            os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+        self.metrics = metrics
+        self.router = router
+        self.hedging = hedging
+        self._hedge_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.default_params = default_params
+        self.cache_bypasses = 0
+        # Structured-output calls per mode ("json_schema", "tool", "prompt")
+        self.structured_calls: Dict[str, int] = {}
+
+    def _litellm(self) -> Any:
+        import litellm
+        if self.api_base:
+            # Offline endpoints: don't let streaming usage accounting download tokenizers
+            litellm.disable_hf_tokenizer_download = True
+        return litellm
+
+    def _completion(self) -> Callable[..., Any]:
+        if self.completion_fn is None:
+            self.completion_fn = self._litellm().completion
+        return self.completion_fn
+
+    def _acompletion(self) -> Callable[..., Any]:
+        if self.acompletion_fn is None:
+            self.acompletion_fn = self._litellm().acompletion
+        return self.acompletion_fn
+
+    def _resolve(self, model: Optional[str]) -> str:
+        model = model or self.model
+        return self.router.resolve(model) if self.router is not None else model
+
+    def _prepare(self, messages: List[Dict], model: Optional[str], tools: Optional[List[Dict]],
+                 params: Dict[str, Any]) -> Dict[str, Any]:
+        request = {"messages": messages, **self._endpoint(self._resolve(model))}
+        if tools:
+            request["tools"] = tools
+        request.update(self.default_params)
+        request.update(params)
+        return request
+
+    def _endpoint(self, model: str) -> Dict[str, Any]:
+        """Model and connection parameters for ``model``."""
+        if not self.api_base:
+            return {"model": model}
+        # Keep the model name but talk to the endpoint through litellm's OpenAI-compatible route
+        return {
+            "model": "openai/" + model.split("/", 1)[-1],
+            "api_base": self.api_base,
+            "api_key": os.getenv("AGENT_LLM_API_KEY", "mock"),
+        }
+
+    def _send(self, request: Dict[str, Any], obs: Optional[CallObservation] = None) -> Any:
+        """Call the provider under the rate limiter, retrying 429s with backoff."""
+        limiter = self.rate_limiter
+        if obs is not None:
+            obs.upstream = True
+        if limiter is None:
+            return self._completion()(**request)
+
+        model = request["model"]
+        estimate = estimate_tokens(request)
+        # 429s are retried here, so the provider SDK must surface them instead of retrying silently
+        request = {"max_retries": 0, **request}
+        attempt = 0
+        while True:
+            limiter.acquire(model, estimate)
+            try:
+                response = self._completion()(**request)
+            except BaseException as e:
+                # BaseException too, so an interrupt does not leak the permit
+                if not is_rate_limit_error(e):
+                    limiter.for_model(model).on_error()
+                    raise
+                limiter.for_model(model).on_rate_limited(response_headers(e))
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(limiter.backoff(attempt, e))
+                attempt += 1
+                if obs is not None:
+                    obs.retries = attempt
+                continue
+            if request.get("stream"):
+                # A stream keeps its permit until it has been read to the end or closed
+                return _HeldStream(response, _StreamPermit(limiter.for_model(model), estimate, request, response))
+            limiter.for_model(model).on_success(estimate, _total_tokens(response), response_headers(response))
+            return response
+
+    async def _asend(self, request: Dict[str, Any], obs: Optional[CallObservation] = None) -> Any:
+        """Async version of ``_send``."""
+        limiter = self.rate_limiter
+        if obs is not None:
+            obs.upstream = True
+        if limiter is None:
+            return await self._acompletion()(**request)
+
+        model = request["model"]
+        estimate = estimate_tokens(request)
+        # 429s are retried here, so the provider SDK must surface them instead of retrying silently
+        request = {"max_retries": 0, **request}
+        attempt = 0
+        while True:
+            await limiter.aacquire(model, estimate)
+            try:
+                response = await self._acompletion()(**request)
+            except BaseException as e:
+                if not is_rate_limit_error(e):
+                    limiter.for_model(model).on_error()
+                    raise
+                limiter.for_model(model).on_rate_limited(response_headers(e))
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(limiter.backoff(attempt, e))
+                attempt += 1
+                if obs is not None:
+                    obs.retries = attempt
+                continue
+            if request.get("stream"):
+                return _AHeldStream(response, _StreamPermit(limiter.for_model(model), estimate, request, response))
+            limiter.for_model(model).on_success(estimate, _total_tokens(response), response_headers(response))
+            return response
+
+    def _tracked_send(self, request: Dict[str, Any], obs: Optional[CallObservation]) -> Any:
+        """
+        ``_send`` that reports the outcome to the model's circuit breaker. A stream
+        counts as answered once its first chunk has arrived.
+        """
+        health = self.hedging.health(request["model"])
+        started = time.perf_counter()
+        try:
+            response = self._send(request, obs)
+            if request.get("stream"):
+                try:
+                    response = _Prefetched(response)
+                except BaseException:
+                    close_stream(response)
+                    raise
+        except Exception:
+            health.record(False, time.perf_counter() - started)
+            raise
+        health.record(True, time.perf_counter() - started)
+        return response
+
+    async def _atracked_send(self, request: Dict[str, Any], obs: Optional[CallObservation]) -> Any:
+        """Async version of ``_tracked_send``. Cancelled hedges are not counted as failures."""
+        health = self.hedging.health(request["model"])
+        started = time.perf_counter()
+        try:
+            response = await self._asend(request, obs)
+            if request.get("stream"):
+                try:
+                    response = await _APrefetched(response).prefetch()
+                except BaseException:
+                    await aclose_stream(response)
+                    raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            health.record(False, time.perf_counter() - started)
+            raise
+        health.record(True, time.perf_counter() - started)
+        return response
+
+    def _dispatch(self, request: Dict[str, Any], obs: Optional[CallObservation] = None) -> Any:
+        """
+        Send a request, hedging and failing over across models when a policy is set.
+
+        The primary model is started first. If it is still running after its hedge
+        delay, the next candidate is started as well and the first success wins. A
+        candidate that fails with a retryable error is replaced by the next one.
+        Streams race, and fail over, up to their first chunk; after that the
+        winning stream is read by the caller.
+        """
+        policy = self.hedging
+        if policy is None:
+            return self._send(request, obs)
+
+        candidates = policy.candidates(request["model"])
+        if self._hedge_pool is None:
+            self._hedge_pool = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="llm-hedge")
+
+        pending: Dict[concurrent.futures.Future, str] = {}
+        launched = 0
+        error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            """Send the request to the next candidate whose circuit lets it through."""
+            nonlocal launched
+            while launched < len(candidates):
+                model = candidates[launched]
+                launched += 1
+                if policy.health(model).allow():
+                    target = {**request, **self._endpoint(model)} if model != request["model"] else request
+                    pending[self._hedge_pool.submit(self._tracked_send, target, obs)] = model
+                    return True
+            return False
+
+        if not launch():
+            raise CircuitOpenError(f"No healthy model available for {request['model']}")
+        while pending:
+            delay = policy.hedge_delay(candidates[launched - 1]) if launched < len(candidates) else None
+            done, _ = concurrent.futures.wait(pending, timeout=delay,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done:
+                if launch():
+                    policy.hedges += 1
+                    if obs is not None:
+                        obs.hedged = True
+                continue
+            for future in done:
+                model = pending.pop(future)
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                        loser.add_done_callback(_close_abandoned)
+                    if obs is not None:
+                        obs.model = model
+                    return future.result()
+                error = future.exception()
+                if not is_failover_error(error):
+                    raise error
+            if not pending and launch():
+                policy.failovers += 1
+        raise error
+
+    async def _adispatch(self, request: Dict[str, Any], obs: Optional[CallObservation] = None) -> Any:
+        """Async version of ``_dispatch``; losing hedges are cancelled."""
+        policy = self.hedging
+        if policy is None:
+            return await self._asend(request, obs)
+
+        candidates = policy.candidates(request["model"])
+        pending: Dict[asyncio.Future, str] = {}
+        launched = 0
+        error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            """Send the request to the next candidate whose circuit lets it through."""
+            nonlocal launched
+            while launched < len(candidates):
+                model = candidates[launched]
+                launched += 1
+                if policy.health(model).allow():
+                    target = {**request, **self._endpoint(model)} if model != request["model"] else request
+                    pending[asyncio.ensure_future(self._atracked_send(target, obs))] = model
+                    return True
+            return False
+
+        if not launch():
+            raise CircuitOpenError(f"No healthy model available for {request['model']}")
+        try:
+            while pending:
+                delay = policy.hedge_delay(candidates[launched - 1]) if launched < len(candidates) else None
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if launch():
+                        policy.hedges += 1
+                        if obs is not None:
+                            obs.hedged = True
+                    continue
+                for task in done:
+                    model = pending.pop(task)
+                    if task.exception() is None:
+                        if obs is not None:
+                            obs.model = model
+                        return task.result()
+                    error = task.exception()
+                    if not is_failover_error(error):
+                        raise error
+                if not pending and launch():
+                    policy.failovers += 1
+            raise error
+        finally:
+            for task in pending:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None and isinstance(task.result(), _APrefetched):
+                    # Finished in the same wait as the winner; its stream is not read
+                    await task.result().aclose()
+
+    @contextmanager
+    def _observe(self, request: Dict[str, Any], streamed: bool = False) -> Iterator[CallObservation]:
+        """Time a call and emit its ``CallRecord`` once it finishes, successfully or not."""
+        obs = CallObservation(request["model"], streamed=streamed)
+        try:
+            yield obs
+        except BaseException as e:
+            obs.error = e
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.emit(obs.to_record())
+            elif tracking_usage():
+                # Budgets read their usage from the records even when no metrics are kept
+                count_usage(obs.to_record())
+
+    def complete(self, messages: List[Dict], model: Optional[str] = None,
+                 tools: Optional[List[Dict]] = None, use_cache: Optional[bool] = None, **params) -> Any:
+        """
+        Run a chat completion, serving it from the cache when possible.
+
+        Args:
+            messages: Chat messages to send
+            model: Model override for this call
+            tools: Tool definitions for function calling
+            use_cache: True to cache the call, False to bypass the cache. By default only
+                deterministic requests (temperature 0 or a seed) are cached, so repeated
+                sampled calls still return different completions
+            **params: Extra litellm parameters (max_tokens, temperature, ...)
+
+        Returns:
+            The litellm ``ModelResponse``
+        """
+        request = self._prepare(messages, model, tools, params)
+
+        with self._observe(request) as obs:
+            if not _cacheable(request, use_cache):
+                self.cache_bypasses += 1
+                obs.response = self._dispatch(request, obs)
+                return obs.response
+
+            key = cache_key(**request)
+            if self.cache is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    obs.cache_hit = True
+                    obs.response = response_from_dict(cached)
+                    return obs.response
+
+            def fetch():
+                response = self._dispatch(request, obs)
+                if self.cache is not None:
+                    self.cache.set(key, response_to_dict(response))
+                return response
+
+            if self.single_flight is None:
+                obs.response = fetch()
+            else:
+                obs.response = self.single_flight.do(key, fetch)
+            return obs.response
+
+    def generate_response(self, messages: List[Dict], **kwargs) -> str:
+        """Call the LLM and return only the text of the first choice."""
+        response = self.complete(messages, **kwargs)
+        return response.choices[0].message.content
+
+    async def acomplete(self, messages: List[Dict], model: Optional[str] = None,
+                        tools: Optional[List[Dict]] = None, use_cache: Optional[bool] = None, **params) -> Any:
+        """Async version of ``complete`` built on litellm's ``acompletion``."""
+        request = self._prepare(messages, model, tools, params)
+
+        with self._observe(request) as obs:
+            if not _cacheable(request, use_cache):
+                self.cache_bypasses += 1
+                obs.response = await self._adispatch(request, obs)
+                return obs.response
+
+            key = cache_key(**request)
+            if self.cache is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    obs.cache_hit = True
+                    obs.response = response_from_dict(cached)
+                    return obs.response
+
+            async def fetch():
+                response = await self._adispatch(request, obs)
+                if self.cache is not None:
+                    self.cache.set(key, response_to_dict(response))
+                return response
+
+            if self.single_flight is None:
+                obs.response = await fetch()
+            else:
+                obs.response = await self.single_flight.ado(key, fetch)
+            return obs.response
+
+    async def agenerate_response(self, messages: List[Dict], **kwargs) -> str:
+        """Async version of ``generate_response``."""
+        response = await self.acomplete(messages, **kwargs)
+        return response.choices[0].message.content
+
+    def _structured_mode(self, model: str) -> str:
+        mode = structured_mode(model, self.api_base)
+        self.structured_calls[mode] = self.structured_calls.get(mode, 0) + 1
+        return mode
+
+    def generate_json(self, messages: List[Dict], schema: Dict[str, Any], model: Optional[str] = None,
+                      **kwargs) -> str:
+        """
+        Ask for JSON matching ``schema`` and return its text, unparsed.
+
+        Uses the model's native schema mode or a forced tool call when it has
+        one (see ``agent_core.structured``). Otherwise the schema is sent in a
+        system message ahead of ``messages`` and the reply is streamed up to
+        its ```json block.
+
+        Args:
+            messages: Chat messages to send, without any schema instructions
+            schema: JSON schema of the expected value
+            model: Model or tier override for this call
+            **kwargs: Same as ``complete`` (max_tokens, temperature, ...)
+        """
+        compiled = compile_schema(schema)
+        model = self._resolve(model)
+        mode = self._structured_mode(model)
+        if mode == "prompt":
+            return self.stream_response([schema_instruction(compiled)] + list(messages), stop_at_fence="json",
+                                        model=model, **kwargs)
+        response = self.complete(messages, model=model, **structured_params(compiled, mode), **kwargs)
+        return structured_text(response.choices[0].message, mode)
+
+    async def agenerate_json(self, messages: List[Dict], schema: Dict[str, Any], model: Optional[str] = None,
+                             **kwargs) -> str:
+        """Async version of ``generate_json``."""
+        compiled = compile_schema(schema)
+        model = self._resolve(model)
+        mode = self._structured_mode(model)
+        if mode == "prompt":
+            return await self.astream_response([schema_instruction(compiled)] + list(messages),
+                                               stop_at_fence="json", model=model, **kwargs)
+        response = await self.acomplete(messages, model=model, **structured_params(compiled, mode), **kwargs)
+        return structured_text(response.choices[0].message, mode)
+
+    async def generate_many(self, prompts: Sequence[Union[str, List[Dict]]], max_concurrency: int = 8,
+                            timeout: Optional[float] = None, **kwargs) -> List[Union[str, BaseException]]:
+        """
+        Run many independent completions concurrently.
+
+        Args:
+            prompts: Message lists, or plain strings which are sent as a single user message
+            max_concurrency: Maximum number of requests in flight at once
+            timeout: Per-call timeout in seconds
+            **kwargs: Passed through to ``agenerate_response``
+
+        Returns:
+            One entry per prompt, in input order. A call that fails or times out
+            yields its exception instead of a string, so one bad request does
+            not sink the whole batch.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_one(prompt):
+            messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else prompt
+            async with semaphore:
+                return await asyncio.wait_for(self.agenerate_response(messages, **kwargs), timeout)
+
+        return await asyncio.gather(*(run_one(p) for p in prompts), return_exceptions=True)
+
+    def stream_response(self, messages: List[Dict], stop_at_fence: Optional[str] = None,
+                        use_cache: Optional[bool] = None, on_member: Optional[Callable[[str, Any], None]] = None,
+                        **kwargs) -> str:
+        """
+        Stream a completion and return its text, optionally cutting it off early.
+
+        Args:
+            messages: Chat messages to send
+            stop_at_fence: Info string of a fenced block (e.g. "action" or "json"). Once
+                such a block has been closed the stream is abandoned and the text up to
+                the closing fence is returned. The bodies of "action" and "json" blocks
+                are parsed while they stream, so the stream ends at their final brace.
+            use_cache: As in ``complete``; by default only deterministic requests are cached
+            on_member: With an "action" or "json" block, called with ``(key, value)`` for
+                each top-level member of its JSON object as soon as that member is complete
+            **kwargs: Same as ``complete`` (model, tools, max_tokens, ...)
+
+        Returns:
+            The generated text
+        """
+        request = self._prepare(messages, kwargs.pop("model", None), kwargs.pop("tools", None), kwargs)
+        cacheable = _cacheable(request, use_cache)
+        key = cache_key(stop_at_fence=stop_at_fence, **request) if self.cache is not None and cacheable else None
+        if not cacheable:
+            self.cache_bypasses += 1
+
+        with self._observe(request, streamed=True) as obs:
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    obs.cache_hit = True
+                    obs.response = cached
+                    return _cached_text(cached, stop_at_fence, on_member)
+
+            detector = _fence_detector(stop_at_fence, on_member)
+            parts = []
+            usage = None
+            stream = self._dispatch(_stream_request(request), obs)
+            try:
+                for chunk in stream:
+                    parts.append(chunk_text(chunk))
+                    if parts[-1]:
+                        obs.mark_first_token()
+                    usage = getattr(chunk, "usage", None) or usage
+                    if detector is not None and detector.feed(parts[-1]) is not None:
+                        break
+            finally:
+                close_stream(stream)
+
+            text = _streamed_text(parts, detector)
+            obs.response = _text_response(text, usage or _estimated_usage(request, text))
+            if key is not None:
+                self.cache.set(key, obs.response)
+            return text
+
+    async def astream_response(self, messages: List[Dict], stop_at_fence: Optional[str] = None,
+                               use_cache: Optional[bool] = None, on_member: Optional[Callable[[str, Any], None]] = None,
+                               **kwargs) -> str:
+        """Async version of ``stream_response``."""
+        request = self._prepare(messages, kwargs.pop("model", None), kwargs.pop("tools", None), kwargs)
+        cacheable = _cacheable(request, use_cache)
+        key = cache_key(stop_at_fence=stop_at_fence, **request) if self.cache is not None and cacheable else None
+        if not cacheable:
+            self.cache_bypasses += 1
+
+        with self._observe(request, streamed=True) as obs:
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    obs.cache_hit = True
+                    obs.response = cached
+                    return _cached_text(cached, stop_at_fence, on_member)
+
+            detector = _fence_detector(stop_at_fence, on_member)
+            parts = []
+            usage = None
+            stream = await self._adispatch(_stream_request(request), obs)
+            try:
+                async for chunk in stream:
+                    parts.append(chunk_text(chunk))
+                    if parts[-1]:
+                        obs.mark_first_token()
+                    usage = getattr(chunk, "usage", None) or usage
+                    if detector is not None and detector.feed(parts[-1]) is not None:
+                        break
+            finally:
+                await aclose_stream(stream)
+
+            text = _streamed_text(parts, detector)
+            obs.response = _text_response(text, usage or _estimated_usage(request, text))
+            if key is not None:
+                self.cache.set(key, obs.response)
+            return text
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache, single-flight, hedging and structured-output counters for this client."""
+        stats = self.cache.stats() if self.cache is not None else {}
+        stats["bypasses"] = self.cache_bypasses
+        if self.structured_calls:
+            stats["structured"] = dict(self.structured_calls)
+        if self.single_flight is not None:
+            stats["coalesced"] = self.single_flight.coalesced
+        if self.hedging is not None:
+            stats["hedging"] = self.hedging.stats()
+        return stats
+
+
+_default_client: Optional[LLMClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    """
+    Return the process-wide client, creating it on first use.
+
+    Setting ``AGENT_LLM_API_BASE`` sends every call to that OpenAI-compatible
+    endpoint (such as the offline mock server) instead of the real provider.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = LLMClient(cache=ResponseCache.from_env(), rate_limiter=get_rate_limiter(),
+                                        single_flight=SingleFlight(), metrics=get_metrics(), router=get_router(),
+                                        hedging=HedgingPolicy.from_env(),
+                                        api_base=os.getenv("AGENT_LLM_API_BASE"))
+        return _default_client
+
+
+def set_client(client: LLMClient) -> None:
+    """Replace the process-wide client (e.g. with one pointed at a mock server)."""
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+
+def completion(**kwargs) -> Any:
+    """Drop-in replacement for litellm's ``completion`` that goes through the shared client."""
+    return get_client().complete(**kwargs)
+
+
+def generate_response(messages: List[Dict], **kwargs) -> str:
+    """Call the shared client and return the text of the first choice."""
+    return get_client().generate_response(messages, **kwargs)
+
+
+def stream_response(messages: List[Dict], stop_at_fence: Optional[str] = None, **kwargs) -> str:
+    """Stream a completion on the shared client; see ``LLMClient.stream_response``."""
+    return get_client().stream_response(messages, stop_at_fence=stop_at_fence, **kwargs)
+
+
+def generate_json(messages: List[Dict], schema: Dict[str, Any], **kwargs) -> str:
+    """Structured output on the shared client; see ``LLMClient.generate_json``."""
+    return get_client().generate_json(messages, schema, **kwargs)
+
+
+async def acompletion(**kwargs) -> Any:
+    """Drop-in replacement for litellm's ``acompletion`` that goes through the shared client."""
+    return await get_client().acomplete(**kwargs)
+
+
+async def agenerate_response(messages: List[Dict], **kwargs) -> str:
+    """Async version of ``generate_response`` on the shared client."""
+    return await get_client().agenerate_response(messages, **kwargs)
+
+
+async def astream_response(messages: List[Dict], stop_at_fence: Optional[str] = None, **kwargs) -> str:
+    """Async version of ``stream_response`` on the shared client."""
+    return await get_client().astream_response(messages, stop_at_fence=stop_at_fence, **kwargs)
+
+
+async def agenerate_json(messages: List[Dict], schema: Dict[str, Any], **kwargs) -> str:
+    """Async version of ``generate_json`` on the shared client."""
+    return await get_client().agenerate_json(messages, schema, **kwargs)
+
+
+async def generate_many(prompts: Sequence[Union[str, List[Dict]]], max_concurrency: int = 8,
+                        timeout: Optional[float] = None, **kwargs) -> List[Union[str, BaseException]]:
+    """Fan out independent completions on the shared client; see ``LLMClient.generate_many``."""
+    return await get_client().generate_many(prompts, max_concurrency=max_concurrency,
+                                            timeout=timeout, **kwargs)
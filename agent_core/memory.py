@@ -0,0 +1,167 @@
+"""
+Memory compaction for long agent sessions.
+
+Every iteration re-sends the whole conversation, so prompts grow with each
+tool result and eventually overflow the context window. ``CompactingMemory``
+keeps a running token count, built from the per-message estimates cached in
+its ``MessageLog``. Once the total crosses ``max_tokens``, it compacts in two
+stages:
+
+1. Tool observations older than the ``keep_recent`` most recent messages are
+   replaced by summaries: a rule-based excerpt by default, or the output of a
+   ``summarize`` function such as ``llm_summarizer()``.
+2. If the total is still too high, the oldest steps are dropped whole (an
+   assistant message together with its observations). The original task is
+   always kept, and a note records how much was left out.
+
+The recent messages are always kept verbatim, and tool-call/tool-result
+pairs are never split.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from agent_core.agent import Memory
+from agent_core.llm import agenerate_response
+
+SUMMARY_PREFIX = "[summary] "
+OMITTED_PREFIX = "[earlier steps omitted: "
+
+Summarizer = Callable[[str], Union[str, Awaitable[str]]]
+
+
+def is_observation(message: Dict[str, Any]) -> bool:
+    """
+    Tool results: ``tool`` messages, or the JSON result messages of the ```action
+    languages (``{"result": ...}``/``{"error": ...}``, and ``{"results": [...]}`` for plans).
+    """
+    if message.get("role") == "tool":
+        return True
+    content = message.get("content")
+    return (message.get("role") == "user" and isinstance(content, str)
+            and content.startswith(('{"result"', '{"results"', '{"error"')))
+
+
+def excerpt(text: str, limit: int = 300) -> str:
+    """Rule-based summary: the start of ``text`` and how much was cut."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text) - limit} more characters not shown)"
+
+
+def llm_summarizer(model: str = "fast", max_words: int = 60) -> Summarizer:
+    """Summarize observations with a (by default fast-tier) model through the shared client."""
+    async def summarize(text: str) -> str:
+        return await agenerate_response([
+            {"role": "system",
+             "content": f"Summarize this tool output in at most {max_words} words. Keep names, numbers "
+                        "and facts an agent may need later; drop everything else."},
+            {"role": "user", "content": text},
+        ], model=model, max_tokens=max_words * 2)
+    return summarize
+
+
+class CompactingMemory(Memory):
+    """
+    Memory that stays under a token threshold by summarizing and dropping old steps.
+
+    Args:
+        max_tokens: Compaction starts when memory holds more than this many tokens
+        keep_recent: Number of most recent messages never touched
+        summarize: ``text -> summary`` (sync or async) for old observations;
+            defaults to a rule-based excerpt
+        summary_chars: Excerpt length for the default summarizer
+    """
+
+    def __init__(self, items: Optional[List[Dict[str, Any]]] = None, max_tokens: int = 8000,
+                 keep_recent: int = 6, summarize: Optional[Summarizer] = None, summary_chars: int = 300):
+        self.max_tokens = max_tokens
+        self.keep_recent = keep_recent
+        self.summarize = summarize
+        self.summary_chars = summary_chars
+        self.summarized = 0
+        self.dropped = 0
+        super().__init__(items)
+        self._tokens: List[int] = [self.items.tokens(m) for m in self.items]
+        self.total_tokens = sum(self._tokens)
+
+    def add_memory(self, item: Dict[str, Any]) -> None:
+        tokens = self.items.tokens(item)
+        self.items.append(item)
+        self._tokens.append(tokens)
+        self.total_tokens += tokens
+
+    def extend(self, items: List[Dict[str, Any]]) -> None:
+        for item in items:
+            self.add_memory(item)
+
+    def _replace(self, index: int, item: Dict[str, Any]) -> None:
+        tokens = self.items.tokens(item)
+        self.items[index] = item
+        self.total_tokens += tokens - self._tokens[index]
+        self._tokens[index] = tokens
+
+    async def _summary(self, text: str) -> str:
+        if self.summarize is None:
+            return excerpt(text, self.summary_chars)
+        summary = self.summarize(text)
+        return await summary if asyncio.iscoroutine(summary) else summary
+
+    async def compact(self) -> None:
+        if self.total_tokens <= self.max_tokens:
+            return
+        boundary = max(0, len(self.items) - self.keep_recent)
+
+        # Stage 1: summarize old observations, largest savings first
+        old = [i for i in range(boundary) if is_observation(self.items[i])
+               and not str(self.items[i].get("content", "")).startswith(SUMMARY_PREFIX)]
+        old.sort(key=lambda i: self._tokens[i], reverse=True)
+        for index in old:
+            if self.total_tokens <= self.max_tokens:
+                return
+            message = self.items[index]
+            summary = await self._summary(str(message.get("content", "")))
+            self._replace(index, {**message, "content": SUMMARY_PREFIX + summary})
+            self.summarized += 1
+
+        # Stage 2: drop the oldest whole steps, keeping the task and the recent window
+        first = self._first_droppable()
+        while self.total_tokens > self.max_tokens:
+            boundary = max(0, len(self.items) - self.keep_recent)
+            end = self._step_end(first, boundary)
+            if end is None:
+                return
+            count = end - first
+            self.total_tokens -= sum(self._tokens[first:end])
+            del self.items[first:end]
+            del self._tokens[first:end]
+            self.dropped += count
+            self._note_omitted(count)
+            first = self._first_droppable()
+
+    def _first_droppable(self) -> int:
+        """Index just after the original task (and the omission note, if any)."""
+        index = next((i for i, m in enumerate(self.items) if m.get("role") == "user"), 0) + 1
+        if index < len(self.items) and str(self.items[index].get("content", "")).startswith(OMITTED_PREFIX):
+            index += 1
+        return index
+
+    def _step_end(self, start: int, boundary: int) -> Optional[int]:
+        """End of the step starting at ``start``: up to (not including) the next assistant message."""
+        if start >= boundary:
+            return None
+        end = start + 1
+        while end < len(self.items) and self.items[end].get("role") != "assistant":
+            end += 1
+        return end if end <= boundary else None
+
+    def _note_omitted(self, count: int) -> None:
+        index = self._first_droppable() - 1
+        note = self.items[index]
+        if str(note.get("content", "")).startswith(OMITTED_PREFIX):
+            total = int(note["content"][len(OMITTED_PREFIX):].split()[0]) + count
+            self._replace(index, {"role": "user", "content": f"{OMITTED_PREFIX}{total} messages]"})
+        else:
+            note = {"role": "user", "content": f"{OMITTED_PREFIX}{count} messages]"}
+            self.items.insert(index + 1, note)
+            self._tokens.insert(index + 1, self.items.tokens(note))
+            self.total_tokens += self._tokens[index + 1]
@@ -0,0 +1,101 @@
+"""
+Append-only message log with cached encodings.
+
+Every agent iteration sends the whole history again. The prompt used to be
+built as ``[system] + memory.get_memories()``, which copies the history, and
+each call then serialized all of it at least twice more: once for the
+response-cache key and once for the rate limiter's token estimate.
+
+``MessageLog`` is a ``list`` of chat messages, so it can be passed anywhere a
+message list is expected. The first time a message is encoded, the log caches
+its canonical JSON and token estimate, so each turn only encodes the messages
+added since the previous one. ``view(head)`` returns a log for the request
+that shares this cache. It copies message references, never message
+contents.
+
+Messages are treated as immutable once added to a log. To change one,
+replace it with a new dict, as ``CompactingMemory`` does.
+"""
+import itertools
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def json_default(obj: Any) -> Any:
+    """Serialize litellm/pydantic objects that can appear inside messages."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    return str(obj)
+
+
+def encode(value: Any) -> str:
+    """Canonical JSON: sorted keys, no whitespace."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=json_default)
+
+
+def tokens_of(encoded: str) -> int:
+    """Approximate tokens of an encoded message (~4 characters per token plus framing)."""
+    return len(encoded) // 4 + 4
+
+
+class MessageLog(list):
+    """
+    A list of chat messages that caches each message's JSON and token estimate.
+
+    The cache is keyed by message identity and shared with every ``view`` of the
+    log, so a message is encoded once no matter how many prompts include it.
+    """
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = (),
+                 cache: Optional[Dict[int, Tuple[Dict[str, Any], str, int]]] = None):
+        super().__init__(messages)
+        self._cache: Dict[int, Tuple[Dict[str, Any], str, int]] = {} if cache is None else cache
+
+    def _entry(self, message: Dict[str, Any]) -> Tuple[Dict[str, Any], str, int]:
+        entry = self._cache.get(id(message))
+        if entry is None or entry[0] is not message:
+            if len(self._cache) > 2 * len(self) + 256:
+                self._prune()
+            encoded = encode(message)
+            # The message itself is kept in the entry so its id cannot be reused while cached
+            entry = self._cache[id(message)] = (message, encoded, tokens_of(encoded))
+        return entry
+
+    def _prune(self) -> None:
+        """Forget messages that were removed from the log (e.g. by compaction)."""
+        live = {id(m) for m in self}
+        for key in [k for k in self._cache if k not in live]:
+            del self._cache[key]
+
+    def encoded(self, message: Dict[str, Any]) -> str:
+        return self._entry(message)[1]
+
+    def tokens(self, message: Dict[str, Any]) -> int:
+        return self._entry(message)[2]
+
+    def encode(self) -> str:
+        """The whole log as canonical JSON, identical to ``encode(list(self))``."""
+        return "[" + ",".join([self._entry(m)[1] for m in self]) + "]"
+
+    def token_count(self) -> int:
+        return sum(self._entry(m)[2] for m in self)
+
+    def view(self, head: Iterable[Dict[str, Any]] = ()) -> "MessageLog":
+        """``head`` followed by this log's messages, as a new log sharing the encoding cache."""
+        return MessageLog(itertools.chain(head, self), cache=self._cache)
+
+
+def encode_messages(messages: List[Dict[str, Any]]) -> str:
+    """Canonical JSON of a message list, from the cache when it is a ``MessageLog``."""
+    if isinstance(messages, MessageLog):
+        return messages.encode()
+    return encode(messages)
+
+
+def count_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Approximate prompt tokens of a message list, from the cache when it is a ``MessageLog``."""
+    if isinstance(messages, MessageLog):
+        return messages.token_count()
+    return sum(tokens_of(encode(m)) for m in messages)
@@ -0,0 +1,380 @@
+"""
+Per-call instrumentation for the LLM layer.
+
+Every call through ``LLMClient`` produces a ``CallRecord`` (model, tokens,
+time-to-first-token, latency, retries, cache hit, calling tool, cost) that is
+handed to one or more sinks. ``RingBufferSink`` keeps recent records in memory
+and computes aggregate percentiles at runtime; ``JSONLSink`` appends them to a
+file for offline analysis. ``track_usage`` totals the records produced inside
+a block of code (e.g. one agent run) as they happen.
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+_tool_path: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("agent_core_tool_path", default=())
+
+
+def current_tool_path() -> Tuple[str, ...]:
+    """Names of the tools currently on the call stack, outermost first."""
+    return _tool_path.get()
+
+
+class tool_scope:
+    """
+    Context manager that attributes LLM calls made inside it to ``name``.
+
+    Nested scopes build a path, e.g. ``categorize_expenditure/prompt_expert``.
+    Works across threads and asyncio tasks because it is backed by a ContextVar.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._token = None
+
+    def __enter__(self):
+        self._token = _tool_path.set(_tool_path.get() + (self.name,))
+        return self
+
+    def __exit__(self, *exc):
+        _tool_path.reset(self._token)
+        return False
+
+
+def instrument_tool(name: Optional[str] = None) -> Callable:
+    """Decorator wrapping a sync or async tool function in a ``tool_scope``."""
+    def decorator(func):
+        tool_name = name or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tool_scope(tool_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tool_scope(tool_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@dataclass
+class CallRecord:
+    """One LLM call as seen by the client."""
+    model: str
+    started_at: float
+    latency: float
+    time_to_first_token: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cost: Optional[float] = None
+    retries: int = 0
+    cache_hit: bool = False
+    coalesced: bool = False
+    hedged: bool = False
+    streamed: bool = False
+    tool: Optional[str] = None
+    tool_path: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def upstream(self) -> bool:
+        """True when this call actually reached the provider."""
+        return not self.cache_hit and not self.coalesced
+
+
+class CallObservation:
+    """
+    Mutable scratchpad filled in while a call is running; ``LLMClient`` turns
+    it into a ``CallRecord`` when the call finishes.
+    """
+
+    def __init__(self, model: str, streamed: bool = False):
+        self.model = model
+        self.streamed = streamed
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.first_token: Optional[float] = None
+        self.retries = 0
+        self.cache_hit = False
+        self.upstream = False
+        self.hedged = False
+        self.response: Any = None
+        self.error: Optional[BaseException] = None
+        self.path = current_tool_path()
+
+    def mark_first_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def to_record(self) -> CallRecord:
+        latency = time.perf_counter() - self.started
+        usage = getattr(self.response, "usage", None)
+        if usage is None and isinstance(self.response, dict):
+            usage = self.response.get("usage")
+        prompt_tokens = _usage_field(usage, "prompt_tokens")
+        completion_tokens = _usage_field(usage, "completion_tokens")
+
+        if self.first_token is not None:
+            ttft = self.first_token - self.started
+        else:
+            ttft = latency if self.response is not None and not self.streamed else None
+
+        coalesced = not self.cache_hit and not self.upstream and self.error is None
+        return CallRecord(
+            model=self.model,
+            started_at=self.started_at,
+            latency=latency,
+            time_to_first_token=ttft,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost=0.0 if self.cache_hit or coalesced else _cost(self.response, self.model),
+            retries=self.retries,
+            cache_hit=self.cache_hit,
+            coalesced=coalesced,
+            hedged=self.hedged,
+            streamed=self.streamed,
+            tool=self.path[-1] if self.path else None,
+            tool_path=list(self.path),
+            error=f"{type(self.error).__name__}: {self.error}" if self.error is not None else None,
+        )
+
+
+def _usage_field(usage: Any, name: str) -> Optional[int]:
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get(name)
+    return getattr(usage, name, None)
+
+
+def _cost(response: Any, model: str) -> Optional[float]:
+    """Dollar cost of a response according to litellm's price map, when it knows the model."""
+    if response is None or isinstance(response, str):
+        return None
+    try:
+        if isinstance(response, dict):
+            # Streamed text, recorded as a plain payload with the reported (or estimated) usage
+            usage = response.get("usage")
+            if not usage:
+                return None
+            from litellm import cost_per_token
+            prompt_cost, completion_cost = cost_per_token(model=model,
+                                                          prompt_tokens=usage.get("prompt_tokens") or 0,
+                                                          completion_tokens=usage.get("completion_tokens") or 0)
+            return prompt_cost + completion_cost
+        from litellm import completion_cost
+        return completion_cost(completion_response=response)
+    except Exception:
+        return None
+
+
+@dataclass
+class Usage:
+    """Running totals of the LLM calls made inside a ``track_usage`` block."""
+    llm_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    def __post_init__(self) -> None:
+        # Not fields, so asdict() and comparisons see only the totals
+        self._lock = threading.Lock()
+        # Every record added, upstream or not: 0 means no LLM call reached this tracker at all
+        self.records = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, record: CallRecord) -> None:
+        with self._lock:
+            self.records += 1
+            # Cache hits and coalesced calls cost nothing; they reuse another call's tokens
+            if not record.upstream:
+                return
+            self.llm_calls += 1
+            self.prompt_tokens += record.prompt_tokens or 0
+            self.completion_tokens += record.completion_tokens or 0
+            self.cost += record.cost or 0.0
+
+
+_usage_trackers: contextvars.ContextVar[Tuple[Usage, ...]] = contextvars.ContextVar("agent_core_usage", default=())
+
+
+def tracking_usage() -> bool:
+    """True inside a ``track_usage`` block."""
+    return bool(_usage_trackers.get())
+
+
+def count_usage(record: CallRecord) -> None:
+    """Add ``record`` to every ``track_usage`` block it was made in."""
+    for usage in _usage_trackers.get():
+        usage.add(record)
+
+
+@contextmanager
+def track_usage() -> Iterator[Usage]:
+    """
+    Total the LLM calls made inside the block, including in threads and tasks
+    it starts. Blocks nest: a call counts towards every enclosing tracker.
+    """
+    usage = Usage()
+    token = _usage_trackers.set(_usage_trackers.get() + (usage,))
+    try:
+        yield usage
+    finally:
+        _usage_trackers.reset(token)
+
+
+def percentile(values: Sequence[float], q: float) -> Optional[float]:
+    """Linearly interpolated percentile (``q`` in 0-100) of ``values``."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class RingBufferSink:
+    """Keeps the most recent ``capacity`` records in memory."""
+
+    def __init__(self, capacity: int = 10_000):
+        self.records: Deque[CallRecord] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def write(self, record: CallRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def snapshot(self) -> List[CallRecord]:
+        with self._lock:
+            return list(self.records)
+
+    def summary(self, group_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aggregate the buffered records.
+
+        Args:
+            group_by: Optional record field (e.g. "tool" or "model") to break the summary down by
+
+        Returns:
+            Counts, token totals, cost, cache-hit rate and p50/p95/p99 of latency and
+            time-to-first-token. Token and cost totals only include calls that reached
+            the provider.
+        """
+        records = self.snapshot()
+        summary = summarize(records)
+        if group_by:
+            groups: Dict[str, List[CallRecord]] = {}
+            for record in records:
+                groups.setdefault(str(getattr(record, group_by)), []).append(record)
+            summary["by_" + group_by] = {key: summarize(group) for key, group in groups.items()}
+        return summary
+
+
+def summarize(records: Sequence[CallRecord]) -> Dict[str, Any]:
+    upstream = [r for r in records if r.upstream]
+    latencies = [r.latency for r in records]
+    ttfts = [r.time_to_first_token for r in records if r.time_to_first_token is not None]
+    summary = {
+        "calls": len(records),
+        "upstream_calls": len(upstream),
+        "errors": sum(1 for r in records if r.error),
+        "retries": sum(r.retries for r in records),
+        "cache_hit_rate": (sum(1 for r in records if r.cache_hit) / len(records)) if records else 0.0,
+        "coalesced": sum(1 for r in records if r.coalesced),
+        "hedged": sum(1 for r in records if r.hedged),
+        "prompt_tokens": sum(r.prompt_tokens or 0 for r in upstream),
+        "completion_tokens": sum(r.completion_tokens or 0 for r in upstream),
+        "cost": sum(r.cost or 0.0 for r in upstream),
+    }
+    for q in (50, 95, 99):
+        summary[f"latency_p{q}"] = percentile(latencies, q)
+        summary[f"ttft_p{q}"] = percentile(ttfts, q)
+    return summary
+
+
+class JSONLSink:
+    """Appends each record as one JSON line to ``path``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, record: CallRecord) -> None:
+        line = json.dumps(asdict(record), separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+class Metrics:
+    """
+    Fan-out point for call records.
+
+    Args:
+        sinks: Objects with a ``write(record)`` method
+    """
+
+    def __init__(self, sinks: Optional[List[Any]] = None):
+        self.sinks = list(sinks or [])
+
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        """In-memory ring buffer, plus a JSONL file when ``AGENT_LLM_METRICS_FILE`` is set."""
+        sinks: List[Any] = [RingBufferSink()]
+        path = os.getenv("AGENT_LLM_METRICS_FILE")
+        if path:
+            sinks.append(JSONLSink(path))
+        return cls(sinks)
+
+    def emit(self, record: CallRecord) -> None:
+        count_usage(record)
+        for sink in self.sinks:
+            try:
+                sink.write(record)
+            except Exception:
+                # Instrumentation must never break the call it observes
+                pass
+
+    @property
+    def buffer(self) -> Optional[RingBufferSink]:
+        """The first in-memory sink, if any."""
+        for sink in self.sinks:
+            if isinstance(sink, RingBufferSink):
+                return sink
+        return None
+
+    def summary(self, group_by: Optional[str] = None) -> Dict[str, Any]:
+        buffer = self.buffer
+        return buffer.summary(group_by) if buffer is not None else {}
+
+
+_default_metrics: Optional[Metrics] = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics fan-out, creating it on first use."""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics.from_env()
+        return _default_metrics
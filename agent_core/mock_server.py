@@ -0,0 +1,314 @@
+"""
+Offline, OpenAI-compatible mock LLM server.
+
+Speaks the ``/v1/chat/completions`` protocol (plain and streamed, with tool
+calls) that litellm targets, so agent loops and pipelines can be exercised and
+benchmarked without network access or API keys.
+
+Run it with::
+
+    python -m agent_core.mock_server --port 8765 --latency lognormal:300,0.5 \\
+        --tokens-per-second 80 --rate-429 0.05
+
+and point the scripts at it with ``AGENT_LLM_API_BASE=http://127.0.0.1:8765/v1``.
+
+Responses come from an optional script file (JSON) of rules, tried in order::
+
+    {"rules": [
+        {"match": "list.*files", "tool_calls": [{"name": "list_files", "arguments": {}}]},
+        {"turn": 1, "content": "```action\\n{\\"tool_name\\": \\"terminate\\", ...}\\n```"},
+        {"match": ".*", "content": "Hello from the mock", "latency_ms": 50}
+    ]}
+
+``match`` is a regex searched in the last message, ``turn`` is the number of
+assistant messages already in the conversation. Without a matching rule the
+server plays a generic agent: it lists files on the first turn and terminates
+on the next, using native tool calls or an ```action block depending on the
+request.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """
+    Build a latency sampler (seconds) from ``fixed:MS``, ``uniform:LOW,HIGH``,
+    ``normal:MEAN,STDDEV`` or ``lognormal:MEDIAN,SIGMA`` (all in milliseconds
+    except SIGMA).
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(0, values[1]) * values[0] / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+class MockBehavior:
+    """
+    Decides what the mock answers and how slowly.
+
+    Args:
+        rules: Scripted response rules (see module docstring)
+        latency: Sampler for time-to-first-token in seconds
+        tokens_per_second: Simulated generation speed, or 0 for instant output
+        rate_429: Probability of answering with a 429 rate-limit error
+        rate_500: Probability of answering with a 500 server error
+        seed: Seed for the random generator, for reproducible runs
+    """
+
+    def __init__(self, rules: Optional[List[Dict]] = None, latency: Callable[[], float] = lambda: 0.0,
+                 tokens_per_second: float = 0.0, rate_429: float = 0.0, rate_500: float = 0.0,
+                 seed: Optional[int] = None):
+        self.rules = rules or []
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def injected_error(self) -> Optional[int]:
+        """HTTP status of an injected failure for this request, if any."""
+        with self._lock:
+            self.requests += 1
+            roll = self.random.random()
+            if roll < self.rate_429:
+                self.errors += 1
+                return 429
+            if roll < self.rate_429 + self.rate_500:
+                self.errors += 1
+                return 500
+        return None
+
+    def respond(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Return ``{"content": ..., "tool_calls": [...], "latency_ms": ...}`` for a request."""
+        messages = body.get("messages", [])
+        last = _message_text(messages[-1]) if messages else ""
+        turn = sum(1 for m in messages if m.get("role") == "assistant")
+
+        for rule in self.rules:
+            if "turn" in rule and rule["turn"] != turn:
+                continue
+            if "match" in rule and not re.search(rule["match"], last, re.DOTALL):
+                continue
+            return rule
+        return self._default(body, turn)
+
+    def _default(self, body: Dict[str, Any], turn: int) -> Dict[str, Any]:
+        tools = [t["function"]["name"] for t in body.get("tools") or []]
+        system = " ".join(_message_text(m) for m in body.get("messages", []) if m.get("role") == "system")
+
+        if turn == 0:
+            action = {"tool_name": "list_files", "args": {}}
+        else:
+            action = {"tool_name": "terminate", "args": {"message": "Mock run complete."}}
+
+        if tools:
+            name = action["tool_name"] if action["tool_name"] in tools else tools[0]
+            return {"tool_calls": [{"name": name, "arguments": action["args"] if name == action["tool_name"] else {}}]}
+        if "```action" in system:
+            return {"content": "Mock reasoning about the next step.\n\n```action\n"
+                               + json.dumps(action) + "\n```"}
+        if "```json" in system:
+            return {"content": "```json\n{}\n```"}
+        return {"content": "This is a mock response."}
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+_ids = itertools.count(1)
+
+
+def _tool_calls(reply: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": f"call_mock_{next(_ids)}",
+            "type": "function",
+            "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))},
+        }
+        for call in reply.get("tool_calls") or []
+    ]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    behavior: MockBehavior = MockBehavior()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        behavior = self.behavior
+
+        status = behavior.injected_error()
+        if status == 429:
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_exceeded"}},
+                            {"retry-after": "1", "x-ratelimit-remaining-requests": "0",
+                             "x-ratelimit-reset-requests": "1s"})
+            return
+        if status == 500:
+            self._send_json(500, {"error": {"message": "Internal server error (mock)", "type": "server_error"}})
+            return
+
+        reply = behavior.respond(body)
+        latency = reply["latency_ms"] / 1000 if "latency_ms" in reply else behavior.latency()
+        time.sleep(latency)
+
+        content = reply.get("content")
+        tool_calls = _tool_calls(reply)
+        prompt_tokens = sum(count_tokens(_message_text(m)) for m in body.get("messages", []))
+        completion_tokens = count_tokens(content or "") + sum(
+            count_tokens(c["function"]["arguments"]) + 1 for c in tool_calls)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"chatcmpl-mock-{next(_ids)}"
+        model = body.get("model", "mock")
+        finish_reason = "tool_calls" if tool_calls else "stop"
+
+        if body.get("stream"):
+            self._stream(completion_id, model, content, tool_calls, finish_reason, usage)
+            return
+
+        if behavior.tokens_per_second:
+            time.sleep(completion_tokens / behavior.tokens_per_second)
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "tool_calls": tool_calls or None},
+                "finish_reason": finish_reason,
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, completion_id: str, model: str, content: Optional[str], tool_calls: List[Dict],
+                finish_reason: str, usage: Dict[str, int]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def emit(delta: Dict[str, Any], finish: Optional[str] = None, extra: Optional[Dict] = None) -> None:
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            chunk.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        delay = 1 / self.behavior.tokens_per_second if self.behavior.tokens_per_second else 0
+        try:
+            emit({"role": "assistant", "content": ""})
+            text = content or ""
+            for start in range(0, len(text), 4):
+                emit({"content": text[start:start + 4]})
+                if delay:
+                    time.sleep(delay)
+            for index, call in enumerate(tool_calls):
+                emit({"tool_calls": [{"index": index, "id": call["id"], "type": "function",
+                                      "function": {"name": call["function"]["name"],
+                                                   "arguments": call["function"]["arguments"]}}]})
+            emit({}, finish_reason, {"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early, e.g. after a complete ```action block
+            pass
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, behavior: Optional[MockBehavior] = None) -> ThreadingHTTPServer:
+    """
+    Start the mock server on a background thread and return it.
+
+    Call ``shutdown()`` on the returned server to stop it. ``port=0`` picks a free port;
+    read it back from ``server.server_address``.
+    """
+    handler = type("ConfiguredMockHandler", (MockHandler,), {"behavior": behavior or MockBehavior()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible mock LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON file with scripted response rules")
+    parser.add_argument("--latency", default="fixed:0",
+                        help="Time-to-first-token distribution, e.g. fixed:200, uniform:100,400, lognormal:300,0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Simulated generation speed")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    rules = []
+    if args.script:
+        with open(args.script, "r") as f:
+            rules = json.load(f).get("rules", [])
+
+    behavior = MockBehavior(rules=rules, latency=parse_latency(args.latency),
+                            tokens_per_second=args.tokens_per_second,
+                            rate_429=args.rate_429, rate_500=args.rate_500, seed=args.seed)
+    server = serve(args.host, args.port, behavior)
+    print(f"Mock LLM listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Process-wide rate limiting for LLM calls.
+
+Each model gets a pair of token buckets (requests per minute and tokens per
+minute) and an adaptive concurrency limit. The limit grows additively after
+successful calls and is halved whenever the provider answers with a 429, the
+classic AIMD scheme, so a process settles just under its quota instead of
+repeatedly tripping it.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from agent_core.messages import count_tokens
+
+
+def estimate_tokens(request: Dict[str, Any]) -> int:
+    """Rough token estimate for a request: ~4 characters per prompt token plus the completion budget."""
+    prompt_tokens = count_tokens(request.get("messages", []))
+    if request.get("tools"):
+        prompt_tokens += len(json.dumps(request["tools"], default=str)) // 4
+    return prompt_tokens + int(request.get("max_tokens") or 256)
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """True for provider 429s, whichever exception class litellm wrapped them in."""
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def _parse_seconds(value: Any) -> Optional[float]:
+    """Parse header durations such as ``"2"``, ``"1.5s"``, ``"250ms"`` or ``"1m30s"``."""
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+
+    total, number = 0.0, ""
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+        elif text.startswith("ms", i) and number:
+            total += float(number) / 1000
+            number = ""
+            i += 1
+        elif ch in "hms" and number:
+            total += float(number) * {"h": 3600, "m": 60, "s": 1}[ch]
+            number = ""
+        else:
+            return None
+        i += 1
+    return total if not number else None
+
+
+def response_headers(obj: Any) -> Mapping[str, str]:
+    """Extract HTTP headers from a litellm response or exception, if it carries any."""
+    hidden = getattr(obj, "_hidden_params", None) or {}
+    headers = hidden.get("additional_headers") or hidden.get("headers")
+    if headers is None:
+        headers = getattr(getattr(obj, "response", None), "headers", None)
+    if headers is None:
+        headers = getattr(obj, "headers", None)
+    return {str(k).lower(): v for k, v in dict(headers or {}).items()}
+
+
+class TokenBucket:
+    """
+    Continuously refilling bucket holding up to ``capacity`` units, refilled at
+    ``capacity`` units per ``period`` seconds. Not thread-safe on its own; the
+    owning ``ModelLimiter`` serializes access.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available (requests larger than the bucket wait for a full one)."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+    def give(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain_until(self, resume_at: float) -> None:
+        """Empty the bucket so nothing is granted before ``resume_at`` (a monotonic timestamp)."""
+        self.level = min(0.0, -(resume_at - time.monotonic()) * self.rate)
+        self.updated = time.monotonic()
+
+
+class ModelLimiter:
+    """
+    Rate and concurrency limits for a single model.
+
+    Args:
+        requests_per_minute: Request quota, or None for no request bucket
+        tokens_per_minute: Token quota, or None for no token bucket
+        initial_concurrency: Starting number of calls allowed in flight
+        min_concurrency: Floor for the adaptive limit
+        max_concurrency: Ceiling for the adaptive limit
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 initial_concurrency: float = 8, min_concurrency: float = 1, max_concurrency: float = 128):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = float(initial_concurrency)
+        self.min_concurrency = float(min_concurrency)
+        self.max_concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: int) -> float:
+        """Take a permit for a call of ``tokens`` tokens. Returns 0 on success, otherwise seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            if self.in_flight >= int(self.concurrency):
+                return 0.01
+            delay = 0.0
+            if self.requests is not None:
+                delay = max(delay, self.requests.delay_for(1, now))
+            if self.tokens is not None:
+                delay = max(delay, self.tokens.delay_for(tokens, now))
+            if delay > 0:
+                return delay
+
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(tokens)
+            self.in_flight += 1
+            return 0.0
+
+    def on_success(self, estimated_tokens: int, used_tokens: Optional[int], headers: Mapping[str, str]) -> None:
+        """Release the permit, reconcile the token estimate and grow the concurrency limit."""
+        with self._lock:
+            self.in_flight -= 1
+            if self.tokens is not None and used_tokens is not None:
+                self.tokens.give(estimated_tokens - used_tokens)
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+            self._apply_headers(headers)
+
+    def on_rate_limited(self, headers: Mapping[str, str]) -> None:
+        """Release the permit and halve the concurrency limit."""
+        with self._lock:
+            self.in_flight -= 1
+            self.rate_limited += 1
+            self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+            self._apply_headers(headers)
+
+    def on_error(self) -> None:
+        """Release the permit after a failure that says nothing about the quota."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def _apply_headers(self, headers: Mapping[str, str]) -> None:
+        """Pause the buckets when the provider reports the quota as exhausted. Caller holds the lock."""
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            if bucket is None:
+                continue
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            reset = _parse_seconds(headers.get(f"x-ratelimit-reset-{kind}"))
+            try:
+                exhausted = remaining is not None and float(remaining) <= 0
+            except ValueError:
+                exhausted = False
+            if exhausted and reset:
+                bucket.drain_until(time.monotonic() + reset)
+
+
+class RateLimiter:
+    """
+    Registry of per-model limiters plus the retry/backoff policy for 429s.
+
+    Args:
+        default_requests_per_minute: Request quota for models without explicit limits
+        default_tokens_per_minute: Token quota for models without explicit limits
+        base_backoff: First backoff step in seconds
+        max_backoff: Upper bound for a single backoff
+    """
+
+    def __init__(self, default_requests_per_minute: Optional[float] = None,
+                 default_tokens_per_minute: Optional[float] = None,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.default_requests_per_minute = default_requests_per_minute
+        self.default_tokens_per_minute = default_tokens_per_minute
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._models: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Build a limiter using ``AGENT_LLM_RPM`` / ``AGENT_LLM_TPM`` as the default quotas."""
+        rpm = os.getenv("AGENT_LLM_RPM")
+        tpm = os.getenv("AGENT_LLM_TPM")
+        return cls(default_requests_per_minute=float(rpm) if rpm else None,
+                   default_tokens_per_minute=float(tpm) if tpm else None)
+
+    def configure(self, model: str, requests_per_minute: Optional[float] = None,
+                  tokens_per_minute: Optional[float] = None, **concurrency) -> ModelLimiter:
+        """Set explicit quotas for ``model``, replacing any existing limiter for it."""
+        limiter = ModelLimiter(requests_per_minute, tokens_per_minute, **concurrency)
+        with self._lock:
+            self._models[model] = limiter
+        return limiter
+
+    def for_model(self, model: str) -> ModelLimiter:
+        with self._lock:
+            limiter = self._models.get(model)
+            if limiter is None:
+                limiter = ModelLimiter(self.default_requests_per_minute, self.default_tokens_per_minute)
+                self._models[model] = limiter
+            return limiter
+
+    def acquire(self, model: str, tokens: int) -> None:
+        """Block until a permit for ``model`` is available."""
+        limiter = self.for_model(model)
+        while True:
+            delay = limiter.try_acquire(tokens)
+            if delay == 0:
+                return
+            time.sleep(delay)
+
+    async def aacquire(self, model: str, tokens: int) -> None:
+        """Async version of ``acquire``."""
+        limiter = self.for_model(model)
+        while True:
+            delay = limiter.try_acquire(tokens)
+            if delay == 0:
+                return
+            await asyncio.sleep(delay)
+
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        Seconds to wait before retry number ``attempt`` (0-based).
+
+        Honours ``retry-after`` when the provider sends one, otherwise uses
+        exponential backoff with full jitter so that concurrent callers do not
+        retry in lockstep.
+        """
+        if error is not None:
+            retry_after = _parse_seconds(response_headers(error).get("retry-after"))
+            if retry_after is not None:
+                return min(self.max_backoff, retry_after) + random.uniform(0, self.base_backoff)
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Current concurrency limit, in-flight calls and 429 count per model."""
+        with self._lock:
+            models = dict(self._models)
+        return {
+            model: {
+                "concurrency": limiter.concurrency,
+                "in_flight": limiter.in_flight,
+                "rate_limited": limiter.rate_limited,
+            }
+            for model, limiter in models.items()
+        }
+
+
+_default_limiter: Optional[RateLimiter] = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter, creating it on first use."""
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            _default_limiter = RateLimiter.from_env()
+        return _default_limiter
@@ -0,0 +1,207 @@
+"""
+Local repair of near-miss JSON from model output.
+
+``prompt_llm_for_json`` gives the model three tries. A trailing comma,
+single-quoted strings, a missing closing fence or a sentence before the JSON
+used to cost a whole extra completion, even though the data was all there.
+``parse_json`` first tries ``json.loads``. If that fails, it repairs the text
+locally and only gives up, so that the caller retries, when repair fails too.
+
+Repairs, in one pass over the text outside of strings:
+
+* trailing commas before ``}`` or ``]`` are dropped
+* single-quoted strings become double-quoted
+* Python literals ``True``/``False``/``None`` become ``true``/``false``/``null``
+
+Surrounding prose and fences (closed or not) are dropped by parsing the
+largest balanced ``{...}`` or ``[...]`` span first, then smaller ones. Truncated
+JSON is not completed: a cut-off list would still parse and silently lose
+items, so it is left for a retry.
+
+Every outcome is counted in ``RepairStats`` so the LLM calls saved by repair
+can be compared with the retries that were still needed.
+"""
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_WORD = re.compile(r"[A-Za-z_]\w*")
+_UNESCAPED_DOUBLE_QUOTE = re.compile(r'(?<!\\)"')
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _string_end(text: str, start: int) -> int:
+    """Index just past the string opened by the quote at ``start`` (or the end of an unterminated one)."""
+    quote = text[start]
+    i, n = start + 1, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == "\\":
+            i += 2
+        elif ch == quote:
+            return i + 1
+        else:
+            i += 1
+    return n
+
+
+def normalize(text: str) -> str:
+    """Apply the local repairs to ``text``; contents of strings are left alone."""
+    out: List[str] = []
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '"':
+            end = _string_end(text, i)
+            out.append(text[i:end])
+            i = end
+        elif ch == "'":
+            end = _string_end(text, i)
+            body = text[i + 1:end - 1].replace("\\'", "'")
+            out.append('"' + _UNESCAPED_DOUBLE_QUOTE.sub(r'\\"', body) + '"')
+            i = end
+        elif ch == ",":
+            j = i + 1
+            while j < n and text[j].isspace():
+                j += 1
+            if j >= n or text[j] not in "}]":
+                out.append(ch)
+            i += 1
+        elif ch.isascii() and (ch.isalpha() or ch == "_"):
+            word = _WORD.match(text, i).group()
+            out.append(_LITERALS.get(word, word))
+            i += len(word)
+        else:
+            out.append(ch)
+            i += 1
+    return "".join(out)
+
+
+def _match(text: str, start: int) -> Optional[int]:
+    """Index just past the bracket that closes the one at ``start``, or None if it never closes."""
+    stack = [_CLOSERS[text[start]]]
+    i, n = start + 1, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in "\"'":
+            i = _string_end(text, i)
+            continue
+        if ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+        elif ch in "}]":
+            if ch != stack.pop():
+                return None
+            if not stack:
+                return i + 1
+        i += 1
+    return None
+
+
+def balanced_spans(text: str) -> List[Tuple[int, int]]:
+    """``(start, end)`` of each top-level balanced ``{...}``/``[...]`` span, largest first."""
+    spans = []
+    i, n = 0, len(text)
+    while i < n:
+        if text[i] in _CLOSERS:
+            end = _match(text, i)
+            if end is not None:
+                spans.append((i, end))
+                i = end
+                continue
+        i += 1
+    spans.sort(key=lambda span: span[0] - span[1])
+    return spans
+
+
+def _candidates(text: str) -> Iterator[str]:
+    yield text
+    for start, end in balanced_spans(text):
+        yield text[start:end]
+
+
+class RepairStats:
+    """
+    Counts of how structured outputs were obtained.
+
+    ``parsed`` were valid as returned, ``repaired`` were fixed locally (each one
+    an LLM call saved), ``retried`` asked the model again and ``failed`` ran out
+    of tries.
+    """
+
+    OUTCOMES = ("parsed", "repaired", "retried", "failed")
+
+    def __init__(self):
+        self.counts: Dict[str, int] = dict.fromkeys(self.OUTCOMES, 0)
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str) -> None:
+        if outcome not in self.counts:
+            raise ValueError(f"Unknown outcome {outcome!r}; expected one of {self.OUTCOMES}")
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.counts)
+        near_misses = stats["repaired"] + stats["retried"]
+        stats["llm_calls_saved"] = stats["repaired"]
+        stats["repair_rate"] = stats["repaired"] / near_misses if near_misses else None
+        return stats
+
+
+_default_stats: Optional[RepairStats] = None
+_default_stats_lock = threading.Lock()
+
+
+def get_repair_stats() -> RepairStats:
+    """Return the process-wide repair counters, creating them on first use."""
+    global _default_stats
+    with _default_stats_lock:
+        if _default_stats is None:
+            _default_stats = RepairStats()
+        return _default_stats
+
+
+def parse_json(text: str, validate: Optional[Callable[[Any], Any]] = None,
+               stats: Optional[RepairStats] = None) -> Any:
+    """
+    Parse model output as JSON, repairing common malformations locally.
+
+    A value only counts as obtained once ``validate`` accepts it, so a repair
+    that parses but does not match the schema is not counted as a saved call,
+    and the next candidate span is tried instead.
+
+    Args:
+        text: The model's answer, or the body of its ```json block
+        validate: Returns the value or raises, e.g. ``CompiledSchema.validate``
+        stats: Where to count the outcome; defaults to ``get_repair_stats()``
+
+    Raises:
+        json.JSONDecodeError: The original parse error, when no repair parses
+        Exception: Whatever ``validate`` raised for the first value that parsed
+    """
+    stats = stats or get_repair_stats()
+    validate = validate or (lambda value: value)
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError as error:
+        rejected: Optional[Exception] = None
+        for candidate in _candidates(text):
+            try:
+                value = json.loads(normalize(candidate))
+            except Exception:
+                # A repair that fails is no repair; the caller sees the original parse error
+                continue
+            try:
+                value = validate(value)
+            except Exception as e:
+                rejected = rejected or e
+                continue
+            stats.record("repaired")
+            return value
+        raise rejected or error
+    value = validate(value)
+    stats.record("parsed")
+    return value
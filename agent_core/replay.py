@@ -0,0 +1,207 @@
+"""
+Record/replay harness for agent runs.
+
+``record_agent`` wraps an agent so that every model reply and tool result of
+its runs is written to a cassette (JSONL). ``replay_agent`` drives the same
+agent from the cassette: model replies and tool results come from the file,
+so runs are deterministic, need no provider or network, and have no side
+effects. What remains is the loop itself (prompt construction, parsing,
+dispatch, memory), which makes replays useful both as regression tests and
+for measuring loop overhead::
+
+    python -m agent_core.replay record script.py:agent "What files are here?" -o run.cassette.jsonl
+    python -m agent_core.replay replay script.py:agent run.cassette.jsonl
+
+Replies are keyed by a hash of the prompt. With ``strict=True`` (the default) a
+prompt the cassette has no reply for raises ``CassetteMismatch``, which is how a
+change in prompt construction shows up.
+"""
+import argparse
+import asyncio
+import dataclasses
+import inspect
+import json
+import threading
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from agent_core.agent import Action, ActionRegistry, Agent, Prompt
+from agent_core.llm import cache_key
+
+
+class CassetteMismatch(Exception):
+    """The replayed run asked for something the cassette did not record."""
+
+
+def prompt_key(prompt: Prompt) -> str:
+    """Stable hash of everything in a prompt that determines the model's reply."""
+    return cache_key(prompt.model or "", prompt.messages, prompt.tools, stop_at_fence=prompt.stop_at_fence)
+
+
+def _args_key(name: str, args: Dict[str, Any]) -> str:
+    return name + ":" + json.dumps(args, sort_keys=True, default=str)
+
+
+class Cassette:
+    """
+    Recorded events of one or more runs, one JSON object per line:
+    ``run`` (the user input), ``llm`` (prompt key and reply) and ``tool``
+    (name, args and result, or the exception message if it raised).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, separators=(",", ":"), default=str)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+    def events(self) -> List[Dict[str, Any]]:
+        with open(self.path, "r") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def inputs(self) -> List[str]:
+        """User inputs of the recorded runs, in order."""
+        return [e["input"] for e in self.events() if e["kind"] == "run"]
+
+
+def _recording_action(action: Action, cassette: Cassette) -> Action:
+    function = action.function
+
+    if inspect.iscoroutinefunction(function):
+        async def recorded(**args):
+            try:
+                result = await function(**args)
+            except Exception as e:
+                cassette.append({"kind": "tool", "name": action.name, "args": args, "raised": str(e)})
+                raise
+            cassette.append({"kind": "tool", "name": action.name, "args": args, "result": result})
+            return result
+    else:
+        def recorded(**args):
+            try:
+                result = function(**args)
+            except Exception as e:
+                cassette.append({"kind": "tool", "name": action.name, "args": args, "raised": str(e)})
+                raise
+            cassette.append({"kind": "tool", "name": action.name, "args": args, "result": result})
+            return result
+
+    return dataclasses.replace(action, function=recorded)
+
+
+class RecordingAgent:
+    """An agent whose runs are recorded to a cassette; ``run`` has the same signature as ``Agent.run``."""
+
+    def __init__(self, agent: Agent, cassette: Cassette):
+        self.cassette = cassette
+
+        async def generate(prompt: Prompt) -> Any:
+            response = await agent._generate(prompt)
+            cassette.append({"kind": "llm", "key": prompt_key(prompt), "response": response})
+            return response
+
+        registry = ActionRegistry([_recording_action(a, cassette) for a in agent.action_registry.get_actions()])
+        self.agent = agent.clone(generate_response=generate, action_registry=registry)
+
+    async def run(self, user_input: str, **kwargs):
+        self.cassette.append({"kind": "run", "input": user_input})
+        return await self.agent.run(user_input, **kwargs)
+
+
+def record_agent(agent: Agent, path: str) -> RecordingAgent:
+    """Wrap ``agent`` so that its runs are appended to the cassette at ``path``."""
+    return RecordingAgent(agent, Cassette(path))
+
+
+class Replayer:
+    """Serves recorded replies and tool results, each at most once, in recorded order per key."""
+
+    def __init__(self, cassette: Cassette, strict: bool = True):
+        self.strict = strict
+        self.responses: List[Any] = []
+        self.replies: Dict[str, Deque[int]] = defaultdict(deque)
+        self.used: Set[int] = set()
+        self._next = 0
+        self.tools: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for event in cassette.events():
+            if event["kind"] == "llm":
+                self.replies[event["key"]].append(len(self.responses))
+                self.responses.append(event["response"])
+            elif event["kind"] == "tool":
+                self.tools[_args_key(event["name"], event["args"])].append(event)
+
+    async def generate_response(self, prompt: Prompt) -> Any:
+        key = prompt_key(prompt)
+        if self.replies.get(key):
+            index = self.replies[key].popleft()
+        else:
+            while self._next in self.used:
+                self._next += 1
+            if self.strict or self._next >= len(self.responses):
+                raise CassetteMismatch(f"No recorded reply for prompt {key[:12]} "
+                                       f"(last message: {str(prompt.messages[-1].get('content'))[:80]!r})")
+            # Lenient mode: the prompt changed, but keep the run going with the next unused reply
+            index = self._next
+        self.used.add(index)
+        return self.responses[index]
+
+    def tool(self, name: str) -> Callable[..., Any]:
+        async def replayed(**args):
+            recorded = self.tools.get(_args_key(name, args))
+            if not recorded:
+                raise CassetteMismatch(f"No recorded result for {name}({args})")
+            event = recorded.popleft()
+            if "raised" in event:
+                raise RuntimeError(event["raised"])
+            return event["result"]
+        return replayed
+
+
+def replay_agent(agent: Agent, path: str, strict: bool = True) -> Agent:
+    """
+    A copy of ``agent`` that takes its model replies and tool results from the
+    cassette at ``path`` instead of the provider and the real tools.
+    """
+    replayer = Replayer(Cassette(path), strict=strict)
+    registry = ActionRegistry([dataclasses.replace(a, function=replayer.tool(a.name))
+                               for a in agent.action_registry.get_actions()])
+    return agent.clone(generate_response=replayer.generate_response, action_registry=registry)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from agent_core.server import load_agent
+
+    parser = argparse.ArgumentParser(description="Record agent runs to a cassette, or replay them.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Run the agent for real and record it")
+    record.add_argument("agent", help="script.py:name or module:name")
+    record.add_argument("task")
+    record.add_argument("-o", "--output", required=True, help="Cassette file to append to")
+    replay = commands.add_parser("replay", help="Re-run every recorded task from the cassette")
+    replay.add_argument("agent", help="script.py:name or module:name")
+    replay.add_argument("cassette")
+    replay.add_argument("--lenient", action="store_true", help="Tolerate prompts that changed since recording")
+    args = parser.parse_args(argv)
+
+    agent = load_agent(args.agent)
+    if args.command == "record":
+        result = asyncio.run(record_agent(agent, args.output).run(args.task))
+        print(json.dumps({"final": result.final, "iterations": result.iterations}, default=str))
+        return
+
+    replayed = replay_agent(agent, args.cassette, strict=not args.lenient)
+
+    async def run_all() -> None:
+        for task in Cassette(args.cassette).inputs():
+            result = await replayed.run(task)
+            print(json.dumps({"task": task, "final": result.final, "iterations": result.iterations}, default=str))
+
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
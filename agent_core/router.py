@@ -0,0 +1,100 @@
+"""
+Per-call-site model routing with escalation.
+
+Call sites ask for a tier ("fast", "powerful") or for "auto", in which case
+the tier is picked from the tool that is making the call (see
+``agent_core.metrics.tool_scope``). Cheap, well-constrained tasks can then run
+on a fast model and be escalated to a stronger one only when its output fails
+validation.
+"""
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from agent_core.metrics import current_tool_path
+
+
+AUTO = "auto"
+
+
+class ModelRouter:
+    """
+    Maps tools/tags to model tiers and tiers to concrete models.
+
+    Args:
+        tiers: Tier name -> litellm model string, ordered from cheapest to strongest
+        default_tier: Tier used when no route matches
+        routes: Tool name or tag -> tier name
+    """
+
+    def __init__(self, tiers: Dict[str, str], default_tier: str, routes: Optional[Dict[str, str]] = None):
+        if default_tier not in tiers:
+            raise ValueError(f"Unknown default tier: {default_tier}")
+        self.tiers = dict(tiers)
+        self.order: List[str] = list(tiers)
+        self.default_tier = default_tier
+        self.routes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        for name, tier in (routes or {}).items():
+            self.route(**{name: tier})
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """
+        Two tiers, "fast" and "powerful", overridable with ``AGENT_LLM_FAST_MODEL`` and
+        ``AGENT_LLM_POWERFUL_MODEL``. Unrouted calls use the powerful tier, so nothing
+        gets cheaper (or worse) until a call site is explicitly routed to "fast".
+        """
+        return cls(
+            tiers={
+                "fast": os.getenv("AGENT_LLM_FAST_MODEL", "groq/llama-3.1-8b-instant"),
+                "powerful": os.getenv("AGENT_LLM_POWERFUL_MODEL", "groq/llama-3.3-70b-versatile"),
+            },
+            default_tier="powerful",
+        )
+
+    def route(self, **routes: str) -> None:
+        """Assign tools/tags to tiers, e.g. ``route(extract_contact_info="fast")``."""
+        for name, tier in routes.items():
+            if tier not in self.tiers:
+                raise ValueError(f"Unknown tier {tier!r} for {name!r}")
+        with self._lock:
+            self.routes.update(routes)
+
+    def tier_for(self, tool_path: Optional[Sequence[str]] = None) -> str:
+        """
+        Tier for the current call site.
+
+        The outermost routed tool wins, so a tool that delegates to a generic
+        helper (check_purchasing_rules -> prompt_llm_for_json) keeps its own tier.
+        """
+        path = current_tool_path() if tool_path is None else tool_path
+        with self._lock:
+            for name in path:
+                if name in self.routes:
+                    return self.routes[name]
+        return self.default_tier
+
+    def escalate(self, tier: str) -> Optional[str]:
+        """The next stronger tier, or None if ``tier`` is already the strongest."""
+        index = self.order.index(tier)
+        return self.order[index + 1] if index + 1 < len(self.order) else None
+
+    def resolve(self, model: str) -> str:
+        """Turn "auto" or a tier name into a concrete model; other model strings pass through."""
+        if model == AUTO:
+            model = self.tier_for()
+        return self.tiers.get(model, model)
+
+
+_default_router: Optional[ModelRouter] = None
+_default_router_lock = threading.Lock()
+
+
+def get_router() -> ModelRouter:
+    """Return the process-wide router, creating it on first use."""
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            _default_router = ModelRouter.from_env()
+        return _default_router
@@ -0,0 +1,221 @@
+"""
+Compiled JSON schemas for structured LLM output.
+
+``prompt_llm_for_json`` promises "a dictionary matching the provided schema"
+but used to return whatever parsed. It also rendered the schema into the
+prompt with ``json.dumps(..., indent=4)`` on every attempt. ``compile_schema``
+turns a schema into a ``CompiledSchema`` once: a tree of small validator
+closures plus a minified rendering for prompts. Compiled schemas are cached
+by schema identity and, for schemas rebuilt on every call (as in most tools),
+by a hash of their canonical JSON.
+
+The validator covers the JSON Schema keywords the tools here use: ``type``,
+``properties``, ``required``, ``additionalProperties``, ``items``, ``enum``,
+``const``, ``anyOf``/``oneOf``, ``minimum``/``maximum``,
+``minLength``/``maxLength`` and ``minItems``/``maxItems``. Other keywords are
+ignored. Errors come back with JSON paths (``$.line_items[0].quantity``), so
+a retry can tell the model exactly what to fix.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (value, path, errors) -> None; appends a message to errors for each violation
+Validator = Callable[[Any, str, List[str]], None]
+
+_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+}
+
+
+class SchemaError(ValueError):
+    """A value that does not match its schema; ``errors`` lists every violation with its path."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def _compile(schema: Dict[str, Any]) -> Validator:
+    checks: List[Validator] = []
+
+    types = schema.get("type")
+    if types is not None:
+        names = [types] if isinstance(types, str) else list(types)
+        tests = [_TYPES[name] for name in names if name in _TYPES]
+        expected = " or ".join(names)
+
+        def check_type(value, path, errors):
+            if not any(test(value) for test in tests):
+                errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+        checks.append(check_type)
+
+    if "enum" in schema:
+        options = schema["enum"]
+
+        def check_enum(value, path, errors):
+            if value not in options:
+                errors.append(f"{path}: must be one of {options}")
+        checks.append(check_enum)
+
+    if "const" in schema:
+        const = schema["const"]
+
+        def check_const(value, path, errors):
+            if value != const:
+                errors.append(f"{path}: must be {const!r}")
+        checks.append(check_const)
+
+    for key in ("anyOf", "oneOf"):
+        if key in schema:
+            branches = [_compile(s) for s in schema[key]]
+
+            def check_any(value, path, errors, branches=branches, key=key):
+                if not any(_valid(branch, value) for branch in branches):
+                    errors.append(f"{path}: does not match any of the {key} alternatives")
+            checks.append(check_any)
+
+    properties = {name: _compile(s) for name, s in (schema.get("properties") or {}).items()}
+    required = list(schema.get("required") or [])
+    additional = schema.get("additionalProperties", True)
+    extra = _compile(additional) if isinstance(additional, dict) else None
+    if properties or required or additional is not True:
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required property {name!r}")
+            for name, item in value.items():
+                validator = properties.get(name, extra)
+                if validator is not None:
+                    validator(item, f"{path}.{name}", errors)
+                elif additional is False and name not in properties:
+                    errors.append(f"{path}: unexpected property {name!r}")
+        checks.append(check_object)
+
+    items = schema.get("items")
+    min_items, max_items = schema.get("minItems"), schema.get("maxItems")
+    if isinstance(items, dict) or min_items is not None or max_items is not None:
+        item_validator = _compile(items) if isinstance(items, dict) else None
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if min_items is not None and len(value) < min_items:
+                errors.append(f"{path}: expected at least {min_items} items")
+            if max_items is not None and len(value) > max_items:
+                errors.append(f"{path}: expected at most {max_items} items")
+            if item_validator is not None:
+                for i, item in enumerate(value):
+                    item_validator(item, f"{path}[{i}]", errors)
+        checks.append(check_array)
+
+    minimum, maximum = schema.get("minimum"), schema.get("maximum")
+    if minimum is not None or maximum is not None:
+        def check_range(value, path, errors):
+            if not _TYPES["number"](value):
+                return
+            if minimum is not None and value < minimum:
+                errors.append(f"{path}: must be >= {minimum}")
+            if maximum is not None and value > maximum:
+                errors.append(f"{path}: must be <= {maximum}")
+        checks.append(check_range)
+
+    min_length, max_length = schema.get("minLength"), schema.get("maxLength")
+    if min_length is not None or max_length is not None:
+        def check_length(value, path, errors):
+            if not isinstance(value, str):
+                return
+            if min_length is not None and len(value) < min_length:
+                errors.append(f"{path}: must be at least {min_length} characters")
+            if max_length is not None and len(value) > max_length:
+                errors.append(f"{path}: must be at most {max_length} characters")
+        checks.append(check_length)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check_all(value, path, errors):
+        for check in checks:
+            check(value, path, errors)
+    return check_all
+
+
+def _valid(validator: Validator, value: Any) -> bool:
+    errors: List[str] = []
+    validator(value, "$", errors)
+    return not errors
+
+
+class CompiledSchema:
+    """
+    A schema compiled for repeated use.
+
+    Attributes:
+        schema: The original schema
+        prompt: Minified JSON rendering of the schema, for system prompts
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.prompt = json.dumps(schema, separators=(",", ":"))
+        self._validator = _compile(schema)
+
+    def errors(self, value: Any) -> List[str]:
+        """Every violation of the schema in ``value``, each prefixed with its JSON path."""
+        errors: List[str] = []
+        self._validator(value, "$", errors)
+        return errors
+
+    def is_valid(self, value: Any) -> bool:
+        return not self.errors(value)
+
+    def validate(self, value: Any) -> Any:
+        """Return ``value`` if it matches the schema, else raise ``SchemaError``."""
+        errors = self.errors(value)
+        if errors:
+            raise SchemaError(errors)
+        return value
+
+
+_cache_lock = threading.Lock()
+# id(schema) -> (schema, compiled); the schema is kept so its id cannot be reused while cached
+_by_identity: "OrderedDict[int, Tuple[Dict[str, Any], CompiledSchema]]" = OrderedDict()
+_by_hash: "OrderedDict[str, CompiledSchema]" = OrderedDict()
+CACHE_SIZE = 256
+
+
+def compile_schema(schema: Dict[str, Any]) -> CompiledSchema:
+    """
+    The compiled form of ``schema``, from the cache when the same schema (by
+    identity, or else by content) has been compiled before. Schemas must not be
+    mutated after they have been compiled.
+    """
+    with _cache_lock:
+        entry = _by_identity.get(id(schema))
+        if entry is not None and entry[0] is schema:
+            _by_identity.move_to_end(id(schema))
+            return entry[1]
+
+    digest = hashlib.sha256(json.dumps(schema, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+    with _cache_lock:
+        compiled: Optional[CompiledSchema] = _by_hash.get(digest)
+        if compiled is None:
+            compiled = _by_hash[digest] = CompiledSchema(schema)
+            if len(_by_hash) > CACHE_SIZE:
+                _by_hash.popitem(last=False)
+        else:
+            _by_hash.move_to_end(digest)
+        _by_identity[id(schema)] = (schema, compiled)
+        if len(_by_identity) > CACHE_SIZE:
+            _by_identity.popitem(last=False)
+        return compiled
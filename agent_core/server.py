@@ -0,0 +1,326 @@
+"""
+Multi-session agent server.
+
+Hosts many conversations with one ``Agent`` in a single event loop, over local
+HTTP or a Unix socket::
+
+    python -m agent_core.server "AI Agents and Agentic AI with Python & Generative AI/agentWithTools.py:agent" --port 8800
+
+    POST   /sessions                 -> {"session_id": ..., "budget": ...}
+    POST   /sessions/<id>/messages   {"content": "..."} -> {"reply": ..., "terminated": ..., "iterations": ..., "budget": ...}
+    GET    /sessions/<id>            -> the session's memory
+    DELETE /sessions/<id>
+    GET    /stats
+
+Each session has its own memory and an iteration budget shared by all of its
+turns; turns within one session run one at a time. LLM calls from all sessions
+go through a ``FairScheduler``, which hands out a fixed number of call slots
+round-robin across sessions, so one busy conversation cannot starve the rest.
+"""
+import argparse
+import asyncio
+import contextvars
+import importlib
+import json
+import runpy
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from agent_core.agent import Agent, Memory, Prompt
+from agent_core.metrics import percentile
+
+_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("agent_core_session", default=None)
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            429: "Too Many Requests", 502: "Bad Gateway", 503: "Service Unavailable"}
+
+
+class FairScheduler:
+    """
+    Limits concurrent operations and grants free slots round-robin across keys.
+
+    A key with many queued requests gets one slot per round, just like a key
+    with a single request, instead of slots going to whoever asked first.
+    """
+
+    def __init__(self, max_concurrency: int = 64):
+        self.max_concurrency = max_concurrency
+        self.active = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        self._order: Deque[str] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def acquire(self, key: str) -> None:
+        if self.active < self.max_concurrency and not self._order:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._order.append(key)
+        queue.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled; pass it on
+                self.release()
+            elif future in queue:
+                queue.remove(future)
+                if not queue:
+                    del self._queues[key]
+                    self._order.remove(key)
+            raise
+
+    def release(self) -> None:
+        self.active -= 1
+        while self.active < self.max_concurrency and self._order:
+            key = self._order.popleft()
+            queue = self._queues[key]
+            future = queue.popleft()
+            if queue:
+                self._order.append(key)
+            else:
+                del self._queues[key]
+            if not future.cancelled():
+                self.active += 1
+                future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class Session:
+    def __init__(self, budget: int, memory: Memory):
+        self.id = uuid.uuid4().hex
+        self.memory = memory
+        self.budget = budget
+        self.turns = 0
+        self.last_active = time.monotonic()
+        self.lock = asyncio.Lock()
+
+
+class SessionError(Exception):
+    """A request the server refuses; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AgentServer:
+    """
+    Serves agent sessions over HTTP or a Unix socket.
+
+    Args:
+        agent: The agent every session runs; it is shared, so it must not keep per-run state
+        max_llm_concurrency: LLM calls in flight across all sessions
+        session_iterations: Iteration budget of a session over its whole lifetime
+        max_sessions: Sessions kept at once; creating more fails with 503
+        idle_timeout: Seconds after which an idle session is dropped, or None to keep sessions
+    """
+
+    def __init__(self, agent: Agent, max_llm_concurrency: int = 64, session_iterations: int = 50,
+                 max_sessions: int = 10_000, idle_timeout: Optional[float] = 3600.0):
+        self.scheduler = FairScheduler(max_llm_concurrency)
+        self.session_iterations = session_iterations
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, Session] = {}
+        self.turn_latencies: Deque[float] = deque(maxlen=10_000)
+        self.sessions_created = 0
+        self.turns = 0
+        self.errors = 0
+
+        generate = agent.generate_response
+        scheduler = self.scheduler
+
+        async def scheduled_generate(prompt: Prompt) -> Any:
+            async with scheduler.slot(_session.get() or ""):
+                if asyncio.iscoroutinefunction(generate):
+                    return await generate(prompt)
+                return await asyncio.to_thread(generate, prompt)
+
+        # Same agent, but every LLM call waits for a fairly scheduled slot
+        self.agent = agent.clone(generate_response=scheduled_generate, on_action=None)
+
+    def create_session(self) -> Session:
+        self._expire_idle()
+        if len(self.sessions) >= self.max_sessions:
+            raise SessionError(503, "Too many sessions")
+        session = Session(self.session_iterations, self.agent.memory_factory())
+        self.sessions[session.id] = session
+        self.sessions_created += 1
+        return session
+
+    def get_session(self, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise SessionError(404, f"Unknown session: {session_id}")
+        return session
+
+    def close_session(self, session_id: str) -> None:
+        self.get_session(session_id)
+        del self.sessions[session_id]
+
+    def _expire_idle(self) -> None:
+        if self.idle_timeout is None:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id in [s.id for s in self.sessions.values() if s.last_active < cutoff and not s.lock.locked()]:
+            del self.sessions[session_id]
+
+    async def send(self, session_id: str, content: str) -> Dict[str, Any]:
+        """Run one user turn in a session and return the agent's reply."""
+        session = self.get_session(session_id)
+        async with session.lock:
+            if session.budget <= 0:
+                raise SessionError(429, "Session iteration budget exhausted")
+            _session.set(session.id)
+            started = time.perf_counter()
+            try:
+                result = await self.agent.run(content, memory=session.memory,
+                                              max_iterations=min(self.agent.max_iterations, session.budget))
+            except Exception as e:
+                self.errors += 1
+                raise SessionError(502, f"Agent turn failed: {e}") from e
+            self.turn_latencies.append(time.perf_counter() - started)
+            session.budget -= result.iterations
+            session.turns += 1
+            session.last_active = time.monotonic()
+            self.turns += 1
+        return {"reply": result.final, "terminated": result.terminated,
+                "iterations": result.iterations, "budget": session.budget}
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = list(self.turn_latencies)
+        return {
+            "sessions": len(self.sessions),
+            "sessions_created": self.sessions_created,
+            "turns": self.turns,
+            "errors": self.errors,
+            "llm_active": self.scheduler.active,
+            "llm_waiting": self.scheduler.waiting,
+            "turn_p50_s": percentile(latencies, 50),
+            "turn_p99_s": percentile(latencies, 99),
+        }
+
+    async def dispatch(self, method: str, path: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Route one request; returns ``(status, payload)``."""
+        parts = [p for p in path.split("?")[0].split("/") if p]
+        try:
+            if parts == ["stats"] and method == "GET":
+                return 200, self.stats()
+            if parts == ["sessions"] and method == "POST":
+                session = self.create_session()
+                return 201, {"session_id": session.id, "budget": session.budget}
+            if len(parts) == 2 and parts[0] == "sessions":
+                if method == "GET":
+                    session = self.get_session(parts[1])
+                    return 200, {"session_id": session.id, "budget": session.budget, "turns": session.turns,
+                                 "memory": session.memory.get_memories()}
+                if method == "DELETE":
+                    self.close_session(parts[1])
+                    return 200, {"closed": parts[1]}
+            if len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages" and method == "POST":
+                if not isinstance(body.get("content"), str):
+                    raise SessionError(400, 'Expected {"content": "..."}')
+                return 200, await self.send(parts[1], body["content"])
+            return 404, {"error": "Not found"}
+        except SessionError as e:
+            return e.status, {"error": str(e)}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Minimal HTTP/1.1 with keep-alive and JSON bodies."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                raw = await reader.readexactly(int(headers.get("content-length") or 0))
+                try:
+                    body = json.loads(raw) if raw else {}
+                    status, payload = await self.dispatch(method.upper(), path, body if isinstance(body, dict) else {})
+                except ValueError:
+                    status, payload = 400, {"error": "Invalid JSON body"}
+
+                data = json.dumps(payload, default=str).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8800, path: Optional[str] = None) -> asyncio.AbstractServer:
+        """Start listening on ``path`` (Unix socket) or ``host:port``; ``port=0`` picks a free port."""
+        if path:
+            return await asyncio.start_unix_server(self.handle, path=path, limit=2 ** 20)
+        return await asyncio.start_server(self.handle, host, port, limit=2 ** 20, backlog=4096)
+
+
+def load_agent(target: str) -> Agent:
+    """Load an ``Agent`` from ``path/to/script.py:name`` or ``package.module:name``."""
+    location, _, name = target.rpartition(":")
+    if not location:
+        raise ValueError(f"Expected 'script.py:name' or 'module:name', got {target!r}")
+    if location.endswith(".py"):
+        return runpy.run_path(location)[name]
+    return getattr(importlib.import_module(location), name)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve many agent sessions from one process.")
+    parser.add_argument("agent", help="Agent to host, as path/to/script.py:name or module:name")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--unix", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--llm-concurrency", type=int, default=64, help="LLM calls in flight across sessions")
+    parser.add_argument("--session-iterations", type=int, default=50, help="Iteration budget per session")
+    parser.add_argument("--max-sessions", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    server = AgentServer(load_agent(args.agent), max_llm_concurrency=args.llm_concurrency,
+                         session_iterations=args.session_iterations, max_sessions=args.max_sessions)
+
+    async def run() -> None:
+        listener = await server.start(args.host, args.port, args.unix)
+        where = args.unix or f"http://{args.host}:{listener.sockets[0].getsockname()[1]}"
+        print(f"Agent server listening on {where}", flush=True)
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Single-flight deduplication of identical in-flight calls.
+
+When several agents send byte-identical prompts at the same moment (fixed
+persona and rules text make this common), only the first caller reaches the
+provider; the others wait for its result. The response cache covers repeats
+over time, single-flight covers repeats that overlap in time.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution."""
+
+    def __init__(self):
+        self.executed = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[Tuple[int, str], Tuple[asyncio.Task, list]] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` unless a call with the same key is already running; then share its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async version of ``do``.
+
+        The shared call runs as its own task. A caller that is cancelled stops
+        waiting without affecting the others; the upstream call is cancelled
+        only once every caller has gone away.
+        """
+        loop_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            entry = self._tasks.get(loop_key)
+            if entry is None:
+                task = asyncio.ensure_future(fn())
+                entry = self._tasks[loop_key] = (task, [0])
+                task.add_done_callback(lambda _: self._forget(loop_key, task))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+            task, waiters = entry
+            waiters[0] += 1
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                with self._lock:
+                    waiters[0] -= 1
+                    abandoned = waiters[0] == 0
+                if abandoned:
+                    task.cancel()
+            raise
+
+    def _forget(self, loop_key: Tuple[int, str], task: asyncio.Task) -> None:
+        with self._lock:
+            entry = self._tasks.get(loop_key)
+            if entry is not None and entry[0] is task:
+                del self._tasks[loop_key]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of upstream executions and of calls that piggybacked on one."""
+        with self._lock:
+            return {"executed": self.executed, "coalesced": self.coalesced}
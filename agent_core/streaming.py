@@ -0,0 +1,383 @@
+"""
+Fenced blocks in LLM output.
+
+Agents ask the model to think out loud and then emit a fenced ```action (or
+```json, ```python) block. ``scan_fences`` finds every block of a complete
+response in one linear pass and reports offsets, so a body is copied only
+when it is used. ``FenceDetector`` does the same incrementally for streamed
+output: everything generated after the wanted block is discarded, so reading
+can stop as soon as that block is closed. For ```action and ```json blocks,
+``JsonStreamParser`` parses the body while it streams. The block is complete
+at its final closing brace, and ``tool_name`` is known before ``args`` has
+arrived.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+FENCE = "```"
+# Fenced block types whose bodies are JSON
+JSON_BLOCKS = ("action", "json")
+
+# An info string runs up to whitespace or the start of a same-line body
+_INFO = re.compile(r"[^\s`{\[]*")
+_JSON_OPEN = re.compile(r"[{\[]")
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURAL = re.compile(r'[{}\[\]",:]')
+_BLANKS = re.compile(r"[ \t]*")
+
+
+def _info_end(text: str, pos: int) -> int:
+    """End of the info string starting at ``pos`` (just after an opening fence)."""
+    return _INFO.match(text, pos).end()
+
+
+def _closes(text: str, idx: int) -> Optional[bool]:
+    """
+    Whether the fence at ``idx`` can close a block: it starts its line (after
+    indentation) or ends it. Backticks inside a body, such as a code sample in
+    a JSON string value, do neither. None when the rest of the line has not
+    arrived yet.
+    """
+    if idx == 0 or text[idx - 1] == "\n" or not text[text.rfind("\n", 0, idx) + 1:idx].strip():
+        return True
+    after = _BLANKS.match(text, idx + len(FENCE)).end()
+    if after == len(text):
+        return None
+    return text[after] in "\r\n"
+
+
+def _closing_fence(text: str, pos: int) -> int:
+    """Offset of the first fence at or after ``pos`` that closes a block, or -1 (``text`` is complete)."""
+    while True:
+        idx = text.find(FENCE, pos)
+        if idx == -1 or _closes(text, idx) is not False:
+            return idx
+        pos = idx + len(FENCE)
+
+
+@dataclass
+class FencedBlock:
+    """
+    A fenced block located in ``source``. Only offsets are stored; the body is
+    sliced out when ``body`` is read.
+    """
+    source: str = field(repr=False)
+    # Info string after the opening fence ("json", "action", "python", or "" for none)
+    info: str
+    # Offsets of the body: just after the info string, up to the closing fence
+    start: int
+    end: int
+    # False for a final block the response ended inside (e.g. cut off by max_tokens)
+    closed: bool = True
+
+    @property
+    def body(self) -> str:
+        return self.source[self.start:self.end].strip()
+
+
+def scan_fences(text: str) -> Iterator[FencedBlock]:
+    """
+    Every fenced block of ``text`` in order, in a single left-to-right pass.
+
+    A block runs from an opening fence and its info string to the next fence
+    that starts or ends a line. That covers bodies on the same line as the
+    fences (```action {...} ```) and skips backticks inside the body.
+    """
+    pos = 0
+    while True:
+        opening = text.find(FENCE, pos)
+        if opening == -1:
+            return
+        start = _info_end(text, opening + len(FENCE))
+        closing = _closing_fence(text, start)
+        if closing == -1:
+            yield FencedBlock(text, text[opening + len(FENCE):start], start, len(text), closed=False)
+            return
+        yield FencedBlock(text, text[opening + len(FENCE):start], start, closing)
+        pos = closing + len(FENCE)
+
+
+def find_fence(text: str, block_type: Optional[str] = None) -> Optional[FencedBlock]:
+    """First closed block whose info string is ``block_type`` (any block if None); stops scanning there."""
+    return next((b for b in scan_fences(text) if b.closed and (block_type is None or b.info == block_type)), None)
+
+
+def fenced_block(text: str, block_type: Optional[str] = None, default: Optional[str] = None) -> Optional[str]:
+    """Body of the first closed ``block_type`` block of ``text``, or ``default`` if there is none."""
+    block = find_fence(text, block_type)
+    return block.body if block is not None else default
+
+
+class JsonStreamParser:
+    """
+    Incremental parser for one JSON object (or array) arriving in pieces.
+
+    Text before the opening bracket is skipped. Each top-level member of an
+    object is reported through ``on_member`` as soon as its value is complete:
+    ``"tool_name"`` is known while ``"args"`` is still streaming. The whole
+    value is available the moment its closing bracket arrives. Every character
+    is looked at once. Runs of string contents and whitespace are skipped with
+    regex searches, and the finished value is parsed by ``json.loads``.
+
+    Args:
+        on_member: Called with ``(key, value)`` for each completed top-level member
+    """
+
+    def __init__(self, on_member: Optional[Callable[[str, Any], None]] = None):
+        self.on_member = on_member
+        self.text = ""
+        self.members: Dict[str, Any] = {}
+        self.value: Any = None
+        self.done = False
+        # Offset just past the closing bracket, once done
+        self.end: Optional[int] = None
+        self.error: Optional[str] = None
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._object = False
+        self._depth = 0
+        self._in_string = False
+        self._string_start = 0
+        # Current top-level member: its key, where its value starts (after the colon), and
+        # where a nested object/array value opened
+        self._key: Optional[str] = None
+        self._colon: Optional[int] = None
+        self._nested: Optional[int] = None
+
+    def feed(self, chunk: str) -> Any:
+        """Add streamed text. Returns the parsed value once it is complete, else None."""
+        if self.done or self.error is not None:
+            return self.value
+        self.text += chunk
+        text, pos = self.text, self._pos
+        try:
+            while True:
+                if self._start is None:
+                    match = _JSON_OPEN.search(text, pos)
+                    if match is None:
+                        pos = len(text)
+                        break
+                    self._start, self._object, self._depth = match.start(), match.group() == "{", 1
+                    pos = match.end()
+                    continue
+
+                if self._in_string:
+                    match = _STRING_SPECIAL.search(text, pos)
+                    if match is None:
+                        pos = len(text)
+                        break
+                    if match.group() == "\\":
+                        if match.end() == len(text):
+                            # The escaped character has not arrived yet
+                            pos = match.start()
+                            break
+                        pos = match.end() + 1
+                        continue
+                    pos = match.end()
+                    self._in_string = False
+                    if self._depth == 1 and self._object:
+                        if self._colon is None:
+                            self._key = json.loads(text[self._string_start:pos])
+                        else:
+                            self._member(json.loads(text[self._string_start:pos]))
+                    continue
+
+                match = _STRUCTURAL.search(text, pos)
+                if match is None:
+                    pos = len(text)
+                    break
+                char, index, pos = match.group(), match.start(), match.end()
+                if char == '"':
+                    self._in_string, self._string_start = True, index
+                elif char in "{[":
+                    if self._depth == 1 and self._colon is not None:
+                        self._nested = index
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 1 and self._nested is not None:
+                        self._member(json.loads(text[self._nested:pos]))
+                    elif self._depth == 0:
+                        if self._key is not None and self._colon is not None:
+                            self._member(json.loads(text[self._colon:index]))
+                        self.value = json.loads(text[self._start:pos])
+                        self.done, self.end = True, pos
+                        break
+                elif self._depth == 1 and self._object:
+                    if char == ":":
+                        self._colon = pos
+                    elif self._key is not None and self._colon is not None:
+                        # "," after a number, true, false or null
+                        self._member(json.loads(text[self._colon:index]))
+        except json.JSONDecodeError as e:
+            self.error = str(e)
+        self._pos = pos
+        return self.value
+
+    @property
+    def in_string(self) -> bool:
+        """Whether the text fed so far ends inside a JSON string."""
+        return self._in_string
+
+    def _member(self, value: Any) -> None:
+        key = self._key
+        self._key = self._colon = self._nested = None
+        self.members[key] = value
+        if self.on_member is not None:
+            self.on_member(key, value)
+
+
+class FenceDetector:
+    """
+    Watches streamed text for the first complete fenced block of a given type.
+
+    Handles fences split across chunks and both layouts models produce:
+    the body on the lines after the info string, or on the same line
+    (```action {...} ```). Only a fence that starts or ends its line closes a
+    block. Blocks of other types are skipped over.
+
+    With ``parse_json`` the body is parsed as it streams. The block is then
+    complete as soon as its JSON is, without waiting for the closing fence,
+    and ``on_member`` sees each top-level member as soon as it is complete.
+    A body that turns out not to be JSON falls back to waiting for the fence.
+
+    Args:
+        block_type: Info string to look for (e.g. "action"), or None for any block
+        parse_json: Parse the target block's body incrementally as JSON
+        on_member: Called with ``(key, value)`` for each completed top-level member (needs ``parse_json``)
+    """
+
+    def __init__(self, block_type: Optional[str] = None, parse_json: bool = False,
+                 on_member: Optional[Callable[[str, Any], None]] = None):
+        self.block_type = block_type
+        self.parse_json = parse_json
+        self.on_member = on_member
+        self.text = ""
+        self.block: Optional[str] = None
+        self.end: Optional[int] = None
+        self.json: Optional[JsonStreamParser] = None
+        self._json_fed = 0
+        self._pos = 0
+        self._open: Optional[tuple] = None
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add streamed text. Returns the block body once the target block has been closed."""
+        if self.block is not None:
+            return self.block
+        self.text += chunk
+
+        while True:
+            if self.json is not None:
+                if self._feed_json():
+                    return self.block
+                if self.json is not None:
+                    # Still parsing: the parser decides which fence closes the block
+                    return None
+
+            idx = self.text.find(FENCE, self._pos)
+            if idx == -1:
+                # Keep a possible partial fence at the end of the buffer in view
+                self._pos = max(self._pos, len(self.text) - len(FENCE) + 1)
+                return None
+
+            if self._open is None:
+                info_end = _info_end(self.text, idx + len(FENCE))
+                if info_end == len(self.text):
+                    # The info string may still be streaming in
+                    self._pos = idx
+                    return None
+                self._open = (self.text[idx + len(FENCE):info_end], info_end)
+                self._pos = info_end
+                if self.parse_json and self._is_target(self._open[0]):
+                    self.json, self._json_fed = JsonStreamParser(self.on_member), info_end
+                continue
+
+            closes = _closes(self.text, idx)
+            if not closes:
+                # Backticks inside the body, or a fence whose line is still streaming in
+                self._pos = idx if closes is None else idx + len(FENCE)
+                if closes is None:
+                    return None
+                continue
+            info, start = self._open
+            if self._is_target(info):
+                self.block = self.text[start:idx].strip()
+                self.end = idx + len(FENCE)
+                return self.block
+            self._open = None
+            self._pos = idx + len(FENCE)
+
+    def _is_target(self, info: str) -> bool:
+        return self.block_type is None or info == self.block_type
+
+    def _feed_json(self) -> bool:
+        """
+        Feed the open block's new text to the JSON parser; True once its value is complete.
+
+        Text is fed only up to the next fence outside a JSON string. That fence
+        closes the block, so nothing after it is ever parsed as part of the body.
+        """
+        while True:
+            fence = self.text.find(FENCE, max(self._open[1], self._json_fed - len(FENCE) + 1))
+            stop = len(self.text) if fence == -1 else fence
+            if stop > self._json_fed:
+                self.json.feed(self.text[self._json_fed:stop])
+                self._json_fed = stop
+            if self.json.error is not None:
+                self.json = None
+                return False
+            if self.json.done:
+                start = self._open[1]
+                self.end = start + self.json.end
+                self.block = self.text[start:self.end].strip()
+                return True
+            if fence == -1:
+                return False
+            if not self.json.in_string:
+                # The block closed before its JSON did; the fence search in ``feed`` takes over
+                self.json = None
+                return False
+            # A fence inside a string value is part of the body
+            self.json.feed(self.text[self._json_fed:fence + len(FENCE)])
+            self._json_fed = fence + len(FENCE)
+
+    @property
+    def done(self) -> bool:
+        return self.block is not None
+
+
+def chunk_text(chunk: Any) -> str:
+    """Text delta carried by a litellm streaming chunk."""
+    choices = getattr(chunk, "choices", None) or []
+    if not choices:
+        return ""
+    delta = getattr(choices[0], "delta", None)
+    return (getattr(delta, "content", None) or "") if delta is not None else ""
+
+
+def close_stream(stream: Any) -> None:
+    """Stop reading a sync litellm stream early so the connection is released."""
+    for target in (stream, getattr(stream, "completion_stream", None)):
+        close = getattr(target, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+            return
+
+
+async def aclose_stream(stream: Any) -> None:
+    """Async version of ``close_stream``."""
+    for target in (stream, getattr(stream, "completion_stream", None)):
+        aclose = getattr(target, "aclose", None)
+        if callable(aclose):
+            try:
+                await aclose()
+            except Exception:
+                pass
+            return
+    close_stream(stream)
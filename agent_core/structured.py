@@ -0,0 +1,194 @@
+"""
+Provider-native structured output, with the prompt-based approach as fallback.
+
+``prompt_llm_for_json`` used to put the pretty-printed schema in a system
+message ("You MUST produce output that adheres to the following JSON
+schema") and ask for a ```json block. The schema cost prompt tokens, the
+fence and any prose cost output tokens, and a model that strayed cost a
+retry. Most providers can constrain decoding to a schema instead.
+``structured_mode`` picks one of three modes per model:
+
+* ``"json_schema"``: litellm's ``response_format`` with a JSON schema, for
+  models litellm reports as supporting response schemas
+* ``"tool"``: a single tool whose parameters are the schema, forced with
+  ``tool_choice``, for models that only support function calling
+* ``"prompt"``: the schema in a system message and a ```json block, as before
+
+``AGENT_LLM_STRUCTURED_OUTPUT`` forces a mode (default ``auto``). Calls to an
+``api_base`` endpoint, such as the mock server, use ``"prompt"`` unless a mode
+is forced, because the endpoint's capabilities are unknown. Constrained
+decoding makes invalid output rare but not impossible, so callers still parse
+and validate what comes back.
+
+``request_json`` (and ``arequest_json``) is the ``prompt_llm_for_json`` loop
+the scripts share: ask, parse and validate, and on failure ask again with the
+reason, up to three times.
+"""
+import functools
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agent_core.repair import RepairStats, get_repair_stats, parse_json
+from agent_core.schema import CompiledSchema, SchemaError, compile_schema
+from agent_core.streaming import fenced_block
+
+MODES = ("json_schema", "tool", "prompt")
+# Name of the response schema, and of the forced tool in "tool" mode
+RESPONSE_NAME = "respond"
+
+
+@functools.lru_cache(maxsize=None)
+def supported_mode(model: str) -> str:
+    """The best mode litellm's model map reports for ``model``."""
+    try:
+        import litellm
+    except ImportError:
+        return "prompt"
+    try:
+        if litellm.supports_response_schema(model=model):
+            return "json_schema"
+        if litellm.supports_function_calling(model=model):
+            return "tool"
+    except Exception:
+        # Models missing from litellm's map raise instead of answering False
+        pass
+    return "prompt"
+
+
+def structured_mode(model: str, api_base: Optional[str] = None) -> str:
+    """
+    Mode used for structured output from ``model``.
+
+    Args:
+        model: Concrete model name (tiers must already be resolved)
+        api_base: Endpoint the client sends every call to, if any
+    """
+    forced = os.getenv("AGENT_LLM_STRUCTURED_OUTPUT", "auto")
+    if forced != "auto":
+        if forced not in MODES:
+            raise ValueError(f"AGENT_LLM_STRUCTURED_OUTPUT must be auto or one of {MODES}, got {forced!r}")
+        return forced
+    if api_base:
+        return "prompt"
+    return supported_mode(model)
+
+
+def schema_instruction(compiled: CompiledSchema) -> Dict[str, str]:
+    """System message that asks for the schema in a ```json block (the "prompt" mode)."""
+    return {"role": "system",
+            "content": f"You MUST produce output that adheres to the following JSON schema:\n\n{compiled.prompt}. "
+                       "Output your JSON in a ```json markdown block."}
+
+
+def structured_params(compiled: CompiledSchema, mode: str) -> Dict[str, Any]:
+    """Request parameters that make the provider produce ``compiled``'s schema in ``mode``."""
+    if mode == "json_schema":
+        return {"response_format": {"type": "json_schema",
+                                    "json_schema": {"name": RESPONSE_NAME, "schema": compiled.schema}}}
+    if mode == "tool":
+        return {
+            "tools": [{"type": "function", "function": {
+                "name": RESPONSE_NAME,
+                "description": "Respond with the requested data.",
+                "parameters": compiled.schema,
+            }}],
+            "tool_choice": {"type": "function", "function": {"name": RESPONSE_NAME}},
+        }
+    return {}
+
+
+def structured_text(message: Any, mode: str) -> str:
+    """The JSON text of an assistant message produced in ``mode``."""
+    if mode == "tool":
+        calls: Optional[List[Any]] = getattr(message, "tool_calls", None)
+        if calls:
+            return calls[0].function.arguments
+    return getattr(message, "content", None) or ""
+
+
+def retry_reason(error: Exception) -> str:
+    """What to tell the model about its last answer: a parse error, or exactly which fields broke the schema."""
+    if isinstance(error, SchemaError):
+        return "That JSON does not match the schema:\n" + "\n".join(f"- {e}" for e in error.errors)
+    return f"That was not valid JSON ({error})."
+
+
+class _JsonRequest:
+    """Messages and outcome bookkeeping shared by ``request_json`` and ``arequest_json``."""
+
+    def __init__(self, schema: Dict[str, Any], prompt: str, mode: Optional[str], tries: int,
+                 on_retry: Optional[Callable[[Exception], None]], stats: Optional[RepairStats]):
+        self.compiled = compile_schema(schema)
+        self.messages: List[Dict[str, Any]] = [{"role": "user", "content": prompt}]
+        if mode == "prompt":
+            self.messages.insert(0, schema_instruction(self.compiled))
+        self.tries = tries
+        self.on_retry = on_retry
+        self.stats = stats if stats is not None else get_repair_stats()
+
+    def parse(self, raw_response: str, attempt: int) -> Tuple[bool, Any]:
+        """``(True, value)`` once the answer validates, ``(False, None)`` when another try is due."""
+        try:
+            # The json inside of a markdown code block, if the response has one ("prompt" mode)
+            response = fenced_block(raw_response, "json", default=raw_response)
+            return True, parse_json(response, self.compiled.validate, self.stats)
+        except (json.JSONDecodeError, SchemaError) as e:
+            if attempt == self.tries - 1:
+                self.stats.record("failed")
+                raise
+            self.stats.record("retried")
+            if self.on_retry is not None:
+                self.on_retry(e)
+            # Show the model what went wrong rather than re-sending the identical request
+            self.messages = self.messages + [
+                {"role": "assistant", "content": raw_response},
+                {"role": "user", "content": f"{retry_reason(e)}\nOutput only the corrected JSON."},
+            ]
+            return False, None
+
+
+def request_json(generate: Callable[[List[Dict[str, Any]]], str], schema: Dict[str, Any], prompt: str,
+                 mode: Optional[str] = None, tries: int = 3, on_retry: Optional[Callable[[Exception], None]] = None,
+                 stats: Optional[RepairStats] = None) -> Any:
+    """
+    Get a value matching ``schema`` from the model, retrying answers that do not parse or validate.
+
+    Only parse and schema failures are retried here; provider errors such as
+    429s are already retried (with backoff) by the LLM client.
+
+    Args:
+        generate: Sends the chat messages and returns the reply text. It is
+            responsible for sending the schema, e.g. as a ``response_schema``
+            that ends up in ``generate_json``, unless ``mode`` is "prompt"
+        schema: JSON schema of the expected value
+        prompt: The user prompt
+        mode: The structured-output mode of ``generate`` when it does not pick
+            one itself. In "prompt" mode the schema instruction is added to the
+            messages, for LLM functions that ignore ``response_schema``
+        tries: LLM calls to make at most
+        on_retry: Called with the parse or schema error before each retry
+        stats: Where to count outcomes; defaults to ``get_repair_stats()``
+
+    Returns:
+        The parsed value, validated against ``schema``
+    """
+    request = _JsonRequest(schema, prompt, mode, tries, on_retry, stats)
+    for attempt in range(tries):
+        done, value = request.parse(generate(request.messages), attempt)
+        if done:
+            return value
+    raise ValueError(f"tries must be at least 1, got {tries}")
+
+
+async def arequest_json(generate: Callable[[List[Dict[str, Any]]], Awaitable[str]], schema: Dict[str, Any],
+                        prompt: str, mode: Optional[str] = None, tries: int = 3,
+                        on_retry: Optional[Callable[[Exception], None]] = None,
+                        stats: Optional[RepairStats] = None) -> Any:
+    """Async version of ``request_json``; ``generate`` is awaited."""
+    request = _JsonRequest(schema, prompt, mode, tries, on_retry, stats)
+    for attempt in range(tries):
+        done, value = request.parse(await generate(request.messages), attempt)
+        if done:
+            return value
+    raise ValueError(f"tries must be at least 1, got {tries}")
@@ -0,0 +1,56 @@
+"""
+Native tool calls in memory.
+
+A model turn can return several ``tool_calls`` at once (e.g. one ``read_file``
+per document). The ``Agent`` engine runs all of them; these helpers decode
+their arguments and turn the turn and its results into plain-dict memory
+messages, ready to be appended in a single update.
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+def _field(obj: Any, name: str) -> Any:
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def parse_tool_arguments(arguments: Optional[str]) -> Dict[str, Any]:
+    """Decode a tool call's JSON arguments; missing, empty or ``null`` arguments mean no arguments."""
+    if not arguments or arguments == "null":
+        return {}
+    return json.loads(arguments) or {}
+
+
+def assistant_message(message: Any) -> Dict[str, Any]:
+    """
+    Plain-dict copy of an assistant message with its tool calls, suitable for
+    memory (and for stable cache keys, unlike the provider's message object).
+    """
+    result: Dict[str, Any] = {"role": "assistant", "content": _field(message, "content")}
+    tool_calls = _field(message, "tool_calls")
+    if tool_calls:
+        result["tool_calls"] = [
+            {
+                "id": _field(call, "id"),
+                "type": "function",
+                "function": {"name": _field(_field(call, "function"), "name"),
+                             "arguments": _field(_field(call, "function"), "arguments") or "{}"},
+            }
+            for call in tool_calls
+        ]
+    return result
+
+
+@dataclass
+class ToolCallResult:
+    """Outcome of one tool call: ``{"result": ...}`` on success, ``{"error": ...}`` otherwise."""
+    id: Optional[str]
+    name: str
+    args: Dict[str, Any]
+    result: Dict[str, Any]
+
+    def message(self) -> Dict[str, Any]:
+        """The ``tool`` message answering this call."""
+        return {"role": "tool", "tool_call_id": self.id, "name": self.name,
+                "content": json.dumps(self.result, default=str)}
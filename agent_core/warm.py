@@ -0,0 +1,232 @@
+"""
+Warm worker daemon for short agent runs.
+
+Importing litellm costs seconds on every process start, which dominates batch
+jobs that launch many short agent runs. The daemon imports the heavy modules
+once and forks a child per run, so each run starts with everything already
+resident::
+
+    python -m agent_core.warm serve &
+    python -m agent_core.warm run "AI Agents and Agentic AI with Python & Generative AI/simple_ai_agent.py"
+    python -m agent_core.warm stop
+
+``run`` hands its stdin/stdout/stderr, working directory, arguments and
+environment to the forked child and exits with the child's exit code. Without
+a running daemon it simply runs the script in-process.
+
+Only modules are preloaded, never clients: a forked child must open its own
+cache database and HTTP connections. Environment variables that litellm reads
+at import time take the daemon's values.
+"""
+import argparse
+import json
+import os
+import runpy
+import signal
+import socket
+import sys
+import tempfile
+import traceback
+from typing import Dict, List, Optional, Sequence
+
+# litellm imports the OpenAI SDK (several hundred modules) lazily on the first call
+PRELOAD = ("litellm", "openai", "litellm.llms.openai.openai", "dotenv", "agent_core.llm")
+
+
+def default_socket_path() -> str:
+    """``AGENT_WARM_SOCKET``, or a per-user socket in the temp directory."""
+    return os.getenv("AGENT_WARM_SOCKET") or os.path.join(tempfile.gettempdir(),
+                                                          f"agent-core-warm-{os.getuid()}.sock")
+
+
+def preload(modules: Sequence[str] = PRELOAD) -> List[str]:
+    """Import ``modules``, skipping the ones that are not installed. Returns those loaded."""
+    loaded = []
+    for name in modules:
+        try:
+            __import__(name)
+            loaded.append(name)
+        except ImportError:
+            pass
+    return loaded
+
+
+def _exit_code(exc: SystemExit) -> int:
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)
+    return 1
+
+
+def _execute(argv: List[str]) -> int:
+    """Run ``script [args]`` or ``-m module [args]`` as ``__main__``, like the interpreter would."""
+    try:
+        if argv[0] == "-m":
+            sys.argv = argv[1:]
+            runpy.run_module(argv[1], run_name="__main__", alter_sys=True)
+        else:
+            sys.argv = list(argv)
+            sys.path[0] = os.path.dirname(os.path.abspath(argv[0]))
+            runpy.run_path(argv[0], run_name="__main__")
+        return 0
+    except SystemExit as e:
+        return _exit_code(e)
+    except BaseException:
+        traceback.print_exc()
+        return 1
+
+
+def _run_child(conn: socket.socket, fds: List[int], request: Dict) -> None:
+    """Body of a forked worker: adopt the client's stdio and environment, run, report, exit."""
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    conn.sendall(f"{os.getpid()}\n".encode())
+
+    code = _execute(request["argv"])
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    try:
+        conn.sendall(f"{code}\n".encode())
+    finally:
+        os._exit(code)
+
+
+def serve(path: Optional[str] = None, modules: Sequence[str] = PRELOAD) -> None:
+    """Preload ``modules`` and serve run requests on the Unix socket at ``path`` until stopped."""
+    path = path or default_socket_path()
+    if os.getenv("AGENT_LLM_API_BASE"):
+        # Same as LLMClient: no price-map download (and its retry thread) for offline endpoints
+        os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    loaded = preload(modules)
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(64)
+    # Children are never waited on individually; let the kernel reap them
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    print(f"Warm worker listening on {path} (preloaded: {', '.join(loaded) or 'nothing'})", flush=True)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            try:
+                _, fds, _, _ = socket.recv_fds(conn, 1, 3)
+                request = json.loads(conn.makefile("rb").readline() or b"{}")
+            except (OSError, ValueError):
+                conn.close()
+                continue
+
+            command = request.get("command", "run")
+            if command == "run" and request.get("argv"):
+                sys.stdout.flush()
+                sys.stderr.flush()
+                if os.fork() == 0:
+                    server.close()
+                    _run_child(conn, fds, request)
+            elif command == "ping":
+                conn.sendall(json.dumps({"pid": os.getpid(), "preloaded": loaded}).encode() + b"\n")
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+            if command == "stop":
+                break
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def _connect(path: str) -> Optional[socket.socket]:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return sock
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+
+
+def _send(sock: socket.socket, request: Dict) -> None:
+    socket.send_fds(sock, [b"\0"], [0, 1, 2])
+    sock.sendall(json.dumps(request).encode() + b"\n")
+
+
+def request(command: str, path: Optional[str] = None) -> Optional[Dict]:
+    """Send ``ping`` or ``stop`` to the daemon. Returns its reply, or None if it is not running."""
+    sock = _connect(path or default_socket_path())
+    if sock is None:
+        return None
+    with sock:
+        _send(sock, {"command": command})
+        line = sock.makefile("rb").readline()
+    return json.loads(line) if line.strip() else {}
+
+
+def run(argv: List[str], path: Optional[str] = None) -> int:
+    """
+    Run ``argv`` (``script.py [args]`` or ``-m module [args]``) in a warm worker.
+
+    Falls back to running it in this process when no daemon is listening.
+
+    Returns:
+        The run's exit code
+    """
+    sock = _connect(path or default_socket_path())
+    if sock is None:
+        return _execute(argv)
+
+    with sock:
+        _send(sock, {"command": "run", "argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)})
+        reply = sock.makefile("rb")
+        pid = int(reply.readline() or 0)
+        try:
+            code = reply.readline()
+        except KeyboardInterrupt:
+            # The worker is not in our process group, so pass Ctrl-C on to it
+            if pid:
+                os.kill(pid, signal.SIGINT)
+            code = reply.readline()
+    return int(code) if code.strip() else 1
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Warm worker daemon that keeps LLM libraries imported.")
+    parser.add_argument("--socket", help="Unix socket path (default: $AGENT_WARM_SOCKET or a per-user temp file)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("serve", help="Preload modules and serve run requests")
+    commands.add_parser("ping", help="Check whether a daemon is running")
+    commands.add_parser("stop", help="Stop the daemon")
+    run_parser = commands.add_parser("run", help="Run a script (or -m module) in a warm worker")
+    run_parser.add_argument("target", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.socket)
+    elif args.command == "run":
+        if not args.target:
+            parser.error("run needs a script path or -m module")
+        sys.exit(run(args.target, args.socket))
+    else:
+        reply = request(args.command, args.socket)
+        if reply is None:
+            print("No warm worker running", file=sys.stderr)
+            sys.exit(1)
+        if reply:
+            print(json.dumps(reply))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Agent loop overhead benchmark: replays a recorded run with the model and the
+tools taken out of the picture.
+
+Without an existing cassette, one run of ``--task`` is first recorded against
+the offline mock server. The cassette is then replayed ``--runs`` times and the
+time spent in the loop itself (prompt construction, parsing, dispatch, memory)
+is reported per run and per iteration::
+
+    python benchmarks/agent_loop.py --runs 2000
+    python benchmarks/agent_loop.py --cassette run.cassette.jsonl --profile
+"""
+import argparse
+import asyncio
+import cProfile
+import os
+import pstats
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # repo root, for agent_core
+
+from agent_core.metrics import percentile
+from agent_core.mock_server import serve
+
+DEFAULT_AGENT = str(ROOT / "AI Agents and Agentic AI with Python & Generative AI" / "agentWithTools.py") + ":agent"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--agent", default=DEFAULT_AGENT, help="script.py:name or module:name")
+    parser.add_argument("--cassette", help="Cassette to replay (default: record a fresh one against the mock)")
+    parser.add_argument("--task", default="What files are in this directory?")
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--profile", action="store_true", help="Print the hottest functions of the replays")
+    args = parser.parse_args()
+
+    from agent_core.replay import Cassette, record_agent, replay_agent
+    from agent_core.server import load_agent
+
+    agent = load_agent(args.agent).clone(on_action=None)
+    cassette = args.cassette
+    if cassette is None:
+        cassette = os.path.join(tempfile.mkdtemp(), "run.cassette.jsonl")
+        mock = serve(port=0)
+        os.environ["AGENT_LLM_API_BASE"] = f"http://127.0.0.1:{mock.server_address[1]}/v1"
+        os.environ["AGENT_LLM_CACHE"] = "off"
+        try:
+            asyncio.run(record_agent(agent, cassette).run(args.task))
+        finally:
+            mock.shutdown()
+    task = Cassette(cassette).inputs()[0]
+
+    async def replay_all():
+        times, iterations = [], 0
+        for _ in range(args.runs):
+            replayed = replay_agent(agent, cassette)
+            started = time.perf_counter()
+            result = await replayed.run(task)
+            times.append(time.perf_counter() - started)
+            iterations += result.iterations
+        return times, iterations
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    times, iterations = asyncio.run(replay_all())
+    if profiler is not None:
+        profiler.disable()
+
+    per_iteration = sum(times) / iterations if iterations else 0.0
+    print(f"replayed runs      {args.runs} ({iterations // args.runs} iterations each)")
+    print(f"per run            median {statistics.median(times) * 1e6:9.1f} us   "
+          f"p99 {percentile(times, 99) * 1e6:9.1f} us")
+    print(f"per iteration      mean   {per_iteration * 1e6:9.1f} us")
+    if profiler is not None:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Load test for the multi-session agent server against the offline mock LLM.
+
+Starts the mock server and an ``AgentServer`` hosting an agent script, then
+opens ``--sessions`` sessions (``--concurrency`` at a time), each running one
+turn, and reports sessions/sec and turn latency percentiles::
+
+    python benchmarks/agent_server.py --sessions 2000 --concurrency 500 --latency lognormal:300,0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # repo root, for agent_core
+
+from agent_core.metrics import percentile
+from agent_core.mock_server import MockBehavior, parse_latency, serve
+
+DEFAULT_AGENT = str(ROOT / "AI Agents and Agentic AI with Python & Generative AI" / "agentWithTools.py") + ":agent"
+
+
+async def request(port: int, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict[str, Any]]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body or {}).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload or b"{}")
+
+
+async def load_test(port: int, sessions: int, concurrency: int, task: str) -> Tuple[List[float], int]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one_session() -> None:
+        nonlocal failures
+        async with semaphore:
+            status, created = await request(port, "POST", "/sessions")
+            if status != 201:
+                failures += 1
+                return
+            started = time.perf_counter()
+            status, _ = await request(port, "POST", f"/sessions/{created['session_id']}/messages", {"content": task})
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                failures += 1
+            await request(port, "DELETE", f"/sessions/{created['session_id']}")
+
+    await asyncio.gather(*(one_session() for _ in range(sessions)))
+    return latencies, failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--agent", default=DEFAULT_AGENT, help="script.py:name or module:name")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200, help="Sessions in flight at once")
+    parser.add_argument("--llm-concurrency", type=int, default=64)
+    parser.add_argument("--latency", default="fixed:100", help="Mock LLM latency distribution")
+    parser.add_argument("--task", default="What files are in this directory?")
+    args = parser.parse_args()
+
+    mock = serve(port=0, behavior=MockBehavior(latency=parse_latency(args.latency)))
+    os.environ["AGENT_LLM_API_BASE"] = f"http://127.0.0.1:{mock.server_address[1]}/v1"
+    os.environ["AGENT_LLM_CACHE"] = "off"
+
+    from agent_core.server import AgentServer, load_agent
+    server = AgentServer(load_agent(args.agent), max_llm_concurrency=args.llm_concurrency)
+
+    async def run() -> None:
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        started = time.perf_counter()
+        latencies, failures = await load_test(port, args.sessions, args.concurrency, args.task)
+        elapsed = time.perf_counter() - started
+        listener.close()
+
+        print(f"sessions        {args.sessions} ({failures} failed) in {elapsed:.2f} s")
+        print(f"sessions/sec    {args.sessions / elapsed:8.1f}")
+        if latencies:
+            print(f"turn latency    p50 {percentile(latencies, 50) * 1000:8.1f} ms   "
+                  f"p99 {percentile(latencies, 99) * 1000:8.1f} ms   max {max(latencies) * 1000:8.1f} ms")
+        print(f"server stats    {json.dumps(server.stats())}")
+
+    try:
+        asyncio.run(run())
+    finally:
+        mock.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Fenced-block extraction microbenchmark over large multi-block responses.
+
+Builds a response with ``--blocks`` fenced blocks (json, action and python,
+with prose in between) and times pulling every block out of it. The
+extractors the scripts used to carry are timed the way their callers used
+them, once per block type, next to ``find_fence``. Pulling out every block is
+timed for a regex, ``split`` and one ``scan_fences`` pass, both with and
+without reading the bodies::
+
+    python benchmarks/fence_scan.py
+    python benchmarks/fence_scan.py --blocks 1000 --block-chars 2000
+"""
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # repo root, for agent_core
+
+from agent_core.streaming import find_fence, scan_fences
+
+TYPES = ("json", "action", "python")
+
+
+def build_response(blocks: int, chars: int) -> str:
+    parts = []
+    for i in range(blocks):
+        kind = TYPES[i % len(TYPES)]
+        parts.append(f"Step {i}: some reasoning about what to do next. " * 4)
+        parts.append(f"```{kind}\n" + ("x" * chars) + "\n```\n")
+    return "".join(parts)
+
+
+def regex_first(text: str):
+    # The old ```action parser, generalized to each block type
+    return [re.search(rf"```{kind}\s*(.*?)```", text, re.DOTALL).group(1) for kind in TYPES]
+
+
+def split_first(text: str):
+    # quasi_agent_example.extract_code_block: split on every fence, keep one piece
+    return [text.split("```")[1 + 2 * i].strip() for i in range(len(TYPES))]
+
+
+def find_rfind_first(text: str):
+    # prompt_llm_for_json: first opening fence of the type, last fence of the response
+    results = []
+    for kind in TYPES:
+        start = text.find("```" + kind)
+        end = text.rfind("```")
+        results.append(text[start + 3 + len(kind):end].strip())
+    return results
+
+
+def regex_all(text: str):
+    return [m.group(2) for m in re.finditer(r"```(\w*)\s*(.*?)```", text, re.DOTALL)]
+
+
+def split_all(text: str):
+    return [piece.strip() for piece in text.split("```")[1::2]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--blocks", type=int, default=300)
+    parser.add_argument("--block-chars", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    text = build_response(args.blocks, args.block_chars)
+    assert len(list(scan_fences(text))) == args.blocks
+    groups = {
+        "first block of each type": {
+            "re.search per type": lambda: regex_first(text),
+            "split('```') per type": lambda: split_first(text),
+            "find/rfind per type (wrong past 1 block)": lambda: find_rfind_first(text),
+            "find_fence per type": lambda: [find_fence(text, kind).body for kind in TYPES],
+        },
+        "every block": {
+            "re.finditer, bodies": lambda: regex_all(text),
+            "split('```'), bodies": lambda: split_all(text),
+            "scan_fences, offsets only": lambda: list(scan_fences(text)),
+            "scan_fences, bodies": lambda: [b.body for b in scan_fences(text)],
+        },
+    }
+    print(f"response: {len(text) / 1e6:.2f} MB, {args.blocks} blocks")
+    for group, cases in groups.items():
+        print(f"\n{group}")
+        for name, case in cases.items():
+            seconds = min(timeit.repeat(case, number=1, repeat=args.repeat))
+            print(f"  {name:<42} {seconds * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
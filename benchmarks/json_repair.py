@@ -0,0 +1,108 @@
+"""
+Structured-output benchmark: LLM calls per extraction with and without local
+JSON repair.
+
+A scripted model answers an invoice extraction with a mix of clean and
+near-miss outputs (trailing commas, single quotes, Python literals, prose
+around the JSON, a missing closing fence) and a few truncated ones that
+cannot be repaired. Any retry is answered correctly. The same retry loop as
+``prompt_llm_for_json`` runs over the mix twice, parsing with ``json.loads``
+and then with ``parse_json``, and reports calls per extraction and the cost
+of parsing::
+
+    python benchmarks/json_repair.py
+    python benchmarks/json_repair.py --extractions 2000 --near-miss-rate 0.5
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # repo root, for agent_core
+
+from agent_core.repair import RepairStats, parse_json
+from agent_core.schema import SchemaError, compile_schema
+from agent_core.streaming import fenced_block
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "invoice_number": {"type": "string"},
+        "total_amount": {"type": "number"},
+        "paid": {"type": "boolean"},
+        "line_items": {"type": "array", "items": {"type": "object", "required": ["description", "total"]}},
+    },
+    "required": ["invoice_number", "total_amount", "line_items"],
+}
+INVOICE = {
+    "invoice_number": "INV-2024-0117",
+    "total_amount": 1840.5,
+    "paid": False,
+    "line_items": [{"description": f"Item {i}, it's \"premium\"", "total": 100 + i} for i in range(12)],
+}
+CLEAN = json.dumps(INVOICE, indent=2)
+
+MALFORMATIONS: Dict[str, Callable[[str], str]] = {
+    "trailing commas": lambda text: text.replace("}\n", "},\n").replace("]\n", "],\n"),
+    "single quotes": lambda text: repr(INVOICE),
+    "prose around": lambda text: "Here is the extracted data:\n" + text + "\nLet me know if anything is missing.",
+    "unclosed fence": lambda text: "```json\n" + text,
+    "truncated": lambda text: text[: len(text) // 2],
+}
+
+
+def answers(count: int, near_miss_rate: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    kinds = list(MALFORMATIONS)
+    result = []
+    for _ in range(count):
+        if rng.random() < near_miss_rate:
+            result.append(MALFORMATIONS[rng.choice(kinds)](CLEAN))
+        else:
+            result.append("```json\n" + CLEAN + "\n```")
+    return result
+
+
+def extract(first_answer: str, parse: Callable[[str], Any], stats: RepairStats) -> int:
+    """LLM calls used by the ``prompt_llm_for_json`` loop when the model first answers ``first_answer``."""
+    raw = first_answer
+    for calls in range(1, 4):
+        try:
+            parse(fenced_block(raw, "json", default=raw))
+            return calls
+        except (json.JSONDecodeError, SchemaError):
+            stats.record("retried")
+            raw = "```json\n" + CLEAN + "\n```"
+    raise RuntimeError("unreachable: retries are always answered correctly")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--extractions", type=int, default=1000)
+    parser.add_argument("--near-miss-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    compiled = compile_schema(SCHEMA)
+    first_answers = answers(args.extractions, args.near_miss_rate, args.seed)
+    cases = {
+        "json.loads": lambda text, stats: compiled.validate(json.loads(text)),
+        "parse_json": lambda text, stats: parse_json(text, compiled.validate, stats),
+    }
+    print(f"{args.extractions} extractions, {args.near_miss_rate:.0%} near misses")
+    print(f"{'parser':<12} {'LLM calls':>10} {'per extraction':>15} {'parse time':>12}")
+    for name, parse in cases.items():
+        stats = RepairStats()
+        started = time.perf_counter()
+        calls = sum(extract(answer, lambda text: parse(text, stats), stats) for answer in first_answers)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<12} {calls:>10} {calls / args.extractions:>15.3f} {elapsed / calls * 1e6:>9.1f} us")
+        print(f"{'':<12} {stats.stats()}")
+
+
+if __name__ == "__main__":
+    main()
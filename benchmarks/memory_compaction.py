@@ -0,0 +1,73 @@
+"""
+Memory compaction benchmark: prompt tokens per turn over long agent sessions.
+
+Drives an ```action agent through ``--turns`` tool steps with a scripted model
+(no provider, no mock server). Every step reads a file of ``--observation``
+characters. The estimated prompt tokens of each model call are reported for
+plain ``Memory`` and for ``CompactingMemory``::
+
+    python benchmarks/memory_compaction.py
+    python benchmarks/memory_compaction.py --turns 50 --max-tokens 4000 --keep-recent 6
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # repo root, for agent_core
+
+from agent_core.agent import Action, ActionRegistry, Agent, AgentJsonActionLanguage, Goal, Memory, Prompt
+from agent_core.memory import CompactingMemory
+from agent_core.messages import count_tokens
+
+
+def session_tokens(memory_factory: Callable[[], Memory], turns: int, observation: int) -> List[int]:
+    """Prompt tokens of every model call in one session."""
+    tokens: List[int] = []
+
+    def read_file(name: str) -> str:
+        return f"{name}: " + ("lorem ipsum dolor sit amet " * (observation // 27 + 1))[:observation]
+
+    async def generate(prompt: Prompt) -> str:
+        tokens.append(count_tokens(prompt.messages))
+        if len(tokens) < turns:
+            return f'Reading the next file.\n```action\n{{"tool_name": "read_file", "args": {{"name": "file_{len(tokens)}.txt"}}}}\n```'
+        return '```action\n{"tool_name": "terminate", "args": {"message": "done"}}\n```'
+
+    registry = ActionRegistry([
+        Action.from_function(read_file),
+        Action("terminate", lambda message: message, "End the session", {"type": "object", "properties": {}},
+               terminal=True),
+    ])
+    agent = Agent([Goal("Read", "Read every file, then terminate.")], AgentJsonActionLanguage(), registry,
+                  generate, max_iterations=turns, memory_factory=memory_factory)
+    asyncio.run(agent.run("Summarize the files in this directory."))
+    return tokens
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--observation", type=int, default=4000, help="Characters per tool result")
+    parser.add_argument("--max-tokens", type=int, default=4000, help="CompactingMemory threshold")
+    parser.add_argument("--keep-recent", type=int, default=6)
+    args = parser.parse_args()
+
+    variants = {
+        "Memory": Memory,
+        "CompactingMemory": lambda: CompactingMemory(max_tokens=args.max_tokens, keep_recent=args.keep_recent),
+    }
+    results = {name: session_tokens(factory, args.turns, args.observation) for name, factory in variants.items()}
+
+    marks = sorted({1, 5, 10, 20, 30, 40, args.turns} & set(range(1, args.turns + 1)))
+    print(f"{'turn':>6} " + " ".join(f"{name:>18}" for name in results))
+    for turn in marks:
+        print(f"{turn:>6} " + " ".join(f"{tokens[turn - 1]:>18,}" for tokens in results.values()))
+    print(f"{'max':>6} " + " ".join(f"{max(tokens):>18,}" for tokens in results.values()))
+    print(f"{'total':>6} " + " ".join(f"{sum(tokens):>18,}" for tokens in results.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Prompt assembly microbenchmark: per-turn cost of building a request from a
+long history.
+
+One turn appends an assistant message and a tool result to memory, builds the
+prompt (system message plus history), and then computes what the client
+computes before every call: the response-cache key and the rate limiter's
+token estimate. The same work is timed with a plain list of messages and
+with a ``MessageLog``::
+
+    python benchmarks/prompt_assembly.py
+    python benchmarks/prompt_assembly.py --history 50 200 1000 --message-chars 2000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # repo root, for agent_core
+
+from agent_core.llm import cache_key
+from agent_core.messages import MessageLog
+from agent_core.ratelimit import estimate_tokens
+
+SYSTEM = {"role": "system", "content": "You are an agent. " * 50}
+
+
+def step(i: int, chars: int) -> List[Dict[str, Any]]:
+    return [{"role": "assistant", "content": f'```action\n{{"tool_name": "read_file", "args": {{"name": "f{i}"}}}}\n```'},
+            {"role": "user", "content": '{"result": "' + ("x" * chars) + '"}'}]
+
+
+def per_turn(history: int, chars: int, turns: int, build: Callable[[Any], List[Dict[str, Any]]],
+             log: Any) -> float:
+    """Mean seconds per turn over ``turns`` turns, starting from ``history`` messages."""
+    for i in range(history // 2):
+        log.extend(step(i, chars))
+    started = time.perf_counter()
+    for i in range(turns):
+        log.extend(step(history + i, chars))
+        messages = build(log)
+        cache_key("model", messages, None, stop_at_fence="action", max_tokens=1024)
+        estimate_tokens({"messages": messages, "max_tokens": 1024})
+    return (time.perf_counter() - started) / turns
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--history", type=int, nargs="+", default=[20, 100, 500, 2000],
+                        help="Messages already in memory")
+    parser.add_argument("--message-chars", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'list copy':>14} {'MessageLog':>14} {'speedup':>8}")
+    for history in args.history:
+        copied = per_turn(history, args.message_chars, args.turns, lambda log: [SYSTEM] + log, [])
+        viewed = per_turn(history, args.message_chars, args.turns, lambda log: log.view([SYSTEM]), MessageLog())
+        print(f"{history:>8} {copied * 1e6:>11.1f} us {viewed * 1e6:>11.1f} us {copied / viewed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
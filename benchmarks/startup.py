@@ -0,0 +1,79 @@
+"""
+Startup-time benchmark: cold interpreter per run vs. the warm worker daemon.
+
+Runs an agent script N times against the offline mock server, once as a fresh
+``python script.py`` process each time and once through
+``python -m agent_core.warm run``, and reports wall-clock times::
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --script "AI Agents and Agentic AI with Python & Generative AI/agentLoopWithFunctionCalling.py"
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # repo root, for agent_core
+
+from agent_core.metrics import percentile
+from agent_core.mock_server import serve
+
+DEFAULT_SCRIPT = ROOT / "AI Agents and Agentic AI with Python & Generative AI" / "simple_ai_agent.py"
+
+
+def time_runs(command: List[str], runs: int, env: Dict[str, str]) -> List[float]:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, env=env, cwd=ROOT, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def report(label: str, times: List[float]) -> None:
+    print(f"{label:<28} median {statistics.median(times) * 1000:8.1f} ms   "
+          f"p95 {percentile(times, 95) * 1000:8.1f} ms   min {min(times) * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--script", default=str(DEFAULT_SCRIPT))
+    args = parser.parse_args()
+
+    server = serve(port=0)
+    socket_path = os.path.join(tempfile.mkdtemp(), "warm.sock")
+    env = dict(os.environ,
+               AGENT_LLM_API_BASE=f"http://127.0.0.1:{server.server_address[1]}/v1",
+               AGENT_LLM_CACHE="off",
+               AGENT_WARM_SOCKET=socket_path,
+               PYTHONPATH=str(ROOT))
+
+    report("import agent_core", time_runs([sys.executable, "-c", "import agent_core"], args.runs, env))
+    report("cold python script", time_runs([sys.executable, args.script], args.runs, env))
+
+    daemon = subprocess.Popen([sys.executable, "-m", "agent_core.warm", "serve"], env=env, cwd=ROOT,
+                              stdout=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        while not os.path.exists(socket_path):
+            if daemon.poll() is not None:
+                raise RuntimeError("warm worker exited during startup")
+            time.sleep(0.05)
+        print(f"{'daemon preload (one-off)':<28} {(time.perf_counter() - started) * 1000:8.1f} ms")
+        report("warm worker run", time_runs([sys.executable, "-m", "agent_core.warm", "run", args.script],
+                                            args.runs, env))
+    finally:
+        subprocess.run([sys.executable, "-m", "agent_core.warm", "stop"], env=env, cwd=ROOT)
+        daemon.wait(timeout=10)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Structured-output benchmark: retries, repairs and tokens per extraction for each mode.
+
+Runs ``--extractions`` invoice extractions through the ``prompt_llm_for_json``
+loop (``request_json`` over ``generate_json``) against the offline mock
+server, once per structured-output mode (``json_schema``, ``tool`` and the
+``prompt`` fallback). The mock answers like a model in each mode: a sentence
+and a ```json block in ``prompt`` mode, bare JSON in ``json_schema`` mode and
+a forced ``respond`` call in ``tool`` mode.
+
+Failures are injected per reply, as far as a mode lets the model stray:
+
+* ``--malformed-rate``: near-miss JSON (trailing commas, single quotes) or
+  truncated JSON, in ``prompt`` mode only, since the native modes always
+  produce syntactically valid JSON
+* ``--schema-error-rate``: valid JSON that breaks the schema, in ``prompt`` and
+  ``tool`` mode; ``json_schema`` decoding is constrained to the schema
+
+The rates are inputs; what each mode then costs is measured: LLM calls,
+local repairs, retries and failures from the loop's ``RepairStats``, and
+prompt and output tokens as sent and generated (the schema counts wherever a
+mode sends it: system message, ``response_format`` or tool definition; output
+counts the whole reply, including prose the client stops reading)::
+
+    python benchmarks/structured_output.py
+    python benchmarks/structured_output.py --extractions 500 --malformed-rate 0.2 --schema-error-rate 0.1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))  # repo root, for agent_core
+
+from agent_core.llm import LLMClient
+from agent_core.messages import count_tokens, encode, tokens_of
+from agent_core.mock_server import MockBehavior, serve
+from agent_core.repair import RepairStats
+from agent_core.schema import SchemaError
+from agent_core.structured import MODES, request_json
+
+# invoice_schema from extract_invoice_data
+SCHEMA = {
+    "type": "object",
+    "required": ["invoice_number", "date", "total_amount", "vendor", "line_items"],
+    "properties": {
+        "invoice_number": {"type": "string"},
+        "date": {"type": "string"},
+        "total_amount": {"type": "number"},
+        "vendor": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "address": {"type": "string"}},
+        },
+        "line_items": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "description": {"type": "string"},
+                    "quantity": {"type": "number"},
+                    "unit_price": {"type": "number"},
+                    "total": {"type": "number"},
+                },
+            },
+        },
+    },
+}
+INVOICE = {
+    "invoice_number": "4567",
+    "date": "2025-02-01",
+    "total_amount": 1500,
+    "vendor": {"name": "Tech Solutions Inc.", "address": "1 Main St"},
+    "line_items": [
+        {"description": "Laptop", "quantity": 1, "unit_price": 1200, "total": 1200},
+        {"description": "External Monitor", "quantity": 1, "unit_price": 300, "total": 300},
+    ],
+}
+DOCUMENT = "Invoice #4567\nDate: 2025-02-01\nVendor: Tech Solutions Inc.\nItems:\n  - Laptop - $1,200\n" \
+           "  - External Monitor - $300\nTotal: $1,500\n" * 3
+
+CLEAN = json.dumps(INVOICE, indent=2)
+MALFORMATIONS = [
+    lambda text: text.replace("}\n", "},\n").replace("]\n", "],\n"),  # trailing commas
+    lambda text: repr(INVOICE),  # single quotes
+    lambda text: text[: len(text) // 2],  # truncated: cannot be repaired
+]
+
+
+class InvoiceModel(MockBehavior):
+    """Mock behavior answering the extraction in the style of each mode, with injected failures."""
+
+    def __init__(self, malformed_rate: float, schema_error_rate: float, seed: int):
+        super().__init__()
+        self.malformed_rate = malformed_rate
+        self.schema_error_rate = schema_error_rate
+        self.rng = random.Random(seed)
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def respond(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        schema_params = {k: body[k] for k in ("response_format", "tools", "tool_choice") if k in body}
+        mode = "tool" if "tools" in body else "json_schema" if "response_format" in body else "prompt"
+        with self._lock:
+            self.prompt_tokens += count_tokens(body["messages"])
+            if schema_params:
+                self.prompt_tokens += tokens_of(encode(schema_params))
+            roll = self.rng.random()
+            malformation = self.rng.choice(MALFORMATIONS)
+
+        value, text = INVOICE, CLEAN
+        if mode == "prompt":
+            roll -= self.malformed_rate
+            if roll < 0:
+                text = malformation(CLEAN)
+        if mode != "json_schema" and 0 <= roll < self.schema_error_rate:
+            value = {**INVOICE, "total_amount": "$1,500"}
+            text = json.dumps(value, indent=2)
+
+        if mode == "tool":
+            reply = {"tool_calls": [{"name": "respond", "arguments": value}]}
+            generated = json.dumps(value)
+        elif mode == "json_schema":
+            generated = json.dumps(value)
+            reply = {"content": generated}
+        else:
+            generated = f"Here is the extracted invoice data:\n```json\n{text}\n```\nLet me know if you need anything else."
+            reply = {"content": generated}
+        with self._lock:
+            self.completion_tokens += len(generated) // 4
+        return reply
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--extractions", type=int, default=200)
+    parser.add_argument("--malformed-rate", type=float, default=0.1, help="Injected near-miss or truncated JSON")
+    parser.add_argument("--schema-error-rate", type=float, default=0.05, help="Injected schema violations")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.extractions} extractions against the mock; injected per reply: malformed {args.malformed_rate:.0%} "
+          f"(prompt mode), schema errors {args.schema_error_rate:.0%} (prompt and tool mode)")
+    print(f"{'mode':<12} {'calls/extr':>10} {'repaired':>9} {'retried':>8} {'failed':>7} "
+          f"{'prompt tok/extr':>16} {'output tok/extr':>16}")
+    for mode in reversed(MODES):
+        os.environ["AGENT_LLM_STRUCTURED_OUTPUT"] = mode
+        model = InvoiceModel(args.malformed_rate, args.schema_error_rate, args.seed)
+        mock = serve(port=0, behavior=model)
+        try:
+            client = LLMClient(model="mock", api_base=f"http://127.0.0.1:{mock.server_address[1]}/v1")
+            stats = RepairStats()
+            for _ in range(args.extractions):
+                try:
+                    request_json(lambda messages: client.generate_json(messages, SCHEMA, max_tokens=1024),
+                                 SCHEMA, f"Extract invoice data from:\n{DOCUMENT}", stats=stats)
+                except (json.JSONDecodeError, SchemaError):
+                    pass
+        finally:
+            mock.shutdown()
+        counts = stats.stats()
+        print(f"{mode:<12} {model.requests / args.extractions:>10.3f} {counts['repaired']:>9} "
+              f"{counts['retried']:>8} {counts['failed']:>7} {model.prompt_tokens / args.extractions:>16.1f} "
+              f"{model.completion_tokens / args.extractions:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
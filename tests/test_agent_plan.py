@@ -0,0 +1,96 @@
+"""Plan turns of ``AgentPlanActionLanguage`` in the agent loop, driven by a scripted model."""
+import asyncio
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.agent import Action, ActionRegistry, Agent, AgentPlanActionLanguage, Goal
+
+
+def scripted(*replies):
+    """``generate_response`` answering each prompt with the next reply, then with no action."""
+    pending = list(replies)
+
+    async def generate_response(prompt):
+        return pending.pop(0) if pending else "Nothing left to do."
+    return generate_response
+
+
+def plan(*steps):
+    return "```action\n" + json.dumps({"plan": list(steps)}) + "\n```"
+
+
+def read_file(name: str) -> str:
+    raise FileNotFoundError(name)
+
+
+def terminate(message: str) -> str:
+    return message
+
+
+class PlanTerminationTest(unittest.TestCase):
+    def agent(self, *replies):
+        registry = ActionRegistry([Action.from_function(read_file),
+                                   Action.from_function(terminate, terminal=True)])
+        return Agent(goals=[Goal("Task", "Read the file, then stop.")], agent_language=AgentPlanActionLanguage(),
+                     action_registry=registry, generate_response=scripted(*replies), max_iterations=3)
+
+    def test_skipped_terminal_step_does_not_end_the_run(self):
+        agent = self.agent(plan({"id": "read", "tool_name": "read_file", "args": {"name": "missing.txt"}},
+                                {"id": "done", "tool_name": "terminate", "args": {"message": "read it"},
+                                 "after": ["read"]}))
+        run = asyncio.run(agent.run("Summarize missing.txt"))
+        self.assertFalse(run.terminated)
+        self.assertNotEqual(run.stop_reason, "terminated")
+        results = json.loads(run.memory.items[2]["content"])["results"]
+        self.assertIn("Skipped because read failed.", results[1]["error"])
+
+    def test_terminal_step_ends_the_run(self):
+        agent = self.agent(plan({"id": "done", "tool_name": "terminate", "args": {"message": "all done"}}))
+        run = asyncio.run(agent.run("Stop right away"))
+        self.assertTrue(run.terminated)
+        self.assertEqual(run.stop_reason, "terminated")
+        self.assertEqual(run.final, "all done")
+
+
+class PlanParsingTest(unittest.TestCase):
+    def parse(self, *steps):
+        return AgentPlanActionLanguage().parse_response(plan(*steps))
+
+    def test_after_must_be_a_list_of_step_ids(self):
+        for after in [1, "ab", {"read": True}, [["read"]], [True]]:
+            with self.subTest(after=after):
+                calls = self.parse({"id": "read", "tool_name": "read_file", "args": {"name": "a"}},
+                                   {"id": "next", "tool_name": "read_file", "args": {"name": "b"}, "after": after})
+                self.assertIsNone(calls[0].error)
+                self.assertIsNone(calls[1].name)
+                self.assertIn('"after" must be a list', calls[1].error)
+
+    def test_args_must_be_an_object(self):
+        calls = self.parse({"id": "read", "tool_name": "read_file", "args": ["a"]})
+        self.assertIsNone(calls[0].name)
+        self.assertIn('"args" must be a JSON object', calls[0].error)
+
+    def test_dependencies_by_id_or_index(self):
+        calls = self.parse({"id": "read", "tool_name": "read_file", "args": {"name": "a"}},
+                           {"tool_name": "read_file", "args": {"name": "b"}},
+                           {"id": "done", "tool_name": "terminate", "args": {"message": "x"}, "after": ["read", 1]})
+        self.assertEqual(calls[2].after, [0, 1])
+        self.assertIsNone(calls[2].error)
+
+    def test_malformed_step_is_reported_to_the_model(self):
+        registry = ActionRegistry([Action.from_function(read_file), Action.from_function(terminate, terminal=True)])
+        agent = Agent(goals=[Goal("Task", "Stop.")], agent_language=AgentPlanActionLanguage(),
+                      action_registry=registry, max_iterations=2, generate_response=scripted(
+                          plan({"id": "done", "tool_name": "terminate", "args": {"message": "x"}, "after": 1})))
+        run = asyncio.run(agent.run("Stop"))
+        self.assertFalse(run.terminated)
+        results = json.loads(run.memory.items[2]["content"])["results"]
+        self.assertIn('"after" must be a list', results[0]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Batch runs and ``--resume`` (``agent_core.batch``)."""
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.agent import ActionRegistry, Agent, AgentJsonActionLanguage, Goal
+from agent_core.batch import completed_indices, read_tasks, run_batch
+
+TASKS = '{"id": "a", "task": "first"}\n"second"\n\nthird\n'
+
+
+class BatchResumeTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.output = os.path.join(self.directory, "results.jsonl")
+        self.failing = {"second"}
+        self.answered = []
+
+    def agent(self):
+        async def generate_response(prompt):
+            task = prompt.messages[-1]["content"]
+            if task in self.failing:
+                raise RuntimeError(f"provider down for {task}")
+            self.answered.append(task)
+            return f"Answer to {task}."
+
+        return Agent(goals=[Goal("Task", "Answer.")], agent_language=AgentJsonActionLanguage(),
+                     action_registry=ActionRegistry([]), generate_response=generate_response, max_iterations=1)
+
+    def batch(self, skip=(), checkpoint_dir=None):
+        with open(self.output, "a") as output:
+            return asyncio.run(run_batch(self.agent(), read_tasks(io.StringIO(TASKS), skip=set(skip)), output,
+                                         concurrency=2, checkpoint_dir=checkpoint_dir))
+
+    def results(self):
+        with open(self.output) as f:
+            return [json.loads(line) for line in f]
+
+    def test_read_tasks(self):
+        tasks = list(read_tasks(io.StringIO(TASKS), offset=1, skip={3}))
+        self.assertEqual(tasks, [(1, None, "second")])
+
+    def test_resume_runs_only_the_failed_tasks_again(self):
+        summary = self.batch()
+        self.assertEqual((summary["tasks"], summary["failed"]), (3, 1))
+        self.assertEqual(completed_indices(self.output), {0, 3})
+
+        self.failing.clear()
+        self.answered.clear()
+        summary = self.batch(skip=completed_indices(self.output))
+        self.assertEqual((summary["tasks"], summary["failed"]), (1, 0))
+        self.assertEqual(self.answered, ["second"])
+        # The failed attempt stays in the file; the new result line is what counts
+        self.assertEqual(completed_indices(self.output), {0, 1, 3})
+        self.assertEqual(sorted(r["index"] for r in self.results()), [0, 1, 1, 3])
+
+    def test_completed_indices_ignores_a_torn_last_line(self):
+        with open(self.output, "w") as f:
+            f.write('{"index": 0, "result": "ok"}\n{"index": 1, "error": "boom"}\n{"index": 2, "res')
+        self.assertEqual(completed_indices(self.output), {0})
+        self.assertEqual(completed_indices(os.path.join(self.directory, "missing.jsonl")), set())
+
+    def test_journals_of_failed_tasks_are_kept_for_the_next_run(self):
+        checkpoints = os.path.join(self.directory, "checkpoints")
+        self.batch(checkpoint_dir=checkpoints)
+        self.assertEqual(os.listdir(checkpoints), ["1.jsonl"])
+
+        self.failing.clear()
+        self.batch(skip=completed_indices(self.output), checkpoint_dir=checkpoints)
+        self.assertEqual(os.listdir(checkpoints), [])
+        self.assertEqual(completed_indices(self.output), {0, 1, 3})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Budgets and the usage they are measured with."""
+import asyncio
+import sys
+import unittest
+import warnings
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.agent import Action, ActionRegistry, Agent, AgentJsonActionLanguage, Goal
+from agent_core.budget import Budget
+from agent_core.llm import LLMClient
+from agent_core.metrics import Metrics, RingBufferSink, track_usage
+
+
+class Usage(dict):
+    """Stands in for litellm's ``Usage`` in the final chunk of a stream."""
+
+    def model_dump(self):
+        return dict(self)
+
+
+def chunk(text=None, usage=None):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))] if text else [],
+                           usage=usage)
+
+
+class StreamedUsageTest(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+
+    def completion(self, **request):
+        self.requests.append(request)
+        return iter([chunk("Hello"), chunk(usage=Usage(prompt_tokens=120, completion_tokens=30, total_tokens=150))])
+
+    def test_stream_asks_for_and_records_the_reported_usage(self):
+        for metrics in (Metrics([RingBufferSink()]), None):
+            with self.subTest(metrics=metrics):
+                client = LLMClient(model="test-model", completion_fn=self.completion, metrics=metrics)
+                with track_usage() as usage:
+                    self.assertEqual(client.stream_response([{"role": "user", "content": "Hi"}]), "Hello")
+                self.assertEqual(self.requests[-1]["stream_options"], {"include_usage": True})
+                self.assertEqual((usage.llm_calls, usage.prompt_tokens, usage.completion_tokens), (1, 120, 30))
+
+
+class BudgetWarningTest(unittest.TestCase):
+    def test_budget_that_sees_no_llm_calls_warns(self):
+        async def generate_response(prompt):
+            return "No action needed."
+
+        agent = Agent(goals=[Goal("Task", "Answer.")], agent_language=AgentJsonActionLanguage(),
+                      action_registry=ActionRegistry([]), generate_response=generate_response,
+                      max_iterations=1, budget=Budget(max_tokens=1000))
+        with self.assertWarns(RuntimeWarning):
+            asyncio.run(agent.run("Hi"))
+
+    def test_no_warning_without_a_budget(self):
+        async def generate_response(prompt):
+            return "No action needed."
+
+        agent = Agent(goals=[Goal("Task", "Answer.")], agent_language=AgentJsonActionLanguage(),
+                      action_registry=ActionRegistry([]), generate_response=generate_response, max_iterations=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            asyncio.run(agent.run("Hi"))
+
+
+class DeadlineTest(unittest.TestCase):
+    def agent(self, generate_response, budget):
+        return Agent(goals=[Goal("Task", "Answer.")], agent_language=AgentJsonActionLanguage(),
+                     action_registry=ActionRegistry([]), generate_response=generate_response,
+                     max_iterations=1, budget=budget)
+
+    def test_deadline_stops_the_run(self):
+        async def generate_response(prompt):
+            await asyncio.sleep(10)
+
+        run = asyncio.run(self.agent(generate_response, Budget(deadline=0.05)).run("Hi"))
+        self.assertEqual(run.stop_reason, "deadline")
+
+    def test_timeout_inside_a_step_is_an_error_not_the_deadline(self):
+        async def generate_response(prompt):
+            raise asyncio.TimeoutError("read timed out")
+
+        for budget in (Budget(deadline=60), Budget(max_tokens=1000), None):
+            with self.subTest(budget=budget), warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                with self.assertRaises(asyncio.TimeoutError):
+                    asyncio.run(self.agent(generate_response, budget).run("Hi"))
+
+
+if __name__ == "__main__":
+    unittest.main()
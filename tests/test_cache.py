@@ -0,0 +1,105 @@
+"""The response cache (``agent_core.cache``) and which calls the client serves from it."""
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.cache import ResponseCache
+from agent_core.llm import LLMClient
+
+MESSAGES = [{"role": "user", "content": "Name a colour."}]
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("agent_core.cache.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fill(self, cache, *keys):
+        for key in keys:
+            cache.set(key, {"content": key})
+            self.now += 1
+
+    def test_least_recently_used_entry_is_evicted_beyond_max_entries(self):
+        cache = ResponseCache(":memory:", max_entries=2)
+        self.fill(cache, "a", "b")
+        self.assertEqual(cache.get("a"), {"content": "a"})  # now more recent than "b"
+        self.now += 1
+        self.fill(cache, "c")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual([cache.get(k) for k in "ac"], [{"content": "a"}, {"content": "c"}])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_entries_are_evicted_beyond_max_bytes(self):
+        cache = ResponseCache(":memory:", max_bytes=40)
+        self.fill(cache, "a", "b", "c")  # 15 bytes each
+        stats = cache.stats()
+        self.assertEqual((stats["entries"], stats["bytes"], stats["evictions"]), (2, 30, 1))
+        self.assertIsNone(cache.get("a"))
+
+    def test_expired_entry_is_a_miss_and_removed(self):
+        cache = ResponseCache(":memory:", ttl_seconds=10)
+        self.fill(cache, "a")
+        self.now += 5
+        self.assertEqual(cache.get("a"), {"content": "a"})
+        self.now += 10
+        self.assertIsNone(cache.get("a"))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"], stats["entries"]), (1, 1, 1, 0))
+
+    def test_expired_entries_are_dropped_on_write(self):
+        cache = ResponseCache(":memory:", ttl_seconds=10)
+        self.fill(cache, "a")
+        self.now += 20
+        self.fill(cache, "b")
+        self.assertEqual(cache.stats()["entries"], 1)
+
+
+class CachedCallsTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+        self.client = LLMClient(model="test-model", cache=ResponseCache(":memory:"), completion_fn=self.completion)
+
+    def completion(self, **request):
+        self.calls += 1
+        text = f"colour {self.calls}"
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])])
+
+    def twice(self, **params):
+        return [self.client.stream_response(MESSAGES, **params) for _ in range(2)]
+
+    def test_sampled_calls_are_not_cached_by_default(self):
+        for params in ({}, {"temperature": 0.7}):
+            with self.subTest(params=params):
+                first, second = self.twice(**params)
+                self.assertNotEqual(first, second)
+        self.assertEqual(self.client.cache_bypasses, 4)
+
+    def test_deterministic_calls_are_cached_by_default(self):
+        for params in ({"temperature": 0}, {"temperature": 0.7, "seed": 42}):
+            with self.subTest(params=params):
+                first, second = self.twice(**params)
+                self.assertEqual(first, second)
+        self.assertEqual(self.calls, 2)
+
+    def test_use_cache_overrides_the_default(self):
+        first, second = self.twice(temperature=0.7, use_cache=True)
+        self.assertEqual(first, second)
+        first, second = self.twice(temperature=0, use_cache=False)
+        self.assertNotEqual(first, second)
+        self.assertEqual(self.calls, 3)
+
+    def test_default_params_count(self):
+        client = LLMClient(model="test-model", cache=ResponseCache(":memory:"), completion_fn=self.completion,
+                           temperature=0)
+        self.assertEqual(client.stream_response(MESSAGES), client.stream_response(MESSAGES))
+        self.assertEqual(self.calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
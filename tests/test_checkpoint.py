@@ -0,0 +1,110 @@
+"""Journaled runs and ``Agent.resume`` (``agent_core.checkpoint``)."""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.agent import Action, ActionRegistry, Agent, AgentPlanActionLanguage, Goal
+from agent_core.checkpoint import Checkpoint, validate_checkpoint
+from agent_core.tools import ToolCallResult
+
+REPLY = "```action\n" + json.dumps({"plan": [
+    {"id": "a", "tool_name": "record", "args": {"note": "first"}},
+    {"id": "b", "tool_name": "record", "args": {"note": "second"}},
+    {"id": "done", "tool_name": "terminate", "args": {"message": "noted"}, "after": ["a", "b"]},
+]}) + "\n```"
+
+
+class ResumeTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "run.ckpt.jsonl")
+        self.notes = []
+        self.prompts = 0
+
+    def agent(self):
+        def record(note: str) -> str:
+            self.notes.append(note)
+            return note
+
+        def terminate(message: str) -> str:
+            return message
+
+        async def generate_response(prompt):
+            self.prompts += 1
+            return REPLY
+
+        registry = ActionRegistry([Action.from_function(record), Action.from_function(terminate, terminal=True)])
+        return Agent(goals=[Goal("Task", "Take notes.")], agent_language=AgentPlanActionLanguage(),
+                     action_registry=registry, generate_response=generate_response, max_iterations=3)
+
+    def test_pending_reply_is_acted_on_without_rerunning_recorded_calls(self):
+        # The process died after the reply and the first tool call were journaled
+        checkpoint = Checkpoint(self.path)
+        checkpoint.start("Take two notes", [])
+        checkpoint.record_response(1, REPLY)
+        checkpoint.record_result(1, 0, ToolCallResult(id="a", name="record", args={"note": "first"},
+                                                      result={"result": "first"}))
+
+        run = asyncio.run(self.agent().resume(Checkpoint(self.path)))
+        self.assertEqual(self.prompts, 0)
+        self.assertEqual(self.notes, ["second"])
+        self.assertTrue(run.terminated)
+        self.assertEqual((run.final, run.iterations), ("noted", 1))
+        self.assertEqual(validate_checkpoint(self.path), [])
+
+    def test_finished_run_is_not_continued(self):
+        agent = self.agent()
+        asyncio.run(agent.run("Take two notes", checkpoint=Checkpoint(self.path)))
+        run = asyncio.run(agent.resume(Checkpoint(self.path)))
+        self.assertEqual((self.prompts, self.notes), (1, ["first", "second"]))
+        self.assertTrue(run.terminated)
+        self.assertEqual(run.final, "noted")
+
+    def test_torn_last_line_is_dropped(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.start("Take two notes", [])
+        with open(self.path, "a") as f:
+            f.write('{"t":"response","i":1,"resp')
+        state = checkpoint.load()
+        self.assertIsNone(state.pending)
+        self.assertEqual(state.memory, [{"role": "user", "content": "Take two notes"}])
+
+    def test_new_run_resets_the_replayed_state(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.start("one", [])
+        checkpoint.record_response(1, "r1")
+        checkpoint.record_step(1, [{"role": "assistant", "content": "a1"}])
+        checkpoint.finish("done", True)
+        memory = [{"role": "user", "content": "one"}, {"role": "assistant", "content": "a1"}]
+        checkpoint.start("two", memory)
+        checkpoint.record_response(1, "r2")
+
+        state = checkpoint.load()
+        self.assertFalse(state.finished)
+        self.assertFalse(state.terminated)
+        self.assertIsNone(state.final)
+        self.assertEqual(state.iterations, 1)
+        self.assertEqual(state.pending, ("r2", {}))
+        self.assertEqual([m["content"] for m in state.memory], ["one", "a1", "two"])
+        # Iterations are numbered per run, so the second run's iteration 1 is not a replay
+        self.assertEqual(validate_checkpoint(self.path), [])
+
+    def test_validate_reports_a_tool_call_run_twice(self):
+        checkpoint = Checkpoint(self.path)
+        checkpoint.start("Take two notes", [])
+        checkpoint.record_response(1, REPLY)
+        result = ToolCallResult(id="a", name="record", args={"note": "first"}, result={"result": "first"})
+        checkpoint.record_result(1, 0, result)
+        checkpoint.record_result(1, 0, result)
+        self.assertEqual(validate_checkpoint(self.path), ["iteration 1: tool call 0 (record) executed more than once"])
+
+
+if __name__ == "__main__":
+    unittest.main()
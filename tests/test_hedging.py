@@ -0,0 +1,132 @@
+"""Circuit breakers, failover and hedged calls (``agent_core.hedging``)."""
+import asyncio
+import sys
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.hedging import CircuitOpenError, HedgingPolicy, ModelHealth, is_failover_error
+from agent_core.llm import LLMClient
+
+MESSAGES = [{"role": "user", "content": "Hi"}]
+
+
+class ServerError(Exception):
+    status_code = 500
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def reply(text):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+
+class ModelHealthTest(unittest.TestCase):
+    def test_opens_on_errors_then_closes_after_a_good_probe(self):
+        health = ModelHealth(min_calls=4, max_error_rate=0.5, cooldown=0.05)
+        for ok in (True, False, False, False):
+            health.record(ok, 0.1)
+        self.assertEqual((health.state, health.trips), ("open", 1))
+        self.assertFalse(health.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(health.allow())
+        self.assertEqual(health.state, "half-open")
+        self.assertFalse(health.allow())  # one probe per cooldown
+        health.record(True, 0.1)
+        self.assertEqual(health.state, "closed")
+        self.assertTrue(health.allow())
+
+    def test_failed_probe_keeps_the_circuit_open(self):
+        health = ModelHealth(min_calls=1, cooldown=0.05)
+        health.record(False, 0.1)
+        time.sleep(0.06)
+        self.assertTrue(health.allow())
+        health.record(False, 0.1)
+        self.assertEqual(health.state, "open")
+        self.assertFalse(health.allow())
+
+    def test_opens_on_slow_calls(self):
+        health = ModelHealth(min_calls=3, max_latency=1.0)
+        for latency in (0.5, 2.0, 3.0):
+            health.record(True, latency)
+        self.assertEqual(health.state, "open")
+
+    def test_only_errors_another_model_could_fix_fail_over(self):
+        self.assertTrue(is_failover_error(ServerError()))
+        self.assertTrue(is_failover_error(TimeoutError()))
+        self.assertFalse(is_failover_error(BadRequest()))
+
+
+class FailoverTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.down = {"primary"}
+
+    def completion(self, **request):
+        self.calls.append(request["model"])
+        if request["model"] in self.down:
+            raise ServerError("down")
+        return reply(f"from {request['model']}")
+
+    def client(self, policy):
+        async def acompletion(**request):
+            return self.completion(**request)
+        return LLMClient(model="primary", completion_fn=self.completion, acompletion_fn=acompletion, hedging=policy)
+
+    def test_fails_over_and_stops_calling_a_tripped_model(self):
+        policy = HedgingPolicy({"*": ["backup"]}, min_calls=2, cooldown=60)
+        client = self.client(policy)
+        for _ in range(3):
+            self.assertEqual(client.generate_response(MESSAGES), "from backup")
+        self.assertEqual(self.calls, ["primary", "backup", "primary", "backup", "backup"])
+        self.assertEqual(policy.stats()["models"]["primary"]["state"], "open")
+        self.assertEqual(asyncio.run(client.agenerate_response(MESSAGES)), "from backup")
+
+    def test_client_errors_are_not_failed_over(self):
+        def completion(**request):
+            self.calls.append(request["model"])
+            raise BadRequest("bad")
+
+        client = LLMClient(model="primary", completion_fn=completion, hedging=HedgingPolicy({"*": ["backup"]}))
+        with self.assertRaises(BadRequest):
+            client.generate_response(MESSAGES)
+        self.assertEqual(self.calls, ["primary"])
+
+    def test_every_circuit_open(self):
+        self.down = {"primary", "backup"}
+        client = self.client(HedgingPolicy({"*": ["backup"]}, min_calls=1, cooldown=60))
+        with self.assertRaises(ServerError):
+            client.generate_response(MESSAGES)
+        with self.assertRaises(CircuitOpenError):
+            client.generate_response(MESSAGES)
+
+
+class HedgeTest(unittest.TestCase):
+    def test_slow_primary_is_hedged(self):
+        def completion(**request):
+            if request["model"] == "primary":
+                time.sleep(0.3)
+            return reply(f"from {request['model']}")
+
+        async def acompletion(**request):
+            if request["model"] == "primary":
+                await asyncio.sleep(0.3)
+            return reply(f"from {request['model']}")
+
+        policy = HedgingPolicy({"*": ["backup"]}, default_hedge_delay=0.05)
+        client = LLMClient(model="primary", completion_fn=completion, acompletion_fn=acompletion, hedging=policy)
+        started = time.monotonic()
+        self.assertEqual(client.generate_response(MESSAGES), "from backup")
+        self.assertEqual(asyncio.run(client.agenerate_response(MESSAGES)), "from backup")
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(policy.hedges, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Rate limiting and AIMD concurrency (``agent_core.ratelimit``)."""
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.llm import LLMClient
+from agent_core.ratelimit import ModelLimiter, RateLimiter
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("rate limited")
+        self.headers = headers or {}
+
+
+class ModelLimiterTest(unittest.TestCase):
+    def test_concurrency_limit_holds_calls_back(self):
+        limiter = ModelLimiter(initial_concurrency=2)
+        self.assertEqual([limiter.try_acquire(10) for _ in range(2)], [0.0, 0.0])
+        self.assertGreater(limiter.try_acquire(10), 0)
+        limiter.on_error()
+        self.assertEqual(limiter.try_acquire(10), 0.0)
+
+    def test_backs_off_on_429_and_recovers_on_success(self):
+        limiter = ModelLimiter(initial_concurrency=8, min_concurrency=1)
+        for expected in (4, 2, 1, 1):
+            limiter.try_acquire(10)
+            limiter.on_rate_limited({})
+            self.assertEqual(limiter.concurrency, expected)
+        self.assertEqual(limiter.rate_limited, 4)
+
+        successes = 0
+        while limiter.concurrency < 4:
+            limiter.try_acquire(10)
+            limiter.on_success(10, 10, {})
+            successes += 1
+        # Additive increase: about one step per limit's worth of successes (~1 + 2 + 3 calls to reach 4)
+        self.assertTrue(6 <= successes <= 8, successes)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_exhausted_quota_header_pauses_the_bucket(self):
+        limiter = ModelLimiter(requests_per_minute=600)
+        limiter.try_acquire(10)
+        limiter.on_success(10, 10, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"})
+        self.assertAlmostEqual(limiter.try_acquire(10), 2.1, delta=0.05)
+
+    def test_token_estimate_is_reconciled_with_usage(self):
+        limiter = ModelLimiter(tokens_per_minute=1000)
+        limiter.try_acquire(800)
+        limiter.on_success(800, 100, {})
+        self.assertEqual(limiter.try_acquire(800), 0.0)
+
+
+class BackoffTest(unittest.TestCase):
+    def test_retry_after_is_honoured(self):
+        limiter = RateLimiter(base_backoff=0.5)
+        delay = limiter.backoff(0, RateLimited({"Retry-After": "3"}))
+        self.assertGreaterEqual(delay, 3)
+        self.assertLessEqual(delay, 3.5)
+
+    def test_exponential_backoff_is_capped(self):
+        limiter = RateLimiter(base_backoff=1, max_backoff=5)
+        self.assertLessEqual(max(limiter.backoff(10) for _ in range(100)), 5)
+
+
+class ClientRetryTest(unittest.TestCase):
+    def test_429s_are_retried_under_a_smaller_limit(self):
+        failures = [RateLimited(), RateLimited()]
+        requests = []
+
+        def completion(**request):
+            requests.append(request)
+            if failures:
+                raise failures.pop()
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=None)
+
+        limiter = RateLimiter(base_backoff=0)
+        client = LLMClient(model="test-model", completion_fn=completion, rate_limiter=limiter)
+        self.assertEqual(client.generate_response([{"role": "user", "content": "Hi"}]), "ok")
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(requests[0]["max_retries"], 0)
+        stats = limiter.stats()["test-model"]
+        self.assertEqual((stats["rate_limited"], stats["in_flight"]), (2, 0))
+        self.assertLess(stats["concurrency"], 8)
+
+    def test_gives_up_after_max_retries(self):
+        def completion(**request):
+            raise RateLimited()
+
+        limiter = RateLimiter(base_backoff=0)
+        client = LLMClient(model="test-model", completion_fn=completion, rate_limiter=limiter, max_retries=2)
+        with self.assertRaises(RateLimited):
+            client.generate_response([{"role": "user", "content": "Hi"}])
+        self.assertEqual(limiter.stats()["test-model"]["rate_limited"], 3)
+        self.assertEqual(limiter.stats()["test-model"]["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
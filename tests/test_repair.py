@@ -0,0 +1,73 @@
+"""Local repair of near-miss JSON in ``agent_core.repair``."""
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.repair import RepairStats, parse_json
+from agent_core.schema import SchemaError, compile_schema
+from agent_core.structured import request_json
+
+SCHEMA = {"type": "object", "required": ["name"], "properties": {"name": {"type": "string"}}}
+
+
+class ParseJsonTest(unittest.TestCase):
+    def parse(self, text, validate=None):
+        self.stats = RepairStats()
+        return parse_json(text, validate, self.stats)
+
+    def test_valid_json_is_parsed_without_repair(self):
+        self.assertEqual(self.parse('{"a": [1, 2]}'), {"a": [1, 2]})
+        self.assertEqual(self.stats.counts["parsed"], 1)
+
+    def test_single_quotes(self):
+        self.assertEqual(self.parse("{'a': 'it\\'s \"b\"'}"), {"a": 'it\'s "b"'})
+        self.assertEqual(self.stats.counts["repaired"], 1)
+
+    def test_trailing_commas(self):
+        self.assertEqual(self.parse('{"a": [1, 2,], "b": {"c": 3,},}'), {"a": [1, 2], "b": {"c": 3}})
+
+    def test_python_literals(self):
+        self.assertEqual(self.parse('{"a": True, "b": False, "c": None, "d": "True"}'),
+                         {"a": True, "b": False, "c": None, "d": "True"})
+
+    def test_prose_and_unclosed_fence_around_the_json(self):
+        self.assertEqual(self.parse('Here you go:\n```json\n{"a": 1}\nAnything else?'), {"a": 1})
+
+    def test_truncated_json_is_not_completed(self):
+        with self.assertRaises(json.JSONDecodeError):
+            self.parse('{"items": [1, 2, 3')
+        self.assertEqual(self.stats.counts["repaired"], 0)
+
+    def test_non_ascii_outside_strings_is_a_parse_error(self):
+        for text in ["É", "{'naïve': café}", '{"a": 1, é: 2}']:
+            with self.subTest(text=text), self.assertRaises(json.JSONDecodeError):
+                self.parse(text)
+
+    def test_non_ascii_inside_strings_is_kept(self):
+        self.assertEqual(self.parse("{'name': 'Café Élan',}"), {"name": "Café Élan"})
+
+    def test_repair_that_breaks_the_schema_raises_the_schema_error(self):
+        with self.assertRaises(SchemaError):
+            self.parse("{'name': 1}", compile_schema(SCHEMA).validate)
+
+
+class RequestJsonTest(unittest.TestCase):
+    def test_unrepairable_reply_is_retried_with_the_reason(self):
+        replies = ["É", '{"name": "ok"}']
+        sent = []
+
+        def generate(messages):
+            sent.append(messages)
+            return replies.pop(0)
+
+        stats = RepairStats()
+        self.assertEqual(request_json(generate, SCHEMA, "Name it.", stats=stats), {"name": "ok"})
+        self.assertEqual(stats.counts["retried"], 1)
+        self.assertIn("not valid JSON", sent[1][-1]["content"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Compiled JSON schemas (``agent_core.schema``)."""
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.schema import SchemaError, compile_schema
+
+INVOICE = {
+    "type": "object",
+    "required": ["number", "total", "items"],
+    "additionalProperties": False,
+    "properties": {
+        "number": {"type": "string", "minLength": 1},
+        "total": {"type": "number", "minimum": 0},
+        "status": {"enum": ["paid", "open"]},
+        "items": {
+            "type": "array",
+            "minItems": 1,
+            "items": {
+                "type": "object",
+                "required": ["quantity"],
+                "properties": {"quantity": {"type": "integer"}, "note": {"anyOf": [{"type": "string"},
+                                                                                   {"type": "null"}]}},
+            },
+        },
+    },
+}
+
+
+class CompiledSchemaTest(unittest.TestCase):
+    def test_valid_value(self):
+        value = {"number": "4567", "total": 1500.0, "status": "paid", "items": [{"quantity": 2.0, "note": None}]}
+        self.assertIs(compile_schema(INVOICE).validate(value), value)
+
+    def test_every_violation_is_reported_with_its_path(self):
+        value = {"number": "", "total": -1, "status": "late", "items": [{"quantity": 1.5, "note": 3}, {}],
+                 "extra": True}
+        self.assertEqual(compile_schema(INVOICE).errors(value), [
+            "$.number: must be at least 1 characters",
+            "$.total: must be >= 0",
+            "$.status: must be one of ['paid', 'open']",
+            "$.items[0].quantity: expected integer, got float",
+            "$.items[0].note: does not match any of the anyOf alternatives",
+            "$.items[1]: missing required property 'quantity'",
+            "$: unexpected property 'extra'",
+        ])
+
+    def test_validate_raises_schema_error(self):
+        with self.assertRaises(SchemaError) as raised:
+            compile_schema(INVOICE).validate({"number": "1", "total": True, "items": []})
+        self.assertEqual(raised.exception.errors, ["$.total: expected number, got bool",
+                                                   "$.items: expected at least 1 items"])
+        self.assertIsInstance(raised.exception, ValueError)
+
+    def test_compiled_once_per_schema(self):
+        self.assertIs(compile_schema(INVOICE), compile_schema(INVOICE))
+        rebuilt = {"type": "object", "properties": {"a": {"type": "string"}}}
+        self.assertIs(compile_schema(rebuilt), compile_schema(dict(rebuilt)))
+        self.assertEqual(compile_schema(rebuilt).prompt, '{"type":"object","properties":{"a":{"type":"string"}}}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Coalescing of identical in-flight calls (``agent_core.singleflight``)."""
+import asyncio
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_concurrent_threads_share_one_call(self):
+        flight, release, calls = SingleFlight(), threading.Event(), []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return "answer"
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("k", fetch))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while flight.stats()["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(calls), results), (1, ["answer"] * 4))
+        self.assertEqual(flight.stats(), {"executed": 1, "coalesced": 3})
+
+    def test_error_is_shared_and_the_key_is_released(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError("upstream")
+
+        with self.assertRaises(ValueError):
+            flight.do("k", fail)
+        self.assertEqual(flight.do("k", lambda: "retried"), "retried")
+        self.assertEqual(flight.stats()["executed"], 2)
+
+    def test_async_callers_share_one_call(self):
+        flight, calls = SingleFlight(), []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "answer"
+
+        async def main():
+            return await asyncio.gather(*(flight.ado("k", fetch) for _ in range(3)), flight.ado("other", fetch))
+
+        self.assertEqual(asyncio.run(main()), ["answer"] * 4)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(flight.stats(), {"executed": 2, "coalesced": 2})
+
+    def test_cancelled_caller_does_not_cancel_the_others(self):
+        flight = SingleFlight()
+        cancelled = []
+
+        async def fetch():
+            try:
+                await asyncio.sleep(0.05)
+                return "answer"
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        async def main():
+            first = asyncio.ensure_future(flight.ado("k", fetch))
+            second = asyncio.ensure_future(flight.ado("k", fetch))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        self.assertEqual(asyncio.run(main()), "answer")
+        self.assertEqual(cancelled, [])
+
+    def test_upstream_is_cancelled_once_every_caller_is_gone(self):
+        flight = SingleFlight()
+        cancelled = []
+
+        async def fetch():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        async def main():
+            callers = [asyncio.ensure_future(flight.ado("k", fetch)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            for caller in callers:
+                caller.cancel()
+            await asyncio.gather(*callers, return_exceptions=True)
+            await asyncio.sleep(0)
+
+        asyncio.run(main())
+        self.assertEqual(cancelled, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
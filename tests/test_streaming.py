@@ -0,0 +1,121 @@
+"""Fenced blocks in complete and streamed output (``agent_core.streaming``)."""
+import json
+import sys
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # repo root, for agent_core
+
+from agent_core.llm import LLMClient
+from agent_core.streaming import FenceDetector, JsonStreamParser, fenced_block, scan_fences
+
+ACTION = {"tool_name": "write_file", "args": {"name": "demo.md", "content": "```python\nprint(1)\n```"}}
+REPLY = "I'll write the file.\n\n```action\n" + json.dumps(ACTION) + "\n```\nThen I'll check it."
+
+
+def splits(text):
+    """Every way of cutting ``text`` into two chunks, so boundaries fall inside each fence marker."""
+    return [[text[:i], text[i:]] for i in range(1, len(text))]
+
+
+def detect(chunks, block_type="action", parse_json=False, on_member=None):
+    detector = FenceDetector(block_type, parse_json=parse_json, on_member=on_member)
+    for chunk in chunks:
+        if detector.feed(chunk) is not None:
+            break
+    return detector
+
+
+class ScanFencesTest(unittest.TestCase):
+    def test_backticks_inside_a_json_string_do_not_close_the_block(self):
+        self.assertEqual(json.loads(fenced_block(REPLY, "action")), ACTION)
+
+    def test_same_line_body(self):
+        self.assertEqual(fenced_block('```action {"tool_name": "terminate"} ```', "action"),
+                         '{"tool_name": "terminate"}')
+
+    def test_blocks_of_other_types_are_skipped(self):
+        text = "```python\nx = '```json'\n```\n```json\n[1, 2]\n```"
+        self.assertEqual([b.info for b in scan_fences(text)], ["python", "json"])
+        self.assertEqual(fenced_block(text, "json"), "[1, 2]")
+
+    def test_unclosed_block(self):
+        blocks = list(scan_fences("```json\n{\"a\": 1"))
+        self.assertFalse(blocks[0].closed)
+        self.assertIsNone(fenced_block("```json\n{\"a\": 1", "json"))
+
+
+class FenceDetectorTest(unittest.TestCase):
+    def test_backticks_in_a_string_value_at_every_chunk_boundary(self):
+        for parse_json in (False, True):
+            for chunks in splits(REPLY):
+                with self.subTest(parse_json=parse_json, cut=len(chunks[0])):
+                    detector = detect(chunks, parse_json=parse_json)
+                    self.assertEqual(json.loads(detector.block), ACTION)
+                    self.assertNotIn("Then", REPLY[:detector.end])
+
+    def test_plain_block_closes_at_a_fence_on_its_own_line(self):
+        text = "Plan:\n```action\nnot json ``` at all\n```\ntrailing"
+        for chunks in splits(text):
+            with self.subTest(cut=len(chunks[0])):
+                self.assertEqual(detect(chunks).block, "not json ``` at all")
+
+    def test_same_line_fence_waits_for_the_end_of_its_line(self):
+        detector = FenceDetector("action")
+        self.assertIsNone(detector.feed('```action {"a": 1} ```'))
+        self.assertEqual(detector.feed("\nmore"), '{"a": 1}')
+
+    def test_json_block_completes_at_its_closing_brace(self):
+        members = []
+        detector = FenceDetector("action", parse_json=True, on_member=lambda k, v: members.append(k))
+        self.assertIsNone(detector.feed('```action\n{"tool_name": "list_files", '))
+        self.assertEqual(members, ["tool_name"])
+        self.assertEqual(detector.feed('"args": {}}'), '{"tool_name": "list_files", "args": {}}')
+        self.assertEqual(members, ["tool_name", "args"])
+
+    def test_non_json_body_falls_back_to_the_fence(self):
+        text = "```action\ntool_name: list_files\n```"
+        for chunks in splits(text):
+            with self.subTest(cut=len(chunks[0])):
+                self.assertEqual(detect(chunks, parse_json=True).block, "tool_name: list_files")
+
+
+class JsonStreamParserTest(unittest.TestCase):
+    def test_members_and_value_at_every_chunk_boundary(self):
+        text = 'prefix {"tool_name": "x", "args": {"s": "a \\"}\\" b", "n": [1, {"k": null}]}, "n": -1.5e3}'
+        for chunks in splits(text):
+            with self.subTest(cut=len(chunks[0])):
+                members = {}
+                parser = JsonStreamParser(lambda k, v: members.__setitem__(k, v))
+                results = [parser.feed(chunk) for chunk in chunks]
+                self.assertEqual(results[-1], json.loads(text[len("prefix "):]))
+                self.assertEqual(members, results[-1])
+                self.assertEqual(parser.end, len(text))
+
+    def test_in_string(self):
+        parser = JsonStreamParser()
+        parser.feed('{"a": "```')
+        self.assertTrue(parser.in_string)
+        parser.feed('"')
+        self.assertFalse(parser.in_string)
+
+    def test_invalid_json_sets_error(self):
+        parser = JsonStreamParser()
+        self.assertIsNone(parser.feed('{"a": tru}'))
+        self.assertIsNotNone(parser.error)
+
+
+class StreamResponseTest(unittest.TestCase):
+    def test_streamed_action_with_backticks_parses_whole(self):
+        def completion(**request):
+            return iter(SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=REPLY[i:i + 3]))])
+                        for i in range(0, len(REPLY), 3))
+
+        client = LLMClient(model="test-model", completion_fn=completion)
+        text = client.stream_response([{"role": "user", "content": "Write it"}], stop_at_fence="action")
+        self.assertEqual(json.loads(fenced_block(text, "action")), ACTION)
+
+
+if __name__ == "__main__":
+    unittest.main()